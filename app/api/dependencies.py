@@ -1,9 +1,17 @@
-from typing import Generator
+import gc
+import secrets
+import threading
+from typing import Generator, Optional
+from fastapi import Header, HTTPException, status
 from app.services.chatbot import ChatbotService
 from app.core.logging import logger
+from app.core.config import get_settings
+
+settings = get_settings()
 
 # Global chatbot instance
 _chatbot_service = None
+_chatbot_service_lock = threading.Lock()
 
 
 def get_chatbot_service() -> ChatbotService:
@@ -11,10 +19,71 @@ def get_chatbot_service() -> ChatbotService:
     global _chatbot_service
     
     if _chatbot_service is None:
-        logger.info("Creating chatbot service instance...")
-        _chatbot_service = ChatbotService()
-        
-        # Optionally warmup on first creation
-        # _chatbot_service.warmup()
+        with _chatbot_service_lock:
+            if _chatbot_service is None:
+                logger.info("Creating chatbot service instance...")
+                _chatbot_service = ChatbotService()
     
-    return _chatbot_service
\ No newline at end of file
+    return _chatbot_service
+
+
+def preload_chatbot_service() -> ChatbotService:
+    """Load models before gunicorn forks, so workers share them copy-on-write."""
+    chatbot = get_chatbot_service()
+    logger.info("Preloading models in the master process...")
+    # No forward pass here: thread pools do not survive fork
+    chatbot.load_models()
+    
+    # Keep the garbage collector from touching (and copying) preloaded objects
+    gc.collect()
+    gc.freeze()
+    logger.info("✅ Models preloaded")
+    return chatbot
+
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    """Allow admin endpoints only with the configured ADMIN_TOKEN."""
+    if not settings.admin_token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them"
+        )
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token"
+        )
+
+
+async def check_chatbot_ready(chatbot: ChatbotService):
+    """Load search components on first use, raise 503 with details if that fails."""
+    if chatbot.is_ready():
+        return
+    
+    # Single-flight: concurrent first requests wait for the same load
+    try:
+        await chatbot.executor.run_cpu(chatbot.load_retrieval)
+    except Exception as e:
+        logger.warning(f"Loading search components failed: {str(e)}")
+    
+    if not chatbot.is_ready():
+        status_details = chatbot.component_status()
+        
+        # Identify the specific issues
+        error_details = []
+        embeddings = status_details["embeddings"]
+        if embeddings["state"] != "ready":
+            error_details.append(
+                f"Embedding model {embeddings['state']}: {embeddings['error'] or 'not loaded'}"
+            )
+        for name, artifact in status_details["database"].items():
+            if artifact["state"] != "ready":
+                error_details.append(
+                    f"FAISS {name} {artifact['state']}: {artifact['error'] or 'not loaded'}"
+                )
+        
+        logger.warning(f"Chatbot not ready - {'; '.join(error_details)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Chatbot service is not ready. Issues: {', '.join(error_details)}"
+        )
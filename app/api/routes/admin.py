@@ -0,0 +1,65 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.models.requests import KnowledgeBaseReloadRequest
+from app.models.responses import ErrorResponse
+from app.api.dependencies import get_chatbot_service, require_admin_token
+from app.services.chatbot import ChatbotService
+from app.core.logging import logger
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin_token)]
+)
+
+
+@router.get("/kb")
+async def knowledge_base_status(
+    chatbot: ChatbotService = Depends(get_chatbot_service)
+) -> dict:
+    """Served knowledge base version, versions still finishing searches and available versions."""
+    return chatbot.knowledge_base.status()
+
+
+@router.post(
+    "/kb/reload",
+    responses={
+        400: {"model": ErrorResponse},
+        404: {"model": ErrorResponse},
+        500: {"model": ErrorResponse}
+    }
+)
+async def reload_knowledge_base(
+    request: KnowledgeBaseReloadRequest,
+    chatbot: ChatbotService = Depends(get_chatbot_service)
+) -> dict:
+    """
+    Load a knowledge base version next to the served one and switch to it.
+    
+    Requests keep being answered from the old version while the new one loads.
+    With several workers, the others pick the version up through KB_WATCH_INTERVAL.
+    
+    - **version**: Version directory to activate (optional)
+    - **force**: Reload even if the version is already served (optional)
+    """
+    try:
+        # Loading takes seconds, keep it off the event loop and the CPU executor
+        return await asyncio.to_thread(
+            chatbot.knowledge_base.reload, request.version, request.force
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Knowledge base reload error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Reloading the knowledge base failed: {str(e)}"
+        )
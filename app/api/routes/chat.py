@@ -1,8 +1,12 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException, status
-from app.models.requests import ChatRequest
-from app.models.responses import ChatResponse, ErrorResponse
-from app.api.dependencies import get_chatbot_service
+from fastapi.responses import StreamingResponse
+from app.models.requests import ChatRequest, BatchChatRequest
+from app.models.responses import ChatResponse, BatchChatResponse, ErrorResponse
+from app.api.dependencies import get_chatbot_service, check_chatbot_ready
 from app.services.chatbot import ChatbotService
+from app.services.executor import QueueFullError
+from app.core.resources import get_thread_plan
 from app.core.logging import logger
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -13,7 +17,8 @@ router = APIRouter(prefix="/chat", tags=["chat"])
     response_model=ChatResponse,
     responses={
         400: {"model": ErrorResponse},
-        500: {"model": ErrorResponse}
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
     }
 )
 async def chat(
@@ -26,44 +31,29 @@ async def chat(
     - **query**: The user's question
     - **top_k**: Number of similar documents to retrieve (optional)
     - **max_tokens**: Maximum tokens for response generation (optional)
+    - **include_timings**: Return seconds spent per pipeline stage (optional)
     """
     try:
-        # Check readiness with detailed logging
-        if not chatbot.is_ready():
-            # Log detailed status for debugging
-            logger.warning(f"Chatbot not ready - Embeddings: {chatbot.embeddings.model is not None}, "
-                          f"Database: {chatbot.database.is_loaded()}")
-            
-            # Try to identify the specific issue
-            error_details = []
-            try:
-                if chatbot.embeddings.model is None:
-                    error_details.append("Embedding model not loaded")
-            except Exception as e:
-                error_details.append(f"Embedding check failed: {str(e)}")
-            
-            try:
-                if not chatbot.database.is_loaded():
-                    error_details.append("FAISS database not loaded")
-            except Exception as e:
-                error_details.append(f"Database check failed: {str(e)}")
-            
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail=f"Chatbot service is not ready. Issues: {', '.join(error_details)}"
-            )
+        await check_chatbot_ready(chatbot)
         
         # Process query
         response = await chatbot.process_query(
             query=request.query,
             top_k=request.top_k,
-            max_tokens=request.max_tokens
+            max_tokens=request.max_tokens,
+            include_timings=request.include_timings
         )
         
         return response
         
     except HTTPException:
         raise
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(
@@ -78,35 +68,165 @@ async def chat(
         )
 
 
+@router.post(
+    "/batch",
+    response_model=BatchChatResponse,
+    responses={
+        400: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
+    }
+)
+async def chat_batch(
+    request: BatchChatRequest,
+    chatbot: ChatbotService = Depends(get_chatbot_service)
+) -> BatchChatResponse:
+    """
+    Process several chat queries together, results are returned in request order.
+    
+    - **queries**: The user's questions
+    - **top_k**: Number of similar documents to retrieve per query (optional)
+    - **max_tokens**: Maximum tokens for each response (optional)
+    - **retrieval_only**: Only return search results, skip generation (optional)
+    
+    A failed generation is reported in the item's **error** field instead of
+    failing the whole batch.
+    """
+    try:
+        await check_chatbot_ready(chatbot)
+        
+        return await chatbot.process_batch(
+            queries=request.queries,
+            top_k=request.top_k,
+            max_tokens=request.max_tokens,
+            retrieval_only=request.retrieval_only
+        )
+        
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Batch processing error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while processing your request: {str(e)}"
+        )
+
+
+@router.post(
+    "/stream",
+    responses={
+        400: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
+    }
+)
+async def chat_stream(
+    request: ChatRequest,
+    chatbot: ChatbotService = Depends(get_chatbot_service)
+) -> StreamingResponse:
+    """
+    Process a chat query and stream the response as Server-Sent Events.
+    
+    Events are sent in this order:
+    - **search_results**: Retrieved documents, sent before generation starts
+    - **token**: Generated text as it is decoded (repeated)
+    - **done**: Full response with timing metadata (per-stage with **include_timings**)
+    """
+    await check_chatbot_ready(chatbot)
+    
+    events = chatbot.stream_query(
+        query=request.query,
+        top_k=request.top_k,
+        max_tokens=request.max_tokens,
+        include_timings=request.include_timings
+    )
+    
+    # Run up to the first event so admission and search errors map to status codes
+    try:
+        first_event = await events.__anext__()
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Chat stream error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while processing your request: {str(e)}"
+        )
+    
+    async def event_source():
+        try:
+            yield _format_event(first_event)
+            async for event in events:
+                yield _format_event(event)
+        except Exception as e:
+            logger.error(f"Chat stream error: {str(e)}", exc_info=True)
+            yield _format_event({"event": "error", "data": {"detail": str(e)}})
+        finally:
+            await events.aclose()
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _format_event(event: dict) -> str:
+    """Encode an event as a Server-Sent Events message."""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
 @router.get("/health")
 async def health_check(
     chatbot: ChatbotService = Depends(get_chatbot_service)
 ) -> dict:
-    """Check if the chat service is healthy."""
+    """Check if the chat service is healthy, without loading any model."""
+    components = chatbot.component_status()
     status_details = {
-        "embeddings_loaded": False,
-        "database_loaded": False,
-        "llm_loaded": False
+        "embeddings_loaded": chatbot.embeddings.is_loaded(),
+        "database_loaded": chatbot.database.is_loaded(),
+        "llm_loaded": chatbot.llm.is_loaded()
     }
     
-    try:
-        status_details["embeddings_loaded"] = chatbot.embeddings.model is not None
-    except:
-        pass
-    
-    try:
-        status_details["database_loaded"] = chatbot.database.is_loaded()
-    except:
-        pass
-    
-    try:
-        status_details["llm_loaded"] = chatbot.llm.is_loaded()
-    except:
-        pass
+    ready = chatbot.is_ready()
+    plan = get_thread_plan()
+    loading = components["embeddings"]["state"] == "loading" or any(
+        artifact["state"] == "loading" for artifact in components["database"].values()
+    )
     
     return {
-        "status": "healthy" if chatbot.is_ready() else "unhealthy",
+        "status": "healthy" if ready else ("loading" if loading else "unhealthy"),
         "service": "chat",
-        "models_loaded": chatbot.is_ready(),
-        "details": status_details
+        "models_loaded": ready,
+        "details": status_details,
+        "components": components,
+        "knowledge_base": chatbot.knowledge_base.status(),
+        "response_cache": chatbot.cache.stats(),
+        "context_token_cache": chatbot.context_builder.stats(),
+        "threads": plan.to_dict() if plan is not None else None,
+        "embedding_cache": (
+            chatbot.embeddings.cache.stats() if chatbot.embeddings.cache else None
+        )
     }
\ No newline at end of file
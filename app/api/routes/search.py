@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.models.requests import SearchRequest
+from app.models.responses import SearchResponse, ErrorResponse
+from app.api.dependencies import get_chatbot_service, check_chatbot_ready
+from app.services.chatbot import ChatbotService
+from app.core.logging import logger
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.post(
+    "/",
+    response_model=SearchResponse,
+    responses={
+        400: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
+    }
+)
+async def search(
+    request: SearchRequest,
+    chatbot: ChatbotService = Depends(get_chatbot_service)
+) -> SearchResponse:
+    """
+    Retrieve knowledge-base documents for a query, without generating a response.
+    
+    - **query**: The search query
+    - **top_k**: Number of documents to return (optional)
+    - **nprobe**: IVF lists visited per query (optional)
+    - **oversample**: Candidate multiplier for exact re-ranking (optional)
+    - **min_score**: Minimum similarity of returned documents (optional)
+    """
+    try:
+        await check_chatbot_ready(chatbot)
+        
+        return await chatbot.search(
+            query=request.query,
+            top_k=request.top_k,
+            nprobe=request.nprobe,
+            oversample=request.oversample,
+            min_score=request.min_score
+        )
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Search error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while processing your request: {str(e)}"
+        )
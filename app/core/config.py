@@ -14,32 +14,110 @@ class Settings(BaseSettings):
     gemma_model_id: str = Field(default="google/gemma-2-2b-it")
     llm_model_id : str = Field(default="TinyLlama/TinyLlama-1.1B-Chat-v1.0")
     embedding_model: str = Field(default="paraphrase-multilingual-MiniLM-L12-v2")
+    embedding_backend: str = Field(default="torch")
+    embedding_onnx_dir: str = Field(default="./.cache/onnx")
+    embedding_cache_size: int = Field(default=4096, ge=0)
+    embedding_cache_path: Optional[str] = Field(default=None)
+    # Models saved by scripts/prewarm_models.py, loaded from disk instead of the hub
+    model_cache_dir: Optional[str] = Field(default=None)
     
     # FAISS Settings
     faiss_index_path: str = Field(default="./data/it_support_faiss_index.bin")
     metadata_path: str = Field(default="./data/it_support_metadata.pkl")
+    metadata_store_path: str = Field(default="./data/it_support_metadata.store")
     config_path: str = Field(default="./data/it_support_config.json")
+    faiss_mmap: bool = Field(default=True)
+    faiss_nprobe: Optional[int] = Field(default=None, ge=1)
+    faiss_ef_search: Optional[int] = Field(default=None, ge=1)
+
+    # Knowledge Base Versioning Settings
+    kb_dir: Optional[str] = Field(default=None)
+    kb_watch_interval: float = Field(default=0.0, ge=0)
+    admin_token: Optional[str] = Field(default=None)
     
     # Search Settings
     top_k_results: int = Field(default=4, ge=1, le=20)
     max_tokens: int = Field(default=130, ge=50, le=500)
-    
+    batch_max_queries: int = Field(default=256, ge=1)
+    search_oversample: int = Field(default=1, ge=1)
+    search_min_score: Optional[float] = Field(default=None)
+    # Comma-separated metadata fields returned with search hits, unset for all
+    search_result_fields: Optional[str] = Field(default=None)
+
+    # Context Settings
+    context_max_tokens: int = Field(default=256, ge=0)
+    context_mmr_lambda: float = Field(default=0.7, ge=0, le=1)
+    context_min_score: Optional[float] = Field(default=None)
+    context_token_cache_size: int = Field(default=4096, ge=0)
+
+    # Direct Answer Settings (stored answer without the LLM)
+    direct_answer_enabled: bool = Field(default=False)
+    direct_answer_min_score: float = Field(default=0.9)
+    direct_answer_min_margin: float = Field(default=0.05, ge=0)
+
+    # Hybrid Search Settings
+    hybrid_search_enabled: bool = Field(default=True)
+    hybrid_candidates: int = Field(default=20, ge=1)
+    rrf_k: int = Field(default=60, ge=1)
+    bm25_k1: float = Field(default=1.2, ge=0)
+    bm25_b: float = Field(default=0.75, ge=0, le=1)
+
+    # Execution Settings
+    cpu_executor_workers: int = Field(default=2, ge=1)
+    llm_max_concurrency: int = Field(default=1, ge=1)
+    llm_queue_size: int = Field(default=8, ge=0)
+    queue_retry_after: int = Field(default=5, ge=1)
+
+    # CPU Thread Settings (unset thread counts are planned from the cores and WORKERS)
+    cpu_thread_planning: bool = Field(default=True)
+    cpu_cores: Optional[int] = Field(default=None, ge=1)
+    cpu_llm_share: float = Field(default=0.75, ge=0, le=1)
+    cpu_affinity: bool = Field(default=False)
+    embedding_threads: Optional[int] = Field(default=None, ge=1)
+    search_threads: Optional[int] = Field(default=None, ge=1)
+    llm_threads: Optional[int] = Field(default=None, ge=1)
+
+    # LLM Settings
+    llm_backend: str = Field(default="bf16")
+    llm_quantized_cache_dir: str = Field(default="./.cache/quantized")
+    llm_prefix_cache_enabled: bool = Field(default=True)
+
+    # LLM Early Stopping Settings (0 disables a check)
+    llm_max_bullets: int = Field(default=5, ge=0)
+    llm_repetition_ngram: int = Field(default=8, ge=0)
+    llm_repetition_max: int = Field(default=3, ge=2)
+
+    # Speculative Decoding Settings (single-prompt generation only)
+    llm_speculative_mode: str = Field(default="off")
+    llm_draft_model_id: Optional[str] = Field(default=None)
+    llm_speculative_tokens: int = Field(default=10, ge=1)
+    llm_prompt_lookup_ngram: int = Field(default=2, ge=1)
+
+    # LLM Batching Settings
+    llm_batching_enabled: bool = Field(default=False)
+    llm_batch_max_size: int = Field(default=8, ge=1)
+    llm_batch_window_ms: float = Field(default=10.0, ge=0)
+
+    # Response Cache Settings
+    response_cache_enabled: bool = Field(default=True)
+    response_cache_max_entries: int = Field(default=1024, ge=1)
+    response_cache_ttl: float = Field(default=3600.0, gt=0)
+    semantic_cache_threshold: float = Field(default=0.95, gt=0, le=1)
+
+    # Inference Server Settings
+    inference_mode: str = Field(default="local")
+    inference_socket_path: str = Field(default="/tmp/chatbot-inference.sock")
+    inference_timeout: float = Field(default=300.0, gt=0)
+
     # Server Settings
     host: str = Field(default="0.0.0.0")
     port: int = Field(default=8000)
     workers: int = Field(default=1)
+    preload_models: bool = Field(default=False)
     
     # Logging
     log_level: str = Field(default="INFO")
     
-    # Password keywords for filtering
-    password_keywords: set = Field(
-        default={
-            "password", "passwort", "login", "credential", 
-            "account", "reset", "zurücksetzen", "otp", "2fa", "mfa"
-        }
-    )
-    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -50,6 +128,34 @@ class Settings(BaseSettings):
         if v.upper() not in valid_levels:
             raise ValueError(f"Invalid log level. Must be one of {valid_levels}")
         return v.upper()
+    
+    @validator("llm_backend")
+    def validate_llm_backend(cls, v):
+        valid_backends = ["bf16", "int8"]
+        if v.lower() not in valid_backends:
+            raise ValueError(f"Invalid LLM backend. Must be one of {valid_backends}")
+        return v.lower()
+    
+    @validator("llm_speculative_mode")
+    def validate_llm_speculative_mode(cls, v):
+        valid_modes = ["off", "prompt_lookup", "draft_model"]
+        if v.lower() not in valid_modes:
+            raise ValueError(f"Invalid speculative decoding mode. Must be one of {valid_modes}")
+        return v.lower()
+    
+    @validator("embedding_backend")
+    def validate_embedding_backend(cls, v):
+        valid_backends = ["torch", "onnx", "onnx-int8"]
+        if v.lower() not in valid_backends:
+            raise ValueError(f"Invalid embedding backend. Must be one of {valid_backends}")
+        return v.lower()
+    
+    @validator("inference_mode")
+    def validate_inference_mode(cls, v):
+        valid_modes = ["local", "remote"]
+        if v.lower() not in valid_modes:
+            raise ValueError(f"Invalid inference mode. Must be one of {valid_modes}")
+        return v.lower()
 
 
 @lru_cache()
@@ -0,0 +1,25 @@
+import os
+import psutil
+from typing import Dict, Any
+
+
+def memory_report() -> Dict[str, Any]:
+    """Memory usage of the current worker process, in MiB.
+
+    ``shared`` pages come from the preloaded master (or the page cache for
+    mmap'd files); ``uss`` is memory unique to this worker and ``pss``
+    splits shared pages evenly across the processes that map them.
+    """
+    info = psutil.Process().memory_full_info()
+    mib = 1024 * 1024
+    report = {
+        "pid": os.getpid(),
+        "ppid": os.getppid(),
+        "rss_mb": round(info.rss / mib, 1),
+        "uss_mb": round(info.uss / mib, 1),
+    }
+    for field in ("pss", "shared", "swap"):
+        value = getattr(info, field, None)
+        if value is not None:
+            report[f"{field}_mb"] = round(value / mib, 1)
+    return report
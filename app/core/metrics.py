@@ -0,0 +1,138 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from prometheus_client import Counter, Gauge, Histogram
+
+# Chat pipeline stages
+STAGE_LATENCY = Histogram(
+    "chatbot_stage_duration_seconds",
+    "Time spent per pipeline stage (embed, search, context, template, prefill, decode)",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+REQUEST_LATENCY = Histogram(
+    "chatbot_request_duration_seconds",
+    "End-to-end processing time per endpoint",
+    ["endpoint"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+
+# Context assembly
+CONTEXT_TOKENS = Histogram(
+    "chatbot_context_tokens",
+    "LLM tokens of the context assembled from the search hits",
+    buckets=(0, 32, 64, 128, 192, 256, 384, 512, 768, 1024)
+)
+
+# Response routing
+RESPONSE_SOURCE = Counter(
+    "chatbot_responses_total",
+    "Responses by source: llm (generated) or kb (stored answer, no generation)",
+    ["source"]
+)
+
+# LLM generation
+LLM_PROMPT_TOKENS = Counter(
+    "chatbot_llm_prompt_tokens_total",
+    "Prompt tokens processed by the LLM"
+)
+LLM_GENERATED_TOKENS = Counter(
+    "chatbot_llm_generated_tokens_total",
+    "Tokens generated by the LLM"
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "chatbot_llm_decode_tokens_per_second",
+    "Decode throughput per generate call, summed over the batch",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 150, 200, 300, 500)
+)
+LLM_DRAFT_TOKENS = Counter(
+    "chatbot_llm_draft_tokens_total",
+    "Speculatively drafted tokens accepted by the LLM"
+)
+LLM_DRAFT_ACCEPTANCE = Histogram(
+    "chatbot_llm_draft_acceptance_ratio",
+    "Share of generated tokens that came from the drafter, per speculative generate call",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+LLM_STOP_REASONS = Counter(
+    "chatbot_llm_stop_reasons_total",
+    "Generated responses by why generation ended",
+    ["reason"]
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "chatbot_llm_queue_depth",
+    "Admitted requests that are not generating yet",
+    multiprocess_mode="livesum"
+)
+LLM_IN_FLIGHT = Gauge(
+    "chatbot_llm_in_flight",
+    "Generations currently running",
+    multiprocess_mode="livesum"
+)
+
+# LLM micro-batching
+LLM_BATCH_SIZE = Histogram(
+    "chatbot_llm_batch_size",
+    "Number of prompts per batched generate call",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+)
+LLM_BATCH_QUEUE_WAIT = Histogram(
+    "chatbot_llm_batch_queue_wait_seconds",
+    "Time a prompt waits in the batching queue before generation starts",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+# Startup
+STARTUP_PHASE = Gauge(
+    "chatbot_startup_phase_seconds",
+    "Duration of a startup phase (import, load, warmup); ready is the time from process start to serving",
+    ["phase"],
+    multiprocess_mode="liveall"
+)
+
+# Caches
+CACHE_HIT_RATIO = Gauge(
+    "chatbot_cache_hit_ratio",
+    "Hit ratio of a cache since process start",
+    ["cache"],
+    multiprocess_mode="liveall"
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "chatbot_response_cache_requests_total",
+    "Response cache lookups by result",
+    ["result"]
+)
+EMBEDDING_CACHE_REQUESTS = Counter(
+    "chatbot_embedding_cache_requests_total",
+    "Embedding cache lookups by result, one per text",
+    ["result"]
+)
+
+# Knowledge base
+KB_RELOADS = Counter(
+    "chatbot_kb_reloads_total",
+    "Knowledge base reloads by result",
+    ["result"]
+)
+
+
+class StageTimer:
+    """Times the stages of one request into STAGE_LATENCY and keeps them for the response."""
+    
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+    
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one stage."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start_time)
+    
+    def add(self, name: str, seconds: float, observe: bool = True):
+        """Record a stage measured elsewhere."""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        if observe:
+            STAGE_LATENCY.labels(stage=name).observe(seconds)
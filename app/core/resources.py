@@ -0,0 +1,223 @@
+import math
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+from app.core.logging import logger
+from app.core.config import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+# Read by the OpenMP and BLAS runtimes when they start
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+@dataclass
+class ThreadPlan:
+    """CPU budget of one worker process and how it is split between the stages.
+
+    Embedding and FAISS search run on the CPU executor, generation on the LLM
+    executor; the thread counts are per executor thread, so a worker uses about
+    cpu_executor_workers * max(embedding, search) + llm_concurrency * llm threads.
+    """
+    cores: List[int] = field(default_factory=list)
+    embedding_threads: int = 1
+    search_threads: int = 1
+    llm_threads: int = 1
+    pinned: bool = False
+    slot: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_plan: Optional[ThreadPlan] = None
+# Libraries whose thread counts the calling thread has applied, per stage
+_applied = threading.local()
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """CPUs the container may use according to its cgroup quota, if limited."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> List[int]:
+    """CPU ids this process may run on, cut down to the cgroup quota."""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = cpus[:max(1, math.floor(limit))]
+    return cpus
+
+
+def plan_threads(
+    cpus: Sequence[int],
+    workers: int = 1,
+    slot: Optional[int] = None,
+    cpu_workers: int = 1,
+    llm_concurrency: int = 1,
+    llm_share: float = 0.75,
+    embedding_threads: Optional[int] = None,
+    search_threads: Optional[int] = None,
+    llm_threads: Optional[int] = None,
+    pin: bool = False
+) -> ThreadPlan:
+    """Split cpus evenly between workers, then a worker's share between the stages.
+
+    slot is the worker's position among the workers; its cores are the slot-th
+    slice of cpus (slices repeat when there are more workers than cores).
+    Explicit thread counts take precedence over the split.
+    """
+    cpus = list(cpus) or [0]
+    per_worker = max(1, len(cpus) // max(workers, 1))
+    start = ((slot or 0) * per_worker) % len(cpus)
+    cores = (cpus[start:] + cpus[:start])[:per_worker]
+
+    # Generation dominates request time; embedding and search share the rest
+    llm_budget = max(1, round(per_worker * llm_share)) if per_worker > 1 else 1
+    cpu_budget = max(1, per_worker - llm_budget)
+    return ThreadPlan(
+        cores=cores,
+        embedding_threads=embedding_threads or max(1, cpu_budget // cpu_workers),
+        search_threads=search_threads or max(1, cpu_budget // cpu_workers),
+        llm_threads=llm_threads or max(1, llm_budget // llm_concurrency),
+        pinned=pin and slot is not None and hasattr(os, "sched_setaffinity"),
+        slot=slot
+    )
+
+
+def plan_from_settings(
+    slot: Optional[int] = None,
+    workers: Optional[int] = None,
+    api_only: Optional[bool] = None
+) -> ThreadPlan:
+    """Plan for this process from the settings.
+
+    api_only processes (default: INFERENCE_MODE=remote) leave the models to the
+    inference server and only need threads for search.
+    """
+    cpus = available_cpus()
+    if settings.cpu_cores:
+        cpus = cpus[:settings.cpu_cores]
+    if api_only is None:
+        api_only = settings.inference_mode == "remote"
+    return plan_threads(
+        cpus,
+        workers=workers or settings.workers,
+        slot=slot,
+        cpu_workers=settings.cpu_executor_workers,
+        llm_concurrency=settings.llm_max_concurrency,
+        llm_share=0.0 if api_only else settings.cpu_llm_share,
+        embedding_threads=settings.embedding_threads,
+        search_threads=settings.search_threads,
+        llm_threads=settings.llm_threads,
+        pin=settings.cpu_affinity
+    )
+
+
+def configure_threads(
+    slot: Optional[int] = None,
+    workers: Optional[int] = None,
+    api_only: Optional[bool] = None
+) -> Optional[ThreadPlan]:
+    """Plan this process's threads and apply the process-wide limits.
+
+    Call it before torch, FAISS and tokenizers are imported so their pools start
+    at the planned size, and again in every forked worker with its slot. The
+    per-stage limits are applied by the executor threads (see apply_stage_limits).
+    """
+    global _plan
+    if not settings.cpu_thread_planning:
+        return None
+    if slot is None and _plan is not None:
+        # Already planned, e.g. by gunicorn's post_fork before the app is imported
+        return _plan
+
+    plan = plan_from_settings(slot, workers, api_only)
+    total = max(plan.embedding_threads, plan.search_threads, plan.llm_threads)
+
+    # Explicit environment settings win over the plan
+    for name in _THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(total))
+    # The Rust tokenizers pool would claim every core in every worker
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    if plan.pinned:
+        os.sched_setaffinity(0, plan.cores)
+
+    # Runtimes already loaded (forked workers) do not read the environment again
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=plan.search_threads, user_api="blas")
+        threadpool_limits(limits=total, user_api="openmp")
+    except ImportError:
+        logger.debug("threadpoolctl not installed, BLAS and OpenMP limits come from the environment")
+    _apply_library_threads("llm", plan)
+
+    _plan = plan
+    logger.info(
+        f"Thread plan{'' if slot is None else f' for worker {slot}'}: "
+        f"{len(plan.cores)} cores{' (pinned)' if plan.pinned else ''}, "
+        f"embedding={plan.embedding_threads}, search={plan.search_threads}, "
+        f"llm={plan.llm_threads}"
+    )
+    return plan
+
+
+def get_thread_plan() -> Optional[ThreadPlan]:
+    """The plan applied to this process, None if planning is off or not done yet."""
+    return _plan
+
+
+def _apply_library_threads(stage: str, plan: ThreadPlan):
+    """Set the torch and FAISS thread counts of the calling thread for a stage."""
+    torch = sys.modules.get("torch")
+    if torch is not None and hasattr(torch, "set_num_threads"):
+        torch.set_num_threads(plan.llm_threads if stage == "llm" else plan.embedding_threads)
+    faiss = sys.modules.get("faiss")
+    if faiss is not None and hasattr(faiss, "omp_set_num_threads"):
+        faiss.omp_set_num_threads(plan.search_threads)
+
+
+def apply_stage_limits(stage: str):
+    """Limit the calling thread to its stage's budget.
+
+    OpenMP thread counts are per calling thread, so the embedding/search pool
+    and the LLM pool of the same process keep separate budgets. torch is
+    imported on first use, possibly after the thread started, so the executors
+    call this before every task; it only applies limits again once another
+    library has been loaded.
+    """
+    if _plan is None:
+        return
+    loaded = (stage, "torch" in sys.modules, "faiss" in sys.modules)
+    if getattr(_applied, "loaded", None) == loaded:
+        return
+    _apply_library_threads(stage, _plan)
+    _applied.loaded = loaded
+
+
+def run_in_stage(stage: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Call func with the calling thread limited to the stage's budget."""
+    apply_stage_limits(stage)
+    return func(*args, **kwargs)
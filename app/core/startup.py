@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import psutil
+
+from app.core.metrics import STARTUP_PHASE
+from app.core.logging import logger
+
+
+class StartupTimeline:
+    """When each phase of this process's startup happened, relative to the process start.
+
+    Phases are recorded from any thread as they finish: importing the app,
+    importing the heavy libraries, loading every artifact and model, and the
+    first forward passes of the warmup. Only the first occurrence of a phase
+    counts, so later knowledge base reloads do not show up as startup.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at if started_at is not None else psutil.Process().create_time()
+        self.ready_at: Optional[float] = None
+        self._phases: List[Dict[str, Any]] = []
+        self._names = set()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, duration: float):
+        """Add a phase that started at wall clock time start and took duration seconds."""
+        with self._lock:
+            if name in self._names:
+                return
+            self._names.add(name)
+            self._phases.append({
+                "name": name,
+                "start": round(start - self.started_at, 3),
+                "duration": round(duration, 3)
+            })
+        STARTUP_PHASE.labels(phase=name).set(duration)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Record the wrapped block as a phase, also when it fails."""
+        start = time.time()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start_time)
+
+    def mark(self, name: str):
+        """Record a phase spanning from the process start until now."""
+        self.record(name, self.started_at, time.time() - self.started_at)
+
+    def mark_ready(self):
+        """Note that the process serves requests from now on and log the timeline."""
+        if self.ready_at is not None:
+            return
+        self.ready_at = time.time()
+        STARTUP_PHASE.labels(phase="ready").set(self.ready_at - self.started_at)
+        phases = ", ".join(
+            f"{phase['name']} {phase['duration']:.2f}s" for phase in self.phases()
+        )
+        logger.info(f"Ready {self.ready_at - self.started_at:.2f}s after process start ({phases})")
+
+    def phases(self) -> List[Dict[str, Any]]:
+        """Recorded phases in the order they started."""
+        with self._lock:
+            return sorted(self._phases, key=lambda phase: phase["start"])
+
+    def report(self) -> Dict[str, Any]:
+        """The timeline of this process, with phase starts in seconds after the process start."""
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "ready_after": (
+                round(self.ready_at - self.started_at, 3) if self.ready_at is not None else None
+            ),
+            "phases": self.phases()
+        }
+
+
+startup_timeline = StartupTimeline()
@@ -0,0 +1,87 @@
+from typing import Optional, List
+from typing_extensions import Annotated
+from pydantic import BaseModel, Field
+from app.core.config import get_settings
+
+settings = get_settings()
+
+QueryText = Annotated[str, Field(min_length=1, max_length=2000)]
+
+
+class ChatRequest(BaseModel):
+    """Chat query request."""
+    query: QueryText = Field(..., description="The user's question")
+    top_k: Optional[int] = Field(
+        default=None, ge=1, le=20,
+        description="Number of similar documents to retrieve"
+    )
+    max_tokens: Optional[int] = Field(
+        default=None, ge=50, le=500,
+        description="Maximum tokens for response generation"
+    )
+    include_timings: bool = Field(
+        default=False,
+        description="Return seconds spent per pipeline stage in the response"
+    )
+
+
+class HealthCheckResponse(BaseModel):
+    """Health check response."""
+    status: str
+    version: str
+    models_loaded: bool
+    kb_version: Optional[str] = None
+    kb_created_at: Optional[str] = None
+
+
+class BatchChatRequest(BaseModel):
+    """Batch of chat queries processed together."""
+    queries: List[QueryText] = Field(
+        ..., min_length=1, max_length=settings.batch_max_queries,
+        description="The questions, answered in the same order"
+    )
+    top_k: Optional[int] = Field(
+        default=None, ge=1, le=20,
+        description="Number of similar documents to retrieve per query"
+    )
+    max_tokens: Optional[int] = Field(
+        default=None, ge=50, le=500,
+        description="Maximum tokens for each generated response"
+    )
+    retrieval_only: bool = Field(
+        default=False,
+        description="Only retrieve documents, skip response generation"
+    )
+
+
+class KnowledgeBaseReloadRequest(BaseModel):
+    """Switch to another knowledge base version."""
+    version: Optional[str] = Field(
+        default=None,
+        description="Version directory to activate; default: the one the pointer file names"
+    )
+    force: bool = Field(
+        default=False,
+        description="Reload even if the version is already served"
+    )
+
+
+class SearchRequest(BaseModel):
+    """Retrieval-only search request."""
+    query: QueryText = Field(..., description="The search query")
+    top_k: Optional[int] = Field(
+        default=None, ge=1, le=100,
+        description="Number of documents to return"
+    )
+    nprobe: Optional[int] = Field(
+        default=None, ge=1,
+        description="IVF lists visited per query (ignored for flat indexes)"
+    )
+    oversample: Optional[int] = Field(
+        default=None, ge=1, le=20,
+        description="Fetch top_k * oversample candidates and re-rank them exactly"
+    )
+    min_score: Optional[float] = Field(
+        default=None, ge=-1.0, le=1.0,
+        description="Drop results scoring below this similarity"
+    )
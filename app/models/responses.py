@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class SearchResult(BaseModel):
+    """A retrieved knowledge-base document."""
+    subject: str
+    answer: str
+    score: float
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ChatResponse(BaseModel):
+    """Chat query response."""
+    response: str
+    query: str
+    context_used: Optional[str] = None
+    search_results: List[SearchResult] = Field(default_factory=list)
+    processing_time: float
+    timings: Optional[Dict[str, float]] = Field(
+        default=None,
+        description="Seconds spent per stage, when requested"
+    )
+    stop_reason: Optional[str] = Field(
+        default=None,
+        description="Why generation ended: eos, max_tokens, bullets, repetition or cancelled"
+    )
+    source: str = Field(
+        default="llm",
+        description="llm for a generated response, kb for the stored answer of a confident match"
+    )
+    timestamp: datetime = Field(default_factory=_utcnow)
+
+
+class BatchItemResult(BaseModel):
+    """Result for one query of a batch."""
+    index: int
+    query: str
+    response: Optional[str] = None
+    context_used: Optional[str] = None
+    search_results: List[SearchResult] = Field(default_factory=list)
+    stop_reason: Optional[str] = None
+    source: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchChatResponse(BaseModel):
+    """Batch chat response, results are in request order."""
+    results: List[BatchItemResult]
+    timings: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Seconds spent per stage for the whole batch"
+    )
+    processing_time: float
+    timestamp: datetime = Field(default_factory=_utcnow)
+
+
+class SearchResponse(BaseModel):
+    """Retrieval-only search response."""
+    query: str
+    results: List[SearchResult] = Field(default_factory=list)
+    processing_time: float
+    timestamp: datetime = Field(default_factory=_utcnow)
+
+
+class ErrorResponse(BaseModel):
+    """Error response."""
+    error: str
+    detail: Optional[str] = None
+    timestamp: datetime = Field(default_factory=_utcnow)
+
@@ -0,0 +1,163 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
+from app.services.executor import InferenceExecutor
+from app.services.llm import LLMService, GenerationStats
+from app.core.metrics import LLM_BATCH_SIZE, LLM_BATCH_QUEUE_WAIT
+from app.core.logging import logger
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass
+class _PendingGeneration:
+    """A prompt waiting to be batched."""
+    messages: List[Dict[str, str]]
+    max_new_tokens: int
+    loop: asyncio.AbstractEventLoop
+    stats: Optional[GenerationStats] = None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class GenerationBatcher:
+    """Collects concurrent prompts into batched LLMService.generate_batch calls.
+    
+    Batches run through the executor's LLM pool, so a batch holds one LLM
+    concurrency slot and shows up in the in-flight gauge like any generation.
+    """
+    
+    def __init__(
+        self,
+        llm: LLMService,
+        executor: InferenceExecutor,
+        max_batch_size: Optional[int] = None,
+        window_ms: Optional[float] = None
+    ):
+        self.llm = llm
+        self.executor = executor
+        self.max_batch_size = max_batch_size or settings.llm_batch_max_size
+        self.window = (
+            settings.llm_batch_window_ms if window_ms is None else window_ms
+        ) / 1000.0
+        
+        self._queue: "queue.Queue[Optional[_PendingGeneration]]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of prompts waiting for a batch."""
+        return self._queue.qsize()
+    
+    def _ensure_started(self):
+        """Start the scheduler thread on first use."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run,
+                        name="llm-batcher",
+                        daemon=True
+                    )
+                    self._thread.start()
+    
+    async def submit(
+        self,
+        messages: List[Dict[str, str]],
+        max_new_tokens: int,
+        stats: Optional[GenerationStats] = None
+    ) -> str:
+        """Queue a prompt and wait for its generated text.
+        
+        ``stats`` receives the token counts and timings of the batch the prompt ran in.
+        """
+        self._ensure_started()
+        pending = _PendingGeneration(
+            messages, max_new_tokens, asyncio.get_running_loop(), stats
+        )
+        self._queue.put(pending)
+        return await asyncio.wrap_future(pending.future)
+    
+    def _collect(self) -> Optional[List[_PendingGeneration]]:
+        """Block for the first prompt, then gather more until the window closes."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Let the current batch finish, stop on the next round
+                self._queue.put(None)
+                break
+            batch.append(item)
+        
+        return batch
+    
+    def _run(self):
+        """Scheduler loop."""
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            self._process(batch)
+    
+    def _process(self, batch: List[_PendingGeneration]):
+        """Run one batched generation and hand results back."""
+        # Drop requests whose caller went away while queued
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        
+        started = time.monotonic()
+        for item in batch:
+            LLM_BATCH_QUEUE_WAIT.observe(started - item.enqueued_at)
+        LLM_BATCH_SIZE.observe(len(batch))
+        
+        stats = GenerationStats()
+        try:
+            # Prompts arriving meanwhile queue up for the next batch
+            responses = asyncio.run_coroutine_threadsafe(
+                self.executor.run_llm(
+                    self.llm.generate_batch,
+                    [item.messages for item in batch],
+                    [item.max_new_tokens for item in batch],
+                    stats
+                ),
+                batch[0].loop
+            ).result()
+        except Exception as e:
+            logger.error(f"Batched generation failed: {str(e)}", exc_info=True)
+            for item in batch:
+                item.future.set_exception(e)
+            return
+        
+        logger.debug(
+            f"Generated batch of {len(batch)} in {time.monotonic() - started:.2f}s"
+        )
+        for row, (item, response) in enumerate(zip(batch, responses)):
+            if item.stats is not None:
+                vars(item.stats).update(vars(stats))
+                item.stats.stop_reasons = stats.stop_reasons[row:row + 1]
+            item.future.set_result(response)
+    
+    def shutdown(self, timeout: Optional[float] = None):
+        """Stop the scheduler thread after the current batch."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,328 @@
+import os
+import sqlite3
+import threading
+import time
+import faiss
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+from app.models.responses import ChatResponse
+from app.core.metrics import RESPONSE_CACHE_REQUESTS, EMBEDDING_CACHE_REQUESTS, CACHE_HIT_RATIO
+from app.core.logging import logger
+from app.core.config import get_settings
+
+settings = get_settings()
+
+CacheKey = Tuple[str, int, int]
+
+
+@dataclass
+class _CacheEntry:
+    """A cached response and its semantic index id."""
+    response: ChatResponse
+    expires_at: float
+    vector_id: Optional[int] = None
+
+
+class ResponseCache:
+    """Two-level response cache: exact query text, then query embedding similarity."""
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        similarity_threshold: Optional[float] = None
+    ):
+        self.max_entries = max_entries or settings.response_cache_max_entries
+        self.ttl = ttl or settings.response_cache_ttl
+        self.similarity_threshold = (
+            similarity_threshold or settings.semantic_cache_threshold
+        )
+        
+        self._entries: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+        self._keys_by_id: Dict[int, CacheKey] = {}
+        self._index = None
+        self._next_id = 0
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalize query text for exact matching."""
+        return " ".join(query.lower().split())
+    
+    def _key(self, query: str, top_k: int, max_tokens: int) -> CacheKey:
+        return (self.normalize(query), top_k, max_tokens)
+    
+    def validate(self, fingerprint: str):
+        """Drop everything if the knowledge base changed since entries were cached."""
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                if self._entries:
+                    logger.info("Knowledge base changed, clearing response cache")
+                self._clear()
+                self._fingerprint = fingerprint
+    
+    def get_exact(
+        self,
+        query: str,
+        top_k: int,
+        max_tokens: int
+    ) -> Optional[ChatResponse]:
+        """Look up a response by normalized query text."""
+        key = self._key(query, top_k, max_tokens)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                return None
+            
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+        
+        RESPONSE_CACHE_REQUESTS.labels(result="exact_hit").inc()
+        self._record_hit_ratio()
+        return entry.response
+    
+    def get_semantic(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        max_tokens: int,
+        candidates: int = 8
+    ) -> Optional[ChatResponse]:
+        """Look up a response for a similar, previously answered query."""
+        with self._lock:
+            if self._index is not None and self._index.ntotal > 0:
+                query = query_embedding.reshape(1, -1).astype("float32")
+                scores, ids = self._index.search(
+                    query, min(candidates, self._index.ntotal)
+                )
+                now = time.monotonic()
+                
+                for score, vector_id in zip(scores[0], ids[0]):
+                    if vector_id < 0 or score < self.similarity_threshold:
+                        break
+                    
+                    key = self._keys_by_id.get(int(vector_id))
+                    if key is None or key[1:] != (top_k, max_tokens):
+                        continue
+                    
+                    entry = self._entries[key]
+                    if entry.expires_at < now:
+                        self._remove(key)
+                        continue
+                    
+                    self._entries.move_to_end(key)
+                    self.semantic_hits += 1
+                    RESPONSE_CACHE_REQUESTS.labels(result="semantic_hit").inc()
+                    self._record_hit_ratio()
+                    return entry.response
+            
+            self.misses += 1
+        
+        RESPONSE_CACHE_REQUESTS.labels(result="miss").inc()
+        self._record_hit_ratio()
+        return None
+    
+    def _record_hit_ratio(self):
+        """Export the hit ratio since process start as a gauge."""
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        if lookups:
+            CACHE_HIT_RATIO.labels(cache="response").set(hits / lookups)
+    
+    def put(
+        self,
+        query: str,
+        top_k: int,
+        max_tokens: int,
+        query_embedding: np.ndarray,
+        response: ChatResponse
+    ):
+        """Cache a response under both its text and its embedding."""
+        key = self._key(query, top_k, max_tokens)
+        vector = query_embedding.reshape(1, -1).astype("float32")
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            
+            vector_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([vector_id], dtype="int64"))
+            self._keys_by_id[vector_id] = key
+            self._entries[key] = _CacheEntry(
+                response=response,
+                expires_at=time.monotonic() + self.ttl,
+                vector_id=vector_id
+            )
+            
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key: CacheKey):
+        """Remove an entry from both levels (lock must be held)."""
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry.vector_id is not None:
+            self._keys_by_id.pop(entry.vector_id, None)
+            self._index.remove_ids(np.array([entry.vector_id], dtype="int64"))
+    
+    def _clear(self):
+        """Remove all entries (lock must be held)."""
+        self._entries.clear()
+        self._keys_by_id.clear()
+        if self._index is not None:
+            self._index.reset()
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters."""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": (
+                (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+            )
+        }
+
+
+class EmbeddingCache:
+    """LRU cache of text embeddings, optionally backed by a SQLite file.
+    
+    Keys are built by the caller and must include everything the vector
+    depends on (model, backend, normalization, text).
+    """
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        path: Optional[str] = None
+    ):
+        self.max_entries = max_entries or settings.embedding_cache_size
+        self.path = Path(path) if path else None
+        
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """SQLite connection of this process (lock must be held).
+        
+        Opened lazily per process: a connection must not cross a fork.
+        """
+        if self.path is None:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+    
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up several keys, None for misses."""
+        found: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                elif self.path is not None:
+                    row = self._connection().execute(
+                        "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        vector = np.frombuffer(row[0], dtype="float32")
+                        self._insert(key, vector)
+                found.append(vector)
+            
+            hits = sum(vector is not None for vector in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        
+        if hits:
+            EMBEDDING_CACHE_REQUESTS.labels(result="hit").inc(hits)
+        if len(keys) - hits:
+            EMBEDDING_CACHE_REQUESTS.labels(result="miss").inc(len(keys) - hits)
+        if self.hits + self.misses:
+            CACHE_HIT_RATIO.labels(cache="embedding").set(
+                self.hits / (self.hits + self.misses)
+            )
+        return found
+    
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        """Cache vectors, one row per key."""
+        vectors = np.asarray(vectors, dtype="float32")
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                # Copy so cached rows do not keep the whole batch alive
+                self._insert(key, vector.copy())
+            db = self._connection()
+            if db is not None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in zip(keys, vectors)]
+                )
+                db.commit()
+    
+    def _insert(self, key: str, vector: np.ndarray):
+        """Add to the in-memory LRU (lock must be held)."""
+        vector.setflags(write=False)
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Remove all entries, including persisted ones."""
+        with self._lock:
+            self._entries.clear()
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM embeddings")
+                db.commit()
+    
+    def close(self):
+        """Close the SQLite file."""
+        with self._lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "persistent": self.path is not None
+        }
@@ -1,48 +1,165 @@
 import time
 import numpy as np
-from typing import Optional, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, AsyncIterator
 from app.services.embeddings import EmbeddingService
 from app.services.faiss_db import FAISSDatabase
-from app.services.llm import LLMService
-from app.utils.text_processing import extract_password_context
-from app.models.responses import ChatResponse, SearchResult
+from app.services.knowledge_base import KnowledgeBase
+from app.services.llm import LLMService, GenerationStats
+from app.services.inference_client import RemoteEmbeddingService, RemoteLLMService
+from app.services.executor import InferenceExecutor, QueueFullError
+from app.services.batching import GenerationBatcher
+from app.services.cache import ResponseCache
+from app.services.lexical import reciprocal_rank_fusion
+from app.services.context import ContextBuilder
+from app.services.routing import DirectAnswerRouter
+from app.models.responses import (
+    ChatResponse, SearchResult, SearchResponse, BatchChatResponse, BatchItemResult
+)
+from app.core.metrics import StageTimer, REQUEST_LATENCY, RESPONSE_SOURCE
+from app.core.startup import startup_timeline
 from app.core.logging import logger
 from app.core.config import get_settings
 
 settings = get_settings()
 
 
+def candidate_count(top_k: int, router: DirectAnswerRouter) -> int:
+    """Vector hits fetched per query, more when they get fused with BM25 or routed."""
+    count = top_k
+    if settings.hybrid_search_enabled:
+        count = max(top_k, settings.hybrid_candidates)
+    return router.candidate_count(count)
+
+
 class ChatbotService:
     """Main chatbot orchestration service."""
     
     def __init__(self):
-        self.embeddings = EmbeddingService()
-        self.database = FAISSDatabase()
-        self.llm = LLMService()
+        if settings.inference_mode == "remote":
+            # Models live in the inference server process
+            self.embeddings = RemoteEmbeddingService()
+            self.llm = RemoteLLMService()
+        else:
+            self.embeddings = EmbeddingService()
+            self.llm = LLMService()
+        self.knowledge_base = KnowledgeBase()
+        self.executor = InferenceExecutor()
+        self.batcher = GenerationBatcher(self.llm, self.executor)
+        self.cache = ResponseCache()
+        self.context_builder = ContextBuilder(lambda: self.llm.text_tokenizer)
+        self.router = DirectAnswerRouter()
         
+    @property
+    def database(self) -> FAISSDatabase:
+        """The knowledge base version new requests search."""
+        return self.knowledge_base.database
+    
     def _perform_search(
         self,
         query: str,
-        top_k: int
-    ) -> tuple[List[Dict[str, Any]], np.ndarray, np.ndarray]:
-        """Perform similarity search."""
+        top_k: int,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Perform similarity search, returning the hits and the hit to answer directly, if any."""
         # Generate query embedding
-        query_embedding = self.embeddings.encode_query(query)
+        if query_embedding is None:
+            query_embedding = self.embeddings.encode_query(query)
+        
+        # Search FAISS, hits are resolved against the same version
+        with self.knowledge_base.acquire() as database:
+            scores, indices = database.search(
+                query_embedding, k=self._candidate_count(top_k)
+            )
+            results = self._retrieve(
+                database, query, query_embedding, scores, indices, top_k
+            )
+            direct = self.router.route(scores, indices, database.get_row)
+        return results, direct
+    
+    def _candidate_count(self, top_k: int) -> int:
+        """Vector hits fetched per query by this service."""
+        return candidate_count(top_k, self.router)
+    
+    def _retrieve(
+        self,
+        database: FAISSDatabase,
+        query: str,
+        query_embedding: np.ndarray,
+        scores: np.ndarray,
+        indices: np.ndarray,
+        top_k: int,
+        min_score: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Fuse vector hits with BM25 hits by reciprocal rank fusion."""
+        if not settings.hybrid_search_enabled:
+            return self._collect_results(database, scores[:top_k], indices[:top_k])
+        
+        vector_scores = {
+            int(idx): float(score) for score, idx in zip(scores, indices) if idx >= 0
+        }
+        _, lexical_ids = database.lexical.search(
+            query, k=settings.hybrid_candidates
+        )
+        fused = reciprocal_rank_fusion(
+            [list(vector_scores), lexical_ids.tolist()],
+            k=settings.rrf_k
+        )[:top_k]
         
-        # Search FAISS
-        scores, indices = self.database.search(query_embedding, k=top_k)
+        # Lexical-only hits are reported with their exact vector similarity
+        missing = [idx for idx, _ in fused if idx not in vector_scores]
+        if missing:
+            similarities = database.similarity(query_embedding, np.array(missing))
+            if similarities is not None:
+                vector_scores.update(zip(missing, similarities.tolist()))
         
-        # Get metadata
+        results = []
+        for idx, fused_score in fused:
+            score = vector_scores.get(idx, 0.0)
+            if min_score is not None and score < min_score:
+                continue
+            hit = database.get_hit(idx)
+            hit["score"] = score
+            hit["rrf_score"] = fused_score
+            results.append(hit)
+        return results
+    
+    def _collect_results(
+        self,
+        database: FAISSDatabase,
+        scores: np.ndarray,
+        indices: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        """Attach metadata to the hits of one query."""
         results = []
         for score, idx in zip(scores, indices):
             if idx >= 0:
-                metadata = self.database.metadata[idx]
-                results.append({
-                    **metadata,
-                    "score": float(score)
-                })
-        
-        return results, scores, indices
+                hit = database.get_hit(idx)
+                hit["score"] = float(score)
+                results.append(hit)
+        return results
+    
+    def _search_batch(
+        self,
+        queries: List[str],
+        query_embeddings: np.ndarray,
+        top_k: int
+    ) -> tuple[List[List[Dict[str, Any]]], List[Optional[Dict[str, Any]]]]:
+        """Search all queries of a batch with one FAISS call."""
+        with self.knowledge_base.acquire() as database:
+            scores, indices = database.search_batch(
+                query_embeddings, k=self._candidate_count(top_k)
+            )
+            batch_results = [
+                self._retrieve(database, query, query_embedding, row_scores, row_indices, top_k)
+                for query, query_embedding, row_scores, row_indices
+                in zip(queries, query_embeddings, scores, indices)
+            ]
+            directs = [
+                self.router.route(row_scores, row_indices, database.get_row)
+                for row_scores, row_indices in zip(scores, indices)
+            ]
+        return batch_results, directs
     
     def _prepare_search_results(
         self,
@@ -59,14 +176,60 @@ class ChatbotService:
             ))
         return search_results
     
+    async def _generate(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        stats: Optional[GenerationStats] = None
+    ) -> str:
+        """Generate a response, batched with concurrent requests if enabled."""
+        # In remote mode the inference server does the batching
+        if settings.llm_batching_enabled and settings.inference_mode == "local":
+            return await self.batcher.submit(messages, max_tokens, stats)
+        return await self.executor.run_llm(self.llm.generate, messages, max_tokens, stats)
+    
+    @staticmethod
+    def _add_generation_timings(timer: StageTimer, stats: GenerationStats):
+        """Add the LLM stages, already exported by the LLM service."""
+        timer.add("template", stats.template_time, observe=False)
+        timer.add("prefill", stats.prefill_time, observe=False)
+        timer.add("decode", stats.decode_time, observe=False)
+    
+    @staticmethod
+    def _stop_reason(stats: GenerationStats) -> Optional[str]:
+        """Why generation of a single response ended."""
+        return stats.stop_reasons[0] if stats.stop_reasons else None
+    
+    def _from_cache(
+        self,
+        cached: ChatResponse,
+        query: str,
+        start_time: float,
+        timer: Optional[StageTimer] = None
+    ) -> ChatResponse:
+        """Build a response for this query from a cached one."""
+        logger.info("Serving response from cache")
+        processing_time = time.time() - start_time
+        REQUEST_LATENCY.labels(endpoint="chat").observe(processing_time)
+        timings = None
+        if timer is not None:
+            timings = {**timer.timings, "total": processing_time}
+        return cached.model_copy(update={
+            "query": query,
+            "processing_time": processing_time,
+            "timings": timings
+        })
+    
     async def process_query(
         self,
         query: str,
         top_k: Optional[int] = None,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        include_timings: bool = False
     ) -> ChatResponse:
         """Process a chat query and return response."""
         start_time = time.time()
+        timer = StageTimer()
         
         # Use defaults if not provided
         top_k = top_k or settings.top_k_results
@@ -75,54 +238,410 @@ class ChatbotService:
         logger.info(f"Processing query: {query[:100]}...")
         
         try:
-            # Perform search
-            results, scores, indices = self._perform_search(query, top_k)
-            
-            # Extract context
-            context = extract_password_context(
-                results,
-                settings.password_keywords
-            )
-            
-            # Build messages
-            messages = self.llm.build_messages(query, context)
+            if settings.response_cache_enabled:
+                with self.knowledge_base.acquire() as database:
+                    self.cache.validate(database.fingerprint)
+                cached = self.cache.get_exact(query, top_k, max_tokens)
+                if cached is not None:
+                    return self._from_cache(
+                        cached, query, start_time, timer if include_timings else None
+                    )
             
-            # Generate response
-            response_text = self.llm.generate(messages, max_tokens)
+            async with self.executor.admit():
+                # Generate query embedding
+                with timer.stage("embed"):
+                    query_embedding = await self.executor.run_cpu(
+                        self.embeddings.encode_query, query
+                    )
+                
+                # A similar question was answered recently, skip the LLM
+                if settings.response_cache_enabled:
+                    cached = self.cache.get_semantic(query_embedding, top_k, max_tokens)
+                    if cached is not None:
+                        return self._from_cache(
+                            cached, query, start_time, timer if include_timings else None
+                        )
+                
+                # Perform search
+                with timer.stage("search"):
+                    results, direct = await self.executor.run_cpu(
+                        self._perform_search, query, top_k, query_embedding
+                    )
+                
+                if direct is not None:
+                    # Confident knowledge base match, its stored answer is the response
+                    source, stop_reason = "kb", None
+                    context = self.context_builder.passage_text(direct)
+                    response_text = self.router.respond(direct)
+                else:
+                    # Extract context and build messages
+                    with timer.stage("context"):
+                        context = self.context_builder.build(results)
+                        messages = self.llm.build_messages(query, context)
+                    
+                    # Generate response (including the wait for an LLM slot)
+                    stats = GenerationStats()
+                    with timer.stage("generate"):
+                        response_text = await self._generate(messages, max_tokens, stats)
+                    self._add_generation_timings(timer, stats)
+                    source, stop_reason = "llm", self._stop_reason(stats)
             
             # Prepare response
             processing_time = time.time() - start_time
+            REQUEST_LATENCY.labels(endpoint="chat").observe(processing_time)
+            RESPONSE_SOURCE.labels(source=source).inc()
             
-            return ChatResponse(
+            response = ChatResponse(
                 response=response_text,
                 query=query,
                 context_used=context if context else None,
                 search_results=self._prepare_search_results(results),
-                processing_time=processing_time
+                processing_time=processing_time,
+                stop_reason=stop_reason,
+                source=source
             )
             
+            if settings.response_cache_enabled:
+                self.cache.put(query, top_k, max_tokens, query_embedding, response)
+            
+            if include_timings:
+                response = response.model_copy(update={
+                    "timings": {**timer.timings, "total": processing_time}
+                })
+            return response
+            
+        except QueueFullError:
+            raise
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}", exc_info=True)
             raise
     
-    def warmup(self):
-        """Warmup models by loading them."""
-        logger.info("Warming up models...")
+    async def stream_query(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        include_timings: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Process a chat query, yielding events as the response is generated."""
+        start_time = time.time()
+        timer = StageTimer()
+        
+        # Use defaults if not provided
+        top_k = top_k or settings.top_k_results
+        max_tokens = max_tokens or settings.max_tokens
+        
+        logger.info(f"Streaming query: {query[:100]}...")
+        
+        async with self.executor.admit():
+            # Generate query embedding
+            with timer.stage("embed"):
+                query_embedding = await self.executor.run_cpu(
+                    self.embeddings.encode_query, query
+                )
+            
+            # Perform search
+            with timer.stage("search"):
+                results, direct = await self.executor.run_cpu(
+                    self._perform_search, query, top_k, query_embedding
+                )
+            
+            # Send retrieved documents before generation starts
+            yield {
+                "event": "search_results",
+                "data": [
+                    result.model_dump(mode="json")
+                    for result in self._prepare_search_results(results)
+                ]
+            }
+            
+            parts = []
+            time_to_first_token = None
+            if direct is not None:
+                # Confident knowledge base match, send its stored answer in one event
+                source, stop_reason = "kb", None
+                context = self.context_builder.passage_text(direct)
+                text = self.router.respond(direct)
+                time_to_first_token = time.time() - start_time
+                parts.append(text)
+                yield {"event": "token", "data": {"text": text}}
+            else:
+                # Extract context and build messages
+                with timer.stage("context"):
+                    context = self.context_builder.build(results)
+                    messages = self.llm.build_messages(query, context)
+                
+                # Stream response
+                stats = GenerationStats()
+                with timer.stage("generate"):
+                    async for text in self.executor.stream_llm(
+                        self.llm.stream, messages, max_tokens, stats
+                    ):
+                        if time_to_first_token is None:
+                            time_to_first_token = time.time() - start_time
+                        parts.append(text)
+                        yield {"event": "token", "data": {"text": text}}
+                self._add_generation_timings(timer, stats)
+                source, stop_reason = "llm", self._stop_reason(stats)
         
-        # Load all models
+        processing_time = time.time() - start_time
+        REQUEST_LATENCY.labels(endpoint="stream").observe(processing_time)
+        RESPONSE_SOURCE.labels(source=source).inc()
+        
+        done = {
+            "response": "".join(parts),
+            "query": query,
+            "context_used": context if context else None,
+            "time_to_first_token": time_to_first_token,
+            "processing_time": processing_time,
+            "stop_reason": stop_reason,
+            "source": source
+        }
+        if include_timings:
+            done["timings"] = {**timer.timings, "total": processing_time}
+        yield {"event": "done", "data": done}
+    
+    def _search_documents(
+        self,
+        query: str,
+        top_k: int,
+        nprobe: Optional[int],
+        oversample: Optional[int],
+        min_score: Optional[float]
+    ) -> List[Dict[str, Any]]:
+        """Embed a query and search with explicit search options."""
+        query_embedding = self.embeddings.encode_query(query)
+        if min_score is None:
+            min_score = settings.search_min_score
+        with self.knowledge_base.acquire() as database:
+            scores, indices = database.search(
+                query_embedding,
+                k=self._candidate_count(top_k),
+                nprobe=nprobe,
+                oversample=oversample,
+                min_score=min_score
+            )
+            return self._retrieve(
+                database, query, query_embedding, scores, indices, top_k, min_score
+            )
+    
+    async def search(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        oversample: Optional[int] = None,
+        min_score: Optional[float] = None
+    ) -> SearchResponse:
+        """Retrieve documents for a query without generating a response."""
+        start_time = time.time()
+        top_k = top_k or settings.top_k_results
+        
+        # Search does not need an LLM slot, only a CPU thread
+        results = await self.executor.run_cpu(
+            self._search_documents, query, top_k, nprobe, oversample, min_score
+        )
+        
+        processing_time = time.time() - start_time
+        REQUEST_LATENCY.labels(endpoint="search").observe(processing_time)
+        return SearchResponse(
+            query=query,
+            results=self._prepare_search_results(results),
+            processing_time=processing_time
+        )
+    
+    async def process_batch(
+        self,
+        queries: List[str],
+        top_k: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        retrieval_only: bool = False
+    ) -> BatchChatResponse:
+        """Process several queries with one embedding call, one search and batched generation."""
+        start_time = time.time()
+        timer = StageTimer()
+        
+        # Use defaults if not provided
+        top_k = top_k or settings.top_k_results
+        max_tokens = max_tokens or settings.max_tokens
+        
+        logger.info(f"Processing batch of {len(queries)} queries")
+        
+        items = [
+            BatchItemResult(index=i, query=query)
+            for i, query in enumerate(queries)
+        ]
+        
+        async with self.executor.admit():
+            # Embed all queries in one forward pass
+            with timer.stage("embed"):
+                query_embeddings = await self.executor.run_cpu(
+                    self.embeddings.encode, queries, True, len(queries)
+                )
+            
+            # One multi-row search
+            with timer.stage("search"):
+                batch_results, directs = await self.executor.run_cpu(
+                    self._search_batch, queries, query_embeddings, top_k
+                )
+            
+            # Extract context, confident knowledge base matches are answered directly
+            with timer.stage("context"):
+                pending, contexts = [], []
+                for item, results, direct in zip(items, batch_results, directs):
+                    item.search_results = self._prepare_search_results(results)
+                    if direct is not None and not retrieval_only:
+                        item.context_used = self.context_builder.passage_text(direct)
+                        item.response = self.router.respond(direct)
+                        item.source = "kb"
+                        continue
+                    context = self.context_builder.build(results)
+                    item.context_used = context if context else None
+                    pending.append(item)
+                    contexts.append(context)
+            
+            if not retrieval_only:
+                RESPONSE_SOURCE.labels(source="kb").inc(len(items) - len(pending))
+                with timer.stage("generate"):
+                    await self._generate_batch(pending, contexts, max_tokens, timer)
+        
+        processing_time = time.time() - start_time
+        REQUEST_LATENCY.labels(endpoint="batch").observe(processing_time)
+        
+        return BatchChatResponse(
+            results=items,
+            timings={**timer.timings, "total": processing_time},
+            processing_time=processing_time
+        )
+    
+    async def _generate_batch(
+        self,
+        items: List[BatchItemResult],
+        contexts: List[str],
+        max_tokens: int,
+        timer: StageTimer
+    ):
+        """Generate responses in chunks of the LLM batch size, recording per-item errors."""
+        chunk_size = settings.llm_batch_max_size
+        for chunk_start in range(0, len(items), chunk_size):
+            chunk = items[chunk_start:chunk_start + chunk_size]
+            batch_messages = [
+                self.llm.build_messages(item.query, context)
+                for item, context in zip(chunk, contexts[chunk_start:chunk_start + chunk_size])
+            ]
+            stats = GenerationStats()
+            try:
+                texts = await self.executor.run_llm(
+                    self.llm.generate_batch,
+                    batch_messages,
+                    [max_tokens] * len(chunk),
+                    stats
+                )
+            except Exception as e:
+                logger.error(f"Batch generation failed: {str(e)}", exc_info=True)
+                for item in chunk:
+                    item.error = str(e)
+                continue
+            self._add_generation_timings(timer, stats)
+            RESPONSE_SOURCE.labels(source="llm").inc(len(chunk))
+            for row, (item, text) in enumerate(zip(chunk, texts)):
+                item.response = text
+                item.source = "llm"
+                if row < len(stats.stop_reasons):
+                    item.stop_reason = stats.stop_reasons[row]
+    
+    def load_retrieval(self):
+        """Load what search needs: the embedding model and the FAISS artifacts."""
+        _ = self.embeddings.model
+        # Leased, so a concurrent reload cannot close it while it loads
+        with self.knowledge_base.acquire() as database:
+            database.load()
+    
+    def load_models(self):
+        """Load all models and artifacts without running them."""
+        self.load_retrieval()
+        _ = self.llm.model
+    
+    def _warmup_embeddings(self):
         _ = self.embeddings.model
-        _ = self.database.index
+        # Dummy forward pass for lazy kernel initialization
+        with startup_timeline.phase("forward:embeddings"):
+            self.embeddings.encode(["warmup"], use_cache=False)
+    
+    def _warmup_database(self):
+        with self.knowledge_base.acquire() as database:
+            database.load()
+            with startup_timeline.phase("forward:search"):
+                database.search(np.zeros(database.index.d, dtype="float32"), k=1)
+                if settings.hybrid_search_enabled:
+                    database.lexical.search("warmup", k=1)
+    
+    def _warmup_llm(self):
         _ = self.llm.model
+        # Prefill the system prompt once for all requests
+        with startup_timeline.phase("forward:llm_prefix"):
+            self.llm.warmup_prefix_cache()
+        with startup_timeline.phase("forward:llm"):
+            self.llm.generate(self.llm.build_messages("warmup"), 1)
+        _ = self.context_builder.separator_tokens
+    
+    def warmup(self) -> Dict[str, Dict[str, Any]]:
+        """Load and exercise all components in parallel, returning per-component timings."""
+        logger.info("Warming up models...")
+        
+        components = {
+            "embeddings": self._warmup_embeddings,
+            "database": self._warmup_database,
+            "llm": self._warmup_llm
+        }
+        report = {name: {} for name in components}
+        
+        def run(name: str):
+            start_time = time.perf_counter()
+            try:
+                components[name]()
+                report[name]["ok"] = True
+            except Exception as e:
+                logger.error(f"Warmup of {name} failed: {str(e)}", exc_info=True)
+                report[name].update(ok=False, error=str(e))
+            report[name]["warmup_time"] = time.perf_counter() - start_time
+        
+        with ThreadPoolExecutor(
+            max_workers=len(components), thread_name_prefix="warmup"
+        ) as pool:
+            list(pool.map(run, components))
+        
+        status = self.component_status()
+        report["embeddings"]["load_time"] = status["embeddings"]["load_time"]
+        report["database"]["load_time"] = sum(
+            artifact["load_time"] or 0.0 for artifact in status["database"].values()
+        )
+        report["llm"]["load_time"] = status["llm"]["load_time"]
         
-        logger.info("✅ All models warmed up")
+        for name, timings in report.items():
+            logger.info(
+                f"Warmup {name}: {'ok' if timings['ok'] else 'failed'}, "
+                f"load {timings['load_time'] or 0.0:.2f}s, total {timings['warmup_time']:.2f}s"
+            )
+        
+        if all(timings["ok"] for timings in report.values()):
+            logger.info("✅ All models warmed up")
+        return report
+    
+    def shutdown(self):
+        """Release executor, batching and knowledge base watcher threads."""
+        self.knowledge_base.stop_watcher()
+        self.batcher.shutdown(timeout=5)
+        self.executor.shutdown(wait=False)
+    
+    def component_status(self) -> Dict[str, Any]:
+        """Load state of every component, never triggers a load."""
+        return {
+            "embeddings": self.embeddings.load_status(),
+            "database": self.database.load_status(),
+            "llm": self.llm.load_status()
+        }
     
     def is_ready(self) -> bool:
-        """Check if all services are ready."""
-        try:
-            return (
-                self.embeddings.model is not None and
-                self.database.is_loaded() #and
-                #self.llm.is_loaded()
-            )
-        except Exception:
-            return False
\ No newline at end of file
+        """Check if search can be served, without loading anything."""
+        return self.embeddings.is_loaded() and self.database.is_loaded()
@@ -0,0 +1,173 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+from app.core.metrics import CONTEXT_TOKENS
+from app.core.config import get_settings
+
+settings = get_settings()
+
+PASSAGE_SEPARATOR = "\n\n"
+# A passage cut shorter than this is not worth its prompt tokens
+MIN_PASSAGE_TOKENS = 32
+
+
+class _Passage:
+    """A search hit rendered as context text, with its LLM token ids."""
+
+    def __init__(self, text: str, token_ids: List[int], relevance: float):
+        self.text = text
+        self.token_ids = token_ids
+        self.token_set: Set[int] = set(token_ids)
+        self.relevance = relevance
+
+
+def _overlap(a: _Passage, b: _Passage) -> float:
+    """Jaccard similarity of the token sets, how much of b repeats a."""
+    if not a.token_set or not b.token_set:
+        return 0.0
+    return len(a.token_set & b.token_set) / len(a.token_set | b.token_set)
+
+
+class ContextBuilder:
+    """Assembles the LLM context from all search hits under a prompt-token budget.
+
+    Passages are picked by maximal marginal relevance: each step takes the
+    hit with the best trade-off between its search score and its token
+    overlap with the passages already taken, so near-duplicate answers do
+    not use up the budget. A passage longer than the budget left is passed
+    over for the remaining hits; the best of those is cut to fill the rest.
+    Token ids of each passage are cached, keyed by its text, so they stay
+    valid across knowledge base reloads.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Callable[[], Any],
+        max_tokens: Optional[int] = None,
+        mmr_lambda: Optional[float] = None,
+        min_score: Optional[float] = None,
+        cache_size: Optional[int] = None
+    ):
+        self._tokenizer = tokenizer
+        self.max_tokens = max_tokens if max_tokens is not None else settings.context_max_tokens
+        self.mmr_lambda = mmr_lambda if mmr_lambda is not None else settings.context_mmr_lambda
+        self.min_score = min_score if min_score is not None else settings.context_min_score
+        self.cache_size = cache_size if cache_size is not None else settings.context_token_cache_size
+
+        self._token_cache: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._separator_tokens: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def passage_text(result: Mapping[str, Any]) -> str:
+        """Context text of one search hit."""
+        subject = str(result.get("subject", "") or "").strip()
+        answer = str(result.get("answer", "") or "").strip()
+        if subject and answer:
+            return f"{subject} — {answer}"
+        return subject or answer
+
+    def _encode(self, text: str) -> List[int]:
+        return self._tokenizer()(text, add_special_tokens=False)["input_ids"]
+
+    def _token_ids(self, text: str) -> List[int]:
+        """Token ids of a passage, tokenized once per distinct text."""
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            token_ids = self._token_cache.get(key)
+            if token_ids is not None:
+                self._token_cache.move_to_end(key)
+                self.hits += 1
+                return token_ids
+            self.misses += 1
+
+        token_ids = self._encode(text)
+        if self.cache_size:
+            with self._lock:
+                self._token_cache[key] = token_ids
+                while len(self._token_cache) > self.cache_size:
+                    self._token_cache.popitem(last=False)
+        return token_ids
+
+    @property
+    def separator_tokens(self) -> int:
+        """Tokens the separator between two passages adds."""
+        if self._separator_tokens is None:
+            self._separator_tokens = len(self._encode(PASSAGE_SEPARATOR))
+        return self._separator_tokens
+
+    def _passages(self, results: List[Dict[str, Any]]) -> List[_Passage]:
+        passages = []
+        seen: Set[str] = set()
+        for result in results:
+            relevance = float(result.get("score", 0.0))
+            if self.min_score is not None and relevance < self.min_score:
+                continue
+            text = self.passage_text(result)
+            # The same ticket text can be indexed more than once
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            passages.append(_Passage(text, self._token_ids(text), relevance))
+        return passages
+
+    def _truncate(self, passage: _Passage, budget: int) -> str:
+        return self._tokenizer().decode(
+            passage.token_ids[:budget], skip_special_tokens=True
+        ).rstrip() + "..."
+
+    def build(self, results: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> str:
+        """Context text of the most useful, least redundant hits within the token budget."""
+        budget = max_tokens if max_tokens is not None else self.max_tokens
+        candidates = self._passages(results)
+        selected: List[_Passage] = []
+        # Passages that did not fit, with the position they would have taken
+        skipped: List[Tuple[int, _Passage]] = []
+        parts: List[str] = []
+        used = 0
+
+        while candidates and budget - used > 0:
+            best = max(candidates, key=lambda passage: (
+                self.mmr_lambda * passage.relevance
+                - (1 - self.mmr_lambda) * max(
+                    (_overlap(chosen, passage) for chosen in selected), default=0.0
+                )
+            ))
+            candidates.remove(best)
+
+            cost = len(best.token_ids) + (self.separator_tokens if parts else 0)
+            if used + cost <= budget:
+                parts.append(best.text)
+                selected.append(best)
+                used += cost
+                continue
+
+            # Too long for what is left, a later and shorter hit may still fit
+            skipped.append((len(parts), best))
+
+        # Fill the rest of the budget with the start of the best passage that did not fit
+        if skipped and budget - used > 0:
+            remaining = budget - used - (self.separator_tokens if parts else 0)
+            if remaining >= MIN_PASSAGE_TOKENS or not parts:
+                position, passage = skipped[0]
+                parts.insert(position, self._truncate(passage, max(remaining, 0)))
+                used = budget
+
+        CONTEXT_TOKENS.observe(used)
+        return PASSAGE_SEPARATOR.join(parts)
+
+    def stats(self) -> Dict[str, Any]:
+        """Token cache size and hit counts."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._token_cache),
+                "max_entries": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
@@ -1,37 +1,299 @@
-from sentence_transformers import SentenceTransformer
-from typing import List, Optional
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Union
 import numpy as np
+from app.services.cache import EmbeddingCache
+from app.services.loader import LazyResource, save_atomically
+from app.core.resources import get_thread_plan
+from app.core.startup import startup_timeline
 from app.core.logging import logger
 from app.core.config import get_settings
 
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
 settings = get_settings()
 
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+ONNX_CONFIG_FILE = "encoder.json"
+
+
+def export_onnx(model_name: str, output_dir: Path, quantize: bool = False) -> Path:
+    """Export a SentenceTransformer (transformer + mean pooling) to ONNX.
+
+    Writes the tokenizer, the fp32 graph and, with ``quantize``, a dynamically
+    quantized int8 graph. Returns the path of the graph to load.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = Path(output_dir)
+    model_path = output_dir / (ONNX_INT8_MODEL_FILE if quantize else ONNX_MODEL_FILE)
+    if model_path.exists():
+        return model_path
+
+    if not (output_dir / ONNX_MODEL_FILE).exists():
+        logger.info(f"Exporting {model_name} to ONNX in {output_dir} (first startup only)")
+        sentence_model = SentenceTransformer(model_name, device="cpu")
+        transformer = sentence_model[0]
+        auto_model = transformer.auto_model.eval()
+        tokenizer = transformer.tokenizer
+
+        pooling = sentence_model[1]
+        extra_modules = [type(module).__name__ for module in list(sentence_model)[2:]]
+        if not getattr(pooling, "pooling_mode_mean_tokens", False) or any(
+            name != "Normalize" for name in extra_modules
+        ):
+            raise ValueError(f"ONNX export supports mean-pooling models only: {model_name}")
+
+        tmp_dir = output_dir.with_name(f".{output_dir.name}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        sample = tokenizer(["ONNX export"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        with torch.no_grad():
+            torch.onnx.export(
+                auto_model,
+                tuple(sample[name] for name in input_names),
+                str(tmp_dir / ONNX_MODEL_FILE),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17
+            )
+        tokenizer.save_pretrained(str(tmp_dir))
+        with open(tmp_dir / ONNX_CONFIG_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                "model_name": model_name,
+                "max_seq_length": sentence_model.max_seq_length,
+                "input_names": input_names
+            }, f, indent=2)
+
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+        os.replace(tmp_dir, output_dir)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info("Quantizing ONNX embedding model to int8")
+        tmp_path = model_path.with_suffix(".tmp.onnx")
+        quantize_dynamic(
+            str(output_dir / ONNX_MODEL_FILE),
+            str(tmp_path),
+            weight_type=QuantType.QInt8
+        )
+        os.replace(tmp_path, model_path)
+
+    logger.info(f"Cached ONNX embedding model at {model_path}")
+    return model_path
+
+
+class OnnxEncoder:
+    """Runs an exported embedding model with onnxruntime on CPU.
+
+    ``encode`` matches the ``SentenceTransformer.encode`` arguments used by
+    ``EmbeddingService``, so both can back the same service.
+    """
+
+    def __init__(self, model_path: Path):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = Path(model_path).parent
+        with open(model_dir / ONNX_CONFIG_FILE, "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        self.max_seq_length = config["max_seq_length"]
+        self.input_names = config["input_names"]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        plan = get_thread_plan()
+        if plan is not None:
+            # onnxruntime keeps its own pool, sized once per session
+            options.intra_op_num_threads = plan.embedding_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = True,
+        show_progress_bar: bool = False
+    ) -> np.ndarray:
+        """Encode texts with mean pooling over the attention mask."""
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            hidden = self.session.run(
+                None,
+                {name: inputs[name].astype("int64") for name in self.input_names}
+            )[0]
+
+            mask = inputs["attention_mask"][..., None].astype("float32")
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype("float32"))
+
+        if not batches:
+            return np.empty((0, self.session.get_outputs()[0].shape[-1]), dtype="float32")
+        return np.vstack(batches)
+
 
 class EmbeddingService:
     """Service for generating text embeddings."""
     
-    def __init__(self, model_name: Optional[str] = None):
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None
+    ):
         self.model_name = model_name or settings.embedding_model
-        self._model = None
-        
+        self.backend = backend or settings.embedding_backend
+        if self.backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {self.backend}")
+        self._model = LazyResource("embeddings", self._load_model)
+        self.cache = (
+            EmbeddingCache(path=settings.embedding_cache_path)
+            if settings.embedding_cache_size > 0 else None
+        )
+    
     @property
-    def model(self) -> SentenceTransformer:
+    def onnx_dir(self) -> Path:
+        """Where the exported ONNX model of this embedding model lives."""
+        return Path(settings.embedding_onnx_dir) / self.model_name.replace("/", "--")
+    
+    @property
+    def local_model_dir(self) -> Optional[Path]:
+        """Where persist() saves the torch model, None without MODEL_CACHE_DIR."""
+        if not settings.model_cache_dir:
+            return None
+        return Path(settings.model_cache_dir) / "embeddings" / self.model_name.replace("/", "--")
+    
+    def _load_model(self) -> Union["SentenceTransformer", OnnxEncoder]:
+        """Load the embedding model for the configured backend."""
+        logger.info(f"Loading embedding model: {self.model_name} ({self.backend})")
+        if self.backend == "torch":
+            # Deferred so processes that never embed locally do not pay for torch
+            with startup_timeline.phase("import:sentence_transformers"):
+                from sentence_transformers import SentenceTransformer
+            
+            local_dir = self.local_model_dir
+            if local_dir is not None and local_dir.exists():
+                logger.info(f"Loading embedding model from {local_dir}")
+                model = SentenceTransformer(str(local_dir))
+            else:
+                model = SentenceTransformer(self.model_name)
+        else:
+            model_path = export_onnx(
+                self.model_name,
+                self.onnx_dir,
+                quantize=self.backend == "onnx-int8"
+            )
+            model = OnnxEncoder(model_path)
+        logger.info("Embedding model loaded successfully")
+        return model
+    
+    @property
+    def model(self) -> Union["SentenceTransformer", OnnxEncoder]:
         """Lazy load the embedding model."""
-        if self._model is None:
-            logger.info(f"Loading embedding model: {self.model_name}")
-            self._model = SentenceTransformer(self.model_name)
-            logger.info("Embedding model loaded successfully")
-        return self._model
-    
-    def encode(self, texts: List[str], normalize: bool = True) -> np.ndarray:
-        """Encode texts to embeddings."""
+        return self._model.get()
+    
+    def persist(self) -> Optional[Path]:
+        """Save the loaded model to MODEL_CACHE_DIR so later startups skip the hub.
+        
+        The ONNX backends already load their local export.
+        """
+        local_dir = self.local_model_dir
+        if local_dir is None or self.backend != "torch":
+            return None
+        save_atomically(self.model.save, local_dir)
+        return local_dir
+    
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Collapse whitespace, which the tokenizer ignores anyway."""
+        return " ".join(text.split())
+    
+    def _cache_key(self, text: str, normalize: bool) -> str:
+        return f"{self.model_name}|{self.backend}|{int(normalize)}|{text}"
+    
+    def _encode(
+        self,
+        texts: List[str],
+        normalize: bool,
+        batch_size: int
+    ) -> np.ndarray:
         embeddings = self.model.encode(
             texts,
+            batch_size=batch_size,
             normalize_embeddings=normalize,
             show_progress_bar=False
         )
         return embeddings.astype("float32")
     
+    def encode(
+        self,
+        texts: List[str],
+        normalize: bool = True,
+        batch_size: int = 32,
+        use_cache: bool = True
+    ) -> np.ndarray:
+        """Encode texts to embeddings, reusing cached vectors of repeated texts."""
+        if self.cache is None or not use_cache or not texts:
+            return self._encode(texts, normalize, batch_size)
+
+        texts = [self.normalize_text(text) for text in texts]
+        keys = [self._cache_key(text, normalize) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if not missing:
+            return np.vstack(cached)
+
+        # Encode each distinct missing text once
+        unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+        computed = self._encode(unique_texts, normalize, batch_size)
+        self.cache.put_many(
+            [self._cache_key(text, normalize) for text in unique_texts], computed
+        )
+
+        rows = {text: row for text, row in zip(unique_texts, computed)}
+        for i in missing:
+            cached[i] = rows[texts[i]]
+        return np.vstack(cached)
+    
     def encode_query(self, query: str) -> np.ndarray:
         """Encode a single query."""
-        return self.encode([query])[0]
\ No newline at end of file
+        return self.encode([query])[0]
+    
+    def is_loaded(self) -> bool:
+        """Check if model is loaded."""
+        return self._model.loaded
+    
+    def load_status(self) -> dict:
+        """Load state of the model, without loading it."""
+        return self._model.status()
@@ -0,0 +1,188 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, TypeVar
+from app.core.metrics import LLM_QUEUE_DEPTH, LLM_IN_FLIGHT
+from app.core.resources import apply_stage_limits, run_in_stage
+from app.core.logging import logger
+from app.core.config import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the admission queue cannot accept another request."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full, please retry later")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """Runs blocking model work off the event loop with bounded concurrency."""
+
+    def __init__(
+        self,
+        cpu_workers: Optional[int] = None,
+        llm_concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        retry_after: Optional[int] = None
+    ):
+        self.cpu_workers = cpu_workers or settings.cpu_executor_workers
+        self.llm_concurrency = llm_concurrency or settings.llm_max_concurrency
+        self.queue_size = settings.llm_queue_size if queue_size is None else queue_size
+        self.retry_after = retry_after or settings.queue_retry_after
+
+        self._cpu_executor = None
+        self._llm_executor = None
+        self._llm_semaphore = None
+        self._lock = threading.Lock()
+
+        # Requests admitted and not yet finished (running + waiting)
+        self._pending = 0
+        self._in_flight = 0
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of requests admitted at the same time."""
+        return self.llm_concurrency + self.queue_size
+
+    @property
+    def pending(self) -> int:
+        """Number of admitted requests (running and queued)."""
+        return self._pending
+
+    @property
+    def in_flight(self) -> int:
+        """Number of generations currently running."""
+        return self._in_flight
+
+    @property
+    def cpu_executor(self) -> ThreadPoolExecutor:
+        """Executor for embedding and FAISS search (lazy created)."""
+        if self._cpu_executor is None:
+            with self._lock:
+                if self._cpu_executor is None:
+                    self._cpu_executor = ThreadPoolExecutor(
+                        max_workers=self.cpu_workers,
+                        thread_name_prefix="cpu-worker"
+                    )
+        return self._cpu_executor
+
+    @property
+    def llm_executor(self) -> ThreadPoolExecutor:
+        """Executor for LLM generation (lazy created)."""
+        if self._llm_executor is None:
+            with self._lock:
+                if self._llm_executor is None:
+                    self._llm_executor = ThreadPoolExecutor(
+                        max_workers=self.llm_concurrency,
+                        thread_name_prefix="llm-worker"
+                    )
+        return self._llm_executor
+
+    @asynccontextmanager
+    async def admit(self):
+        """Admit a request or fail fast when the queue is full."""
+        if self._pending >= self.capacity:
+            logger.warning(
+                f"Rejecting request: {self._pending} pending, capacity {self.capacity}"
+            )
+            raise QueueFullError(self.retry_after)
+
+        self._pending += 1
+        self._record_load()
+        try:
+            yield
+        finally:
+            self._pending -= 1
+            self._record_load()
+
+    def _record_load(self):
+        """Export queue depth and in-flight generations as gauges."""
+        LLM_IN_FLIGHT.set(self._in_flight)
+        LLM_QUEUE_DEPTH.set(max(self._pending - self._in_flight, 0))
+
+    async def run_cpu(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking CPU-bound call on the CPU executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.cpu_executor, partial(run_in_stage, "cpu", func, *args, **kwargs)
+        )
+
+    @asynccontextmanager
+    async def _llm_slot(self):
+        """Hold one of the LLM concurrency slots."""
+        if self._llm_semaphore is None:
+            self._llm_semaphore = asyncio.Semaphore(self.llm_concurrency)
+
+        async with self._llm_semaphore:
+            self._in_flight += 1
+            self._record_load()
+            try:
+                yield
+            finally:
+                self._in_flight -= 1
+                self._record_load()
+
+    async def run_llm(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a generation call, bounded by the LLM concurrency limit."""
+        loop = asyncio.get_running_loop()
+        async with self._llm_slot():
+            return await loop.run_in_executor(
+                self.llm_executor, partial(run_in_stage, "llm", func, *args, **kwargs)
+            )
+
+    async def stream_llm(
+        self,
+        func: Callable[..., Iterator[T]],
+        *args: Any,
+        **kwargs: Any
+    ) -> AsyncIterator[T]:
+        """Drain a blocking generator on the LLM executor, yielding items as they arrive."""
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        done = object()
+
+        def pump():
+            apply_stage_limits("llm")
+            iterator = func(*args, **kwargs)
+            try:
+                for item in iterator:
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(items.put_nowait, (item, None))
+            except Exception as e:
+                loop.call_soon_threadsafe(items.put_nowait, (done, e))
+                return
+            finally:
+                iterator.close()
+            loop.call_soon_threadsafe(items.put_nowait, (done, None))
+
+        async with self._llm_slot():
+            loop.run_in_executor(self.llm_executor, pump)
+            try:
+                while True:
+                    item, error = await items.get()
+                    if item is done:
+                        if error is not None:
+                            raise error
+                        break
+                    yield item
+            finally:
+                # Stops the generator if the consumer went away early
+                cancelled.set()
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the executors."""
+        for executor in (self._cpu_executor, self._llm_executor):
+            if executor is not None:
+                executor.shutdown(wait=wait)
+        self._cpu_executor = None
+        self._llm_executor = None
+        self._llm_semaphore = None
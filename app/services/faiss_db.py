@@ -2,8 +2,11 @@ import faiss
 import pickle
 import json
 import numpy as np
-from typing import Tuple, List, Dict, Any, Optional
+from typing import Tuple, List, Dict, Any, Optional, Sequence, Mapping
 from pathlib import Path
+from app.services.metadata_store import MetadataStore
+from app.services.lexical import BM25Index, load_or_build
+from app.services.loader import LazyResource
 from app.core.logging import logger
 from app.core.config import get_settings
 
@@ -17,30 +20,79 @@ class FAISSDatabase:
         self,
         index_path: Optional[str] = None,
         metadata_path: Optional[str] = None,
-        config_path: Optional[str] = None
+        config_path: Optional[str] = None,
+        metadata_store_path: Optional[str] = None
     ):
         self.index_path = Path(index_path or settings.faiss_index_path)
         self.metadata_path = Path(metadata_path or settings.metadata_path)
+        self.metadata_store_path = Path(
+            metadata_store_path or settings.metadata_store_path
+        )
         self.config_path = Path(config_path or settings.config_path)
         
-        self._index = None
-        self._metadata = None
-        self._config = None
+        self._index = LazyResource("faiss_index", self._load_index)
+        self._metadata = LazyResource("metadata", self._load_metadata)
+        self._config = LazyResource("faiss_config", self._load_config)
+        self._lexical = LazyResource("bm25_index", self._load_lexical)
+        self._vectors = LazyResource("vectors", self._load_vectors)
+        self._index_stat = None
+        # Metadata fields returned with a hit, empty for all of them
+        self.result_fields = [
+            name.strip() for name in (settings.search_result_fields or "").split(",")
+            if name.strip()
+        ]
         
+    @classmethod
+    def from_directory(cls, directory: Path) -> "FAISSDatabase":
+        """Database over one knowledge base version, artifacts named as in the settings."""
+        directory = Path(directory)
+        return cls(
+            index_path=str(directory / Path(settings.faiss_index_path).name),
+            metadata_path=str(directory / Path(settings.metadata_path).name),
+            config_path=str(directory / Path(settings.config_path).name),
+            metadata_store_path=str(directory / Path(settings.metadata_store_path).name)
+        )
+    
     def _load_index(self) -> faiss.Index:
         """Load FAISS index."""
         if not self.index_path.exists():
             raise FileNotFoundError(f"FAISS index not found: {self.index_path}")
         
         logger.info(f"Loading FAISS index from {self.index_path}")
-        return faiss.read_index(str(self.index_path))
+        self._index_stat = self.index_path.stat()
+        if settings.faiss_mmap:
+            # Inverted lists stay in the page cache, shared by all workers
+            index = faiss.read_index(
+                str(self.index_path),
+                faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            )
+        else:
+            index = faiss.read_index(str(self.index_path))
+        self._apply_search_config(index)
+        return index
+    
+    def _apply_search_config(self, index: faiss.Index):
+        """Set the tuned search parameters from the config as the index defaults."""
+        search = self.config.get("search") or {}
+        if search.get("nprobe") and isinstance(index, faiss.IndexIVF):
+            index.nprobe = int(search["nprobe"])
+        if search.get("ef_search") and isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = int(search["ef_search"])
+        if search:
+            logger.info(f"Search parameters from config: {search}")
     
-    def _load_metadata(self) -> List[Dict[str, Any]]:
-        """Load metadata."""
+    def _load_metadata(self) -> Sequence[Mapping[str, Any]]:
+        """Load metadata, preferring the memory-mapped store over the pickle."""
+        if self.metadata_store_path.exists():
+            return MetadataStore.open(self.metadata_store_path)
+        
         if not self.metadata_path.exists():
             raise FileNotFoundError(f"Metadata not found: {self.metadata_path}")
         
-        logger.info(f"Loading metadata from {self.metadata_path}")
+        logger.warning(
+            f"Loading pickled metadata from {self.metadata_path}; run "
+            f"scripts/convert_metadata.py to create {self.metadata_store_path}"
+        )
         with open(self.metadata_path, "rb") as f:
             return pickle.load(f)
     
@@ -53,57 +105,284 @@ class FAISSDatabase:
         with open(self.config_path, "r", encoding="utf-8") as f:
             return json.load(f)
     
+    def _load_lexical(self) -> BM25Index:
+        """Load the persisted BM25 index, rebuilding it if it is stale."""
+        return load_or_build(
+            self.lexical_index_path,
+            self.metadata,
+            source=self.fingerprint,
+            k1=settings.bm25_k1,
+            b=settings.bm25_b
+        )
+    
+    def _load_vectors(self) -> Optional[np.ndarray]:
+        """Map the stored document vectors, None if the index builder did not write them.
+        
+        The mapping keeps the file readable after a rebuild replaces or a
+        prune deletes it, so re-ranking always sees the vectors of this index.
+        Without the file vectors are reconstructed from the index, whose
+        direct map is built here once instead of on a search shared with
+        other threads. Compressed indexes only reconstruct approximations,
+        searches on them are then not re-ranked.
+        """
+        if self.vectors_path.exists():
+            return np.load(self.vectors_path, mmap_mode="r")
+        if self.is_compressed:
+            logger.warning(
+                f"No {self.vectors_path.name} next to the compressed index, "
+                "search results are not re-ranked"
+            )
+        if self.is_ivf:
+            try:
+                self.index.make_direct_map()
+            except RuntimeError as e:
+                logger.warning(f"Cannot map index ids for re-ranking: {str(e)}")
+        return None
+    
     @property
     def index(self) -> faiss.Index:
         """Get FAISS index (lazy loaded)."""
-        if self._index is None:
-            self._index = self._load_index()
-        return self._index
+        return self._index.get()
     
     @property
-    def metadata(self) -> List[Dict[str, Any]]:
+    def metadata(self) -> Sequence[Mapping[str, Any]]:
         """Get metadata (lazy loaded)."""
-        if self._metadata is None:
-            self._metadata = self._load_metadata()
-        return self._metadata
+        return self._metadata.get()
     
     @property
     def config(self) -> Dict[str, Any]:
         """Get config (lazy loaded)."""
-        if self._config is None:
-            self._config = self._load_config()
-        return self._config
+        return self._config.get()
+    
+    @property
+    def lexical(self) -> BM25Index:
+        """Get the BM25 index over subject/answer (lazy loaded, built if missing)."""
+        return self._lexical.get()
+    
+    @property
+    def lexical_index_path(self) -> Path:
+        """BM25 postings persisted next to the FAISS index."""
+        return self.index_path.with_suffix(".bm25.npz")
+    
+    @property
+    def vectors_path(self) -> Path:
+        """Document vectors written next to the index by the index builder."""
+        return self.index_path.with_suffix(".vectors.npy")
+    
+    @property
+    def is_ivf(self) -> bool:
+        """Whether the loaded index has inverted lists (and an nprobe)."""
+        return isinstance(self.index, faiss.IndexIVF)
+    
+    @property
+    def is_compressed(self) -> bool:
+        """Whether the index stores quantized codes instead of the vectors (IVFPQ, SQ8)."""
+        return isinstance(
+            self.index,
+            (faiss.IndexIVFPQ, faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)
+        )
+    
+    @property
+    def is_hnsw(self) -> bool:
+        """Whether the loaded index is an HNSW graph (and has an ef_search)."""
+        return isinstance(self.index, faiss.IndexHNSW)
+    
+    @property
+    def version(self) -> Optional[str]:
+        """Content version from the config, None until the config is loaded."""
+        config = self._config.peek()
+        return config.get("version") if config else None
+    
+    @property
+    def created_at(self) -> Optional[str]:
+        """When the loaded artifacts were built, None until the config is loaded."""
+        config = self._config.peek()
+        return config.get("created_at") if config else None
+    
+    @property
+    def fingerprint(self) -> str:
+        """Identifier of the loaded knowledge base, changes when it is rebuilt."""
+        _ = self.index
+        return (
+            f"{self.config.get('version')}:{self.config.get('created_at')}:"
+            f"{self._index_stat.st_size}:{self._index_stat.st_mtime_ns}"
+        )
     
     def search(
         self,
         query_embedding: np.ndarray,
-        k: int = 4
+        k: int = 4,
+        nprobe: Optional[int] = None,
+        oversample: Optional[int] = None,
+        min_score: Optional[float] = None,
+        ef_search: Optional[int] = None
     ) -> Tuple[np.ndarray, np.ndarray]:
         """Search for similar documents."""
         # Reshape if needed
         if query_embedding.ndim == 1:
             query_embedding = query_embedding.reshape(1, -1)
         
-        scores, indices = self.index.search(query_embedding, k)
+        scores, indices = self.search_batch(
+            query_embedding, k, nprobe, oversample, min_score, ef_search
+        )
         return scores[0], indices[0]
     
+    def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        k: int = 4,
+        nprobe: Optional[int] = None,
+        oversample: Optional[int] = None,
+        min_score: Optional[float] = None,
+        ef_search: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Search for similar documents for several queries in one call.
+        
+        With ``oversample > 1`` the index returns ``k * oversample`` candidates
+        that are re-scored exactly against the stored vectors before the top
+        ``k`` are kept. Hits scoring below ``min_score`` come back as index -1.
+        Without ``nprobe`` or ``ef_search`` (or their settings) the index
+        searches with the parameters tuned into its config.
+        """
+        nprobe = nprobe or settings.faiss_nprobe
+        ef_search = ef_search or settings.faiss_ef_search
+        oversample = oversample or settings.search_oversample
+        min_score = min_score if min_score is not None else settings.search_min_score
+        
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype="float32")
+        candidates = min(k * oversample, self.index.ntotal)
+        
+        params = None
+        if nprobe and self.is_ivf:
+            params = faiss.SearchParametersIVF(nprobe=nprobe)
+        elif ef_search and self.is_hnsw:
+            params = faiss.SearchParametersHNSW(efSearch=ef_search)
+        scores, indices = self.index.search(query_embeddings, candidates, params=params)
+        
+        if oversample > 1:
+            scores, indices = self._rerank(query_embeddings, scores, indices)
+        scores, indices = scores[:, :k], indices[:, :k]
+        
+        if min_score is not None:
+            below = scores < min_score
+            scores = np.where(below, -np.inf, scores).astype("float32")
+            indices = np.where(below, -1, indices)
+        
+        return scores, indices
+    
+    def _rerank(
+        self,
+        query_embeddings: np.ndarray,
+        scores: np.ndarray,
+        indices: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-score candidates exactly and sort them by the exact score."""
+        if self._vectors.get() is None and self.is_compressed:
+            # Reconstructed codes would only reorder by the same approximation
+            return scores, indices
+        
+        valid = indices >= 0
+        ids = np.where(valid, indices, 0)
+        
+        vectors = self._candidate_vectors(ids.ravel())
+        if vectors is None:
+            return scores, indices
+        vectors = vectors.reshape(*ids.shape, -1)
+        
+        exact = np.einsum("qd,qcd->qc", query_embeddings, vectors).astype("float32")
+        exact = np.where(valid, exact, -np.inf)
+        
+        order = np.argsort(-exact, axis=1, kind="stable")
+        return (
+            np.take_along_axis(exact, order, axis=1),
+            np.take_along_axis(indices, order, axis=1)
+        )
+    
+    def similarity(
+        self,
+        query_embedding: np.ndarray,
+        ids: np.ndarray
+    ) -> Optional[np.ndarray]:
+        """Exact similarity between a query and the given index rows."""
+        vectors = self._candidate_vectors(np.asarray(ids, dtype="int64"))
+        if vectors is None:
+            return None
+        return vectors @ np.asarray(query_embedding, dtype="float32").ravel()
+    
+    def _candidate_vectors(self, ids: np.ndarray) -> Optional[np.ndarray]:
+        """Stored vectors for index rows, from the vectors file or the index itself.
+        
+        Vectors reconstructed from a compressed index are approximations.
+        """
+        vectors = self._vectors.get()
+        if vectors is not None:
+            return np.asarray(vectors[ids], dtype="float32")
+        
+        try:
+            return self.index.reconstruct_batch(ids.astype("int64"))
+        except RuntimeError as e:
+            logger.warning(f"Cannot reconstruct vectors for re-ranking: {str(e)}")
+            return None
+    
+    def get_row(self, idx: int) -> Mapping[str, Any]:
+        """Get metadata for a single index row."""
+        return self.metadata[int(idx)]
+    
+    def get_hit(self, idx: int) -> Dict[str, Any]:
+        """Metadata returned with a search hit: all fields of the row, or SEARCH_RESULT_FIELDS.
+        
+        Only the hit rows are decoded, and with SEARCH_RESULT_FIELDS only those fields.
+        """
+        row = self.get_row(idx)
+        if not self.result_fields:
+            return dict(row)
+        hit = {}
+        for field in self.result_fields:
+            value = row.get(field)
+            if value is not None:
+                hit[field] = value
+        return hit
+    
     def get_metadata_by_indices(
         self,
         indices: np.ndarray
-    ) -> List[Dict[str, Any]]:
+    ) -> List[Mapping[str, Any]]:
         """Get metadata for given indices."""
         results = []
         for idx in indices:
             if idx >= 0 and idx < len(self.metadata):
-                results.append(self.metadata[idx])
+                results.append(self.get_row(idx))
         return results
     
+    def _resources(self) -> List[LazyResource]:
+        resources = [self._index, self._metadata, self._config, self._vectors]
+        if settings.hybrid_search_enabled:
+            resources.append(self._lexical)
+        return resources
+    
+    def load(self):
+        """Load all artifacts needed for search.
+        
+        Nothing is opened later, so a version keeps working after its files
+        are replaced or deleted (see knowledge_base.prune_versions).
+        """
+        for resource in self._resources():
+            resource.get()
+    
     def is_loaded(self) -> bool:
-        """Check if database is loaded."""
-        try:
-            _ = self.index
-            _ = self.metadata
-            _ = self.config
-            return True
-        except Exception:
-            return False
\ No newline at end of file
+        """Check if database is loaded, without loading it."""
+        return all(resource.loaded for resource in self._resources())
+    
+    def load_status(self) -> Dict[str, Dict[str, Any]]:
+        """Load state of each artifact, without loading them."""
+        return {resource.name: resource.status() for resource in self._resources()}
+    
+    def close(self):
+        """Drop all loaded artifacts; only call once no search uses them anymore."""
+        metadata = self._metadata.peek()
+        if isinstance(metadata, MetadataStore):
+            metadata.close()
+        resources = (self._index, self._metadata, self._config, self._lexical, self._vectors)
+        for resource in resources:
+            resource.reset()
+        self._index_stat = None
@@ -0,0 +1,212 @@
+import itertools
+import socket
+import threading
+import numpy as np
+from typing import Callable, List, Dict, Optional, Iterator, Any
+from app.services.embeddings import EmbeddingService
+from app.services.llm import LLMService, GenerationStats
+from app.services import ipc
+from app.services.loader import LazyResource
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class InferenceClient:
+    """Blocking client for the local inference server, one connection per thread."""
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        timeout: Optional[float] = None
+    ):
+        self.socket_path = socket_path or settings.inference_socket_path
+        self.timeout = timeout or settings.inference_timeout
+        self._local = threading.local()
+        self._request_ids = itertools.count(1)
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def _send(self, message_type: int, meta: Dict[str, Any]) -> int:
+        request_id = next(self._request_ids) & 0xFFFFFFFF
+        try:
+            self._connection().sendall(
+                ipc.encode_frame(ipc.Frame(message_type, request_id, meta))
+            )
+        except OSError:
+            self._reset()
+            raise
+        return request_id
+
+    def _receive(self, request_id: int) -> ipc.Frame:
+        try:
+            frame = ipc.read_frame(self._connection())
+        except (OSError, ConnectionError):
+            self._reset()
+            raise
+        if frame.request_id != request_id:
+            self._reset()
+            raise ipc.RemoteInferenceError(
+                f"Reply for request {frame.request_id}, expected {request_id}"
+            )
+        return frame
+
+    def request(self, message_type: int, meta: Dict[str, Any]) -> ipc.Frame:
+        """Send a request and wait for its single reply."""
+        request_id = self._send(message_type, meta)
+        return ipc.raise_for_error(self._receive(request_id), ipc.RESULT)
+
+    def stream(
+        self,
+        message_type: int,
+        meta: Dict[str, Any],
+        on_end: Optional[Callable[[ipc.Frame], None]] = None
+    ) -> Iterator[ipc.Frame]:
+        """Send a request and yield CHUNK replies until END, which goes to on_end."""
+        request_id = self._send(message_type, meta)
+        finished = False
+        try:
+            while True:
+                frame = ipc.raise_for_error(self._receive(request_id))
+                if frame.type == ipc.END:
+                    finished = True
+                    if on_end is not None:
+                        on_end(frame)
+                    return
+                yield frame
+        finally:
+            if not finished:
+                # Unread frames would confuse the next request on this connection
+                self._reset()
+
+
+class RemoteEmbeddingService(EmbeddingService):
+    """EmbeddingService that delegates to the inference server."""
+
+    def __init__(self, client: Optional[InferenceClient] = None):
+        super().__init__()
+        self.client = client or InferenceClient()
+        self._model = LazyResource("embeddings", self._load_remote)
+
+    def _load_remote(self) -> "RemoteEmbeddingService":
+        """Ask the server to load its models."""
+        status = self.client.request(ipc.STATUS, {"load": True}).meta
+        if not status["embeddings_loaded"]:
+            raise ipc.RemoteInferenceError("Inference server has no embedding model loaded")
+        return self
+
+    def _encode(
+        self,
+        texts: List[str],
+        normalize: bool,
+        batch_size: int
+    ) -> np.ndarray:
+        """Encode texts on the server; the inherited encode() caches the results."""
+        frame = self.client.request(ipc.EMBED, {
+            "texts": list(texts),
+            "normalize": normalize,
+            "batch_size": batch_size
+        })
+        return ipc.body_to_array(frame.body, frame.meta["shape"])
+
+
+class RemoteLLMService(LLMService):
+    """LLMService that delegates generation to the inference server."""
+
+    def __init__(self, client: Optional[InferenceClient] = None):
+        super().__init__()
+        self.client = client or InferenceClient()
+        self._pipeline = LazyResource("llm", self._load_remote)
+        # Speculative decoding runs in the inference server
+        self.speculative_mode = "off"
+
+    def _load_remote(self) -> "RemoteLLMService":
+        """Ask the server to load its models."""
+        status = self.client.request(ipc.STATUS, {"load": True}).meta
+        if not status["llm_loaded"]:
+            raise ipc.RemoteInferenceError("Inference server has no LLM loaded")
+        return self
+
+    @property
+    def pipeline(self):
+        raise RuntimeError("The LLM pipeline lives in the inference server")
+
+    @property
+    def tokenizer(self):
+        """A local copy of the LLM's tokenizer, for token budgets."""
+        return self._tokenizer.get()
+
+    @property
+    def text_tokenizer(self):
+        return self._tokenizer.get()
+
+    @property
+    def model(self) -> "RemoteLLMService":
+        """Make sure the server has its models loaded."""
+        return self._pipeline.get()
+
+    def warmup_prefix_cache(self):
+        """The inference server keeps its own prefix cache."""
+        return None
+
+    @staticmethod
+    def _apply_stats(stats: Optional[GenerationStats], meta: Dict[str, Any]):
+        """Copy the server's generation stats and export them from this worker."""
+        remote = GenerationStats(**meta.get("stats", {}))
+        remote.record()
+        if stats is not None:
+            vars(stats).update(vars(remote))
+
+    def generate(
+        self,
+        messages: List[Dict[str, str]],
+        max_new_tokens: int = 130,
+        stats: Optional[GenerationStats] = None
+    ) -> str:
+        """Generate response from messages."""
+        meta = self.client.request(ipc.GENERATE, {
+            "messages": messages,
+            "max_new_tokens": max_new_tokens
+        }).meta
+        self._apply_stats(stats, meta)
+        return meta["text"]
+
+    def generate_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        max_new_tokens: List[int],
+        stats: Optional[GenerationStats] = None
+    ) -> List[str]:
+        """Generate responses for several conversations in one forward pass."""
+        meta = self.client.request(ipc.GENERATE_BATCH, {
+            "batch_messages": batch_messages,
+            "max_new_tokens": max_new_tokens
+        }).meta
+        self._apply_stats(stats, meta)
+        return meta["texts"]
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_new_tokens: int = 130,
+        stats: Optional[GenerationStats] = None
+    ) -> Iterator[str]:
+        """Generate a response, yielding text as the server streams it."""
+        for frame in self.client.stream(ipc.STREAM, {
+            "messages": messages,
+            "max_new_tokens": max_new_tokens
+        }, on_end=lambda frame: self._apply_stats(stats, frame.meta)):
+            yield frame.meta["text"]
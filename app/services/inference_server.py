@@ -0,0 +1,185 @@
+"""Local inference server: one loaded copy of the models for all API workers.
+
+Usage:
+    python -m app.services.inference_server
+
+API workers started with INFERENCE_MODE=remote talk to it over the Unix
+socket at INFERENCE_SOCKET_PATH (see app/services/ipc.py for the framing).
+"""
+import asyncio
+import os
+from pathlib import Path
+from typing import Optional, Set
+from app.services.embeddings import EmbeddingService
+from app.services.llm import LLMService, GenerationStats
+from app.services.executor import InferenceExecutor
+from app.services.batching import GenerationBatcher
+from app.services import ipc
+from app.core.resources import configure_threads
+from app.core.startup import startup_timeline
+from app.core.logging import logger
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class InferenceServer:
+    """Serves embedding and generation requests over a Unix domain socket."""
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = Path(socket_path or settings.inference_socket_path)
+        self.embeddings = EmbeddingService()
+        self.llm = LLMService()
+        self.llm.record_metrics = False
+        self.executor = InferenceExecutor()
+        self.batcher = GenerationBatcher(self.llm, self.executor)
+
+    def load_models(self):
+        """Load both models before accepting connections."""
+        _ = self.embeddings.model
+        _ = self.llm.model
+        self.llm.warmup_prefix_cache()
+
+    async def serve_forever(self):
+        """Listen on the socket until cancelled."""
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+        server = await asyncio.start_unix_server(
+            self._handle_connection, path=str(self.socket_path)
+        )
+        os.chmod(self.socket_path, 0o660)
+        logger.info(f"✅ Inference server listening on {self.socket_path}")
+        startup_timeline.mark_ready()
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.batcher.shutdown(timeout=5)
+            self.executor.shutdown(wait=False)
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+
+    async def _handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ):
+        """Read frames and answer them concurrently."""
+        write_lock = asyncio.Lock()
+        tasks: Set[asyncio.Task] = set()
+
+        async def send(frame: ipc.Frame):
+            async with write_lock:
+                writer.write(ipc.encode_frame(frame))
+                await writer.drain()
+
+        try:
+            while True:
+                frame = await ipc.read_frame_async(reader)
+                task = asyncio.create_task(self._dispatch(frame, send))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _dispatch(self, frame: ipc.Frame, send):
+        """Run one request and send its reply frames."""
+        request_id = frame.request_id
+        meta = frame.meta
+
+        try:
+            if frame.type == ipc.EMBED:
+                embeddings = await self.executor.run_cpu(
+                    self.embeddings.encode,
+                    meta["texts"],
+                    meta.get("normalize", True),
+                    meta.get("batch_size", 32)
+                )
+                await send(ipc.Frame(
+                    ipc.RESULT, request_id,
+                    {"shape": list(embeddings.shape)},
+                    ipc.array_to_body(embeddings)
+                ))
+
+            elif frame.type == ipc.GENERATE:
+                stats = GenerationStats()
+                if settings.llm_batching_enabled:
+                    text = await self.batcher.submit(
+                        meta["messages"], meta["max_new_tokens"], stats
+                    )
+                else:
+                    text = await self.executor.run_llm(
+                        self.llm.generate, meta["messages"], meta["max_new_tokens"], stats
+                    )
+                await send(ipc.Frame(ipc.RESULT, request_id, {
+                    "text": text,
+                    "stats": vars(stats)
+                }))
+
+            elif frame.type == ipc.GENERATE_BATCH:
+                stats = GenerationStats()
+                texts = await self.executor.run_llm(
+                    self.llm.generate_batch,
+                    meta["batch_messages"],
+                    meta["max_new_tokens"],
+                    stats
+                )
+                await send(ipc.Frame(ipc.RESULT, request_id, {
+                    "texts": texts,
+                    "stats": vars(stats)
+                }))
+
+            elif frame.type == ipc.STREAM:
+                stats = GenerationStats()
+                async for text in self.executor.stream_llm(
+                    self.llm.stream, meta["messages"], meta["max_new_tokens"], stats
+                ):
+                    await send(ipc.Frame(ipc.CHUNK, request_id, {"text": text}))
+                await send(ipc.Frame(ipc.END, request_id, {"stats": vars(stats)}))
+
+            elif frame.type == ipc.STATUS:
+                if meta.get("load"):
+                    await self.executor.run_cpu(self.load_models)
+                await send(ipc.Frame(ipc.RESULT, request_id, {
+                    "embeddings_loaded": self.embeddings.is_loaded(),
+                    "llm_loaded": self.llm.is_loaded(),
+                    "pending": self.executor.pending,
+                    "in_flight": self.executor.in_flight
+                }))
+
+            else:
+                raise ValueError(f"Unknown request type: {frame.type}")
+
+        except asyncio.CancelledError:
+            raise
+        except ConnectionError:
+            # Client went away, nobody to answer
+            return
+        except Exception as e:
+            logger.error(f"Inference request failed: {str(e)}", exc_info=True)
+            await send(ipc.Frame(ipc.ERROR, request_id, {
+                "error": str(e),
+                "type": type(e).__name__
+            }))
+
+
+def main():
+    # One process serves the models for all API workers
+    configure_threads(workers=1, api_only=False)
+    server = InferenceServer()
+    server.load_models()
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Inference server stopped")
+
+
+if __name__ == "__main__":
+    main()
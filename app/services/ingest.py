@@ -0,0 +1,419 @@
+import csv
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import faiss
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Dict, Any, Optional, Sequence, Tuple
+from app.services.embeddings import EmbeddingService
+from app.services.metadata_store import MetadataStore, write_metadata_store, read_records
+from app.core.logging import logger
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# IVF keeps full vectors in its inverted lists (IVF-Flat); IVFPQ stores
+# product-quantized codes, SQ8 one byte per dimension, HNSW a graph over full vectors
+INDEX_TYPES = ("Flat", "IVF", "IVFPQ", "SQ8", "HNSW")
+DEFAULT_HNSW_M = 32
+
+
+def default_pq_m(dimension: int) -> int:
+    """PQ sub-quantizers for 8-bit codes: about one byte per 8 dimensions, dividing the dimension."""
+    return next(m for m in range(max(1, dimension // 8), 0, -1) if dimension % m == 0)
+
+
+def create_index(
+    matrix: np.ndarray,
+    index_type: str = "IVF",
+    nlist: Optional[int] = None,
+    pq_m: Optional[int] = None,
+    hnsw_m: Optional[int] = None,
+    train_sample_size: int = 50000
+) -> faiss.Index:
+    """Create an empty inner-product index, trained on a sample of matrix if it needs training."""
+    n, dimension = matrix.shape
+    kind = index_type.upper()
+
+    if kind == "FLAT":
+        return faiss.IndexFlatIP(dimension)
+    if kind == "HNSW":
+        return faiss.IndexHNSWFlat(dimension, hnsw_m or DEFAULT_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    if kind == "SQ8":
+        index = faiss.IndexScalarQuantizer(
+            dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )
+    elif kind in ("IVF", "IVFPQ"):
+        # FAISS wants ~39 training points per centroid
+        nlist = nlist or max(1, int(4 * np.sqrt(n)))
+        nlist = max(1, min(nlist, n // 39))
+        quantizer = faiss.IndexFlatIP(dimension)
+        if kind == "IVF":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            pq_m = pq_m or default_pq_m(dimension)
+            if dimension % pq_m:
+                raise ValueError(f"pq_m={pq_m} does not divide the dimension {dimension}")
+            # 8-bit codes: every sub-quantizer trains 256 centroids
+            if n < 256:
+                raise ValueError(f"IVFPQ needs at least 256 documents to train, got {n}")
+            index = faiss.IndexIVFPQ(
+                quantizer, dimension, nlist, pq_m, 8, faiss.METRIC_INNER_PRODUCT
+            )
+    else:
+        raise ValueError(f"Unsupported index type: {index_type}")
+
+    sample = matrix
+    if n > train_sample_size:
+        rng = np.random.default_rng(0)
+        sample = matrix[rng.choice(n, train_sample_size, replace=False)]
+
+    logger.info(f"Training {kind} index: {describe_index(index)}, sample={len(sample)}")
+    index.train(sample)
+    return index
+
+
+def describe_index(index: faiss.Index) -> Dict[str, Any]:
+    """Index type and build parameters, as written to the config."""
+    description = {"index_type": "Flat", "nlist": None, "pq_m": None, "hnsw_m": None}
+    if isinstance(index, faiss.IndexIVFPQ):
+        description.update(index_type="IVFPQ", nlist=int(index.nlist), pq_m=int(index.pq.M))
+    elif isinstance(index, faiss.IndexIVF):
+        description.update(index_type="IVF", nlist=int(index.nlist))
+    elif isinstance(index, faiss.IndexHNSW):
+        description.update(index_type="HNSW", hnsw_m=int(index.hnsw.nb_neighbors(1)))
+    elif isinstance(index, faiss.IndexScalarQuantizer):
+        description.update(index_type="SQ8")
+    return description
+
+
+def iter_document_chunks(
+    path: Path,
+    chunk_size: int = 2048
+) -> Iterator[List[Dict[str, Any]]]:
+    """Stream a CSV or JSONL corpus in chunks of records."""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            records = csv.DictReader(f)
+        elif path.suffix.lower() in (".jsonl", ".ndjson"):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            raise ValueError(f"Unsupported corpus format: {path.suffix}")
+
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path: Path, data: bytes):
+    """Write bytes to a temp file next to path, then rename over it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class IndexBuilder:
+    """Builds the FAISS index, metadata and config artifacts from a ticket corpus."""
+
+    def __init__(
+        self,
+        index_path: Optional[str] = None,
+        metadata_path: Optional[str] = None,
+        config_path: Optional[str] = None,
+        metadata_store_path: Optional[str] = None,
+        embeddings: Optional[EmbeddingService] = None,
+        text_fields: Sequence[str] = ("subject", "answer"),
+        id_field: str = "id",
+        batch_size: int = 128
+    ):
+        self.index_path = Path(index_path or settings.faiss_index_path)
+        self.metadata_path = Path(metadata_path or settings.metadata_path)
+        self.config_path = Path(config_path or settings.config_path)
+        self.metadata_store_path = Path(
+            metadata_store_path or settings.metadata_store_path
+        )
+        self.embeddings = embeddings or EmbeddingService()
+        self.text_fields = tuple(text_fields)
+        self.id_field = id_field
+        self.batch_size = batch_size
+
+    @property
+    def vectors_path(self) -> Path:
+        """Stored document vectors, reused by incremental builds."""
+        return self.index_path.with_suffix(".vectors.npy")
+
+    @property
+    def manifest_path(self) -> Path:
+        """Document ids and content hashes, one per index row."""
+        return self.index_path.with_suffix(".manifest.json")
+
+    def document_text(self, record: Dict[str, Any]) -> str:
+        """Text that gets embedded for a record."""
+        return "\n".join(
+            str(record[field]) for field in self.text_fields if record.get(field)
+        )
+
+    def document_id(self, record: Dict[str, Any]) -> str:
+        """Stable id of a record, falls back to a hash of its text."""
+        doc_id = record.get(self.id_field)
+        if doc_id not in (None, ""):
+            return str(doc_id)
+        return _sha1(self.document_text(record))
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        # Documents are embedded once, keep them out of the query cache
+        return self.embeddings.encode(texts, batch_size=self.batch_size, use_cache=False)
+
+    def _load_existing(self) -> Tuple[List[Dict[str, Any]], np.ndarray, List[Tuple[str, str]]]:
+        """Load artifacts from a previous build."""
+        for path in (self.vectors_path, self.manifest_path):
+            if not path.exists():
+                raise FileNotFoundError(
+                    f"Reusing stored vectors needs {path}, run a full build first"
+                )
+
+        if self.metadata_store_path.exists():
+            store = MetadataStore.open(self.metadata_store_path)
+            metadata = read_records(store)
+            store.close()
+        else:
+            with open(self.metadata_path, "rb") as f:
+                metadata = pickle.load(f)
+        vectors = np.load(self.vectors_path)
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = [tuple(entry) for entry in json.load(f)["documents"]]
+
+        return metadata, vectors, manifest
+
+    def _previous_config(self) -> Dict[str, Any]:
+        """Config of the artifacts being replaced, empty if there are none."""
+        if not self.config_path.exists():
+            return {}
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def build(
+        self,
+        corpus_path: str,
+        incremental: bool = False,
+        index_type: Optional[str] = None,
+        nlist: Optional[int] = None,
+        chunk_size: int = 2048,
+        train_sample_size: int = 50000,
+        retrain: bool = False,
+        pq_m: Optional[int] = None,
+        hnsw_m: Optional[int] = None,
+        prune_missing: bool = False
+    ) -> Dict[str, Any]:
+        """Build or update the artifacts and return the written config.
+
+        Without index_type the previous build's index type is kept, with its
+        PQ and HNSW parameters and tuned search parameters (see
+        scripts/tune_index.py). Incremental builds reuse the trained index,
+        nlist included, unless retrain is set or index_type, nlist, pq_m or
+        hnsw_m ask for a different one; a new index sizes nlist for the corpus.
+        Incremental builds keep documents missing from the corpus unless
+        prune_missing is set, for when corpus_path holds the full corpus.
+        """
+        requested = {
+            key: value for key, value in (
+                ("index_type", index_type), ("nlist", nlist), ("pq_m", pq_m), ("hnsw_m", hnsw_m)
+            ) if value is not None
+        }
+        previous = self._previous_config()
+        index_type = index_type or previous.get("index_type") or "IVF"
+        same_type = str(previous.get("index_type", "")).upper() == index_type.upper()
+        if same_type:
+            pq_m = pq_m or previous.get("pq_m")
+            hnsw_m = hnsw_m or previous.get("hnsw_m")
+
+        if incremental:
+            metadata, existing_vectors, manifest = self._load_existing()
+            vectors = [existing_vectors[i] for i in range(len(existing_vectors))]
+        else:
+            metadata, vectors, manifest = [], [], []
+
+        rows = {doc_id: row for row, (doc_id, _) in enumerate(manifest)}
+        seen = set()
+        added = updated = unchanged = removed = 0
+
+        for chunk in iter_document_chunks(Path(corpus_path), chunk_size):
+            pending_rows, pending_texts = [], []
+
+            for record in chunk:
+                text = self.document_text(record)
+                if not text:
+                    continue
+                doc_id = self.document_id(record)
+                seen.add(doc_id)
+                content_hash = _sha1(text)
+                row = rows.get(doc_id)
+
+                if row is None:
+                    row = len(manifest)
+                    rows[doc_id] = row
+                    manifest.append((doc_id, content_hash))
+                    metadata.append(record)
+                    vectors.append(None)
+                    added += 1
+                elif manifest[row][1] == content_hash:
+                    # Same text, only refresh the stored fields
+                    metadata[row] = record
+                    unchanged += 1
+                    continue
+                else:
+                    manifest[row] = (doc_id, content_hash)
+                    metadata[row] = record
+                    updated += 1
+
+                pending_rows.append(row)
+                pending_texts.append(text)
+
+            if pending_texts:
+                for row, vector in zip(pending_rows, self._embed(pending_texts)):
+                    vectors[row] = vector
+                logger.info(f"Embedded {len(pending_texts)} documents ({len(manifest)} total)")
+
+        if prune_missing:
+            kept = [row for row, (doc_id, _) in enumerate(manifest) if doc_id in seen]
+            removed = len(manifest) - len(kept)
+            manifest = [manifest[row] for row in kept]
+            metadata = [metadata[row] for row in kept]
+            vectors = [vectors[row] for row in kept]
+
+        if not manifest:
+            raise ValueError(f"No documents with text fields {self.text_fields} in {corpus_path}")
+
+        matrix = np.ascontiguousarray(np.vstack(vectors), dtype="float32")
+        logger.info(
+            f"Documents: {added} added, {updated} updated, {unchanged} unchanged, "
+            f"{removed} removed"
+        )
+
+        index = None
+        if incremental and not retrain and self.index_path.exists():
+            index = self._reuse_trained_index(matrix.shape[1], requested)
+        if index is None:
+            index = create_index(matrix, index_type, nlist, pq_m, hnsw_m, train_sample_size)
+        index.add(matrix)
+
+        # nprobe or ef_search only carry over to an index of the same type
+        kept_type = describe_index(index)["index_type"] == previous.get("index_type")
+        search = previous.get("search") if kept_type else None
+        return self._write(index, metadata, matrix, manifest, search)
+
+    def reindex(
+        self,
+        index_type: str,
+        nlist: Optional[int] = None,
+        pq_m: Optional[int] = None,
+        hnsw_m: Optional[int] = None,
+        search: Optional[Dict[str, Any]] = None,
+        train_sample_size: int = 50000
+    ) -> Dict[str, Any]:
+        """Rebuild the index with another type over the stored vectors, embedding nothing."""
+        metadata, matrix, manifest = self._load_existing()
+        matrix = np.ascontiguousarray(matrix, dtype="float32")
+        index = create_index(matrix, index_type, nlist, pq_m, hnsw_m, train_sample_size)
+        index.add(matrix)
+        return self._write(index, metadata, matrix, manifest, search)
+
+    def _reuse_trained_index(
+        self,
+        dimension: int,
+        requested: Dict[str, Any]
+    ) -> Optional[faiss.Index]:
+        """Keep the trained quantizer of the existing index, drop its vectors.
+
+        None if the index has to be trained again: the embedding dimension
+        changed or requested (explicit build parameters) differs from it.
+        """
+        index = faiss.read_index(str(self.index_path))
+        if index.d != dimension:
+            logger.warning("Embedding dimension changed, retraining index")
+            return None
+        current = describe_index(index)
+        changed = [
+            f"{key} {current[key]} -> {value}" for key, value in requested.items()
+            if str(current[key]).upper() != str(value).upper()
+        ]
+        if changed:
+            logger.info(f"Index parameters changed ({', '.join(changed)}), retraining index")
+            return None
+        index.reset()
+        return index
+
+    def _write(
+        self,
+        index: faiss.Index,
+        metadata: List[Dict[str, Any]],
+        matrix: np.ndarray,
+        manifest: List[Tuple[str, str]],
+        search: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Write all artifacts atomically, config last.
+
+        Each file is replaced atomically, the set of files is not: a process
+        loading them during the write can pair the new index with the old
+        metadata. Build into a staging directory (scripts/build_index.py
+        --kb-dir) while the service is running.
+
+        search holds the query-time parameters FAISSDatabase applies at load
+        (nprobe, ef_search); they are part of the version.
+        """
+        index_bytes = faiss.serialize_index(index).tobytes()
+        metadata_bytes = pickle.dumps(metadata, protocol=pickle.HIGHEST_PROTOCOL)
+        search_bytes = json.dumps(search, sort_keys=True).encode("utf-8") if search else b""
+        content_hash = hashlib.sha256(index_bytes + metadata_bytes + search_bytes).hexdigest()
+
+        vectors_tmp = self.vectors_path.with_suffix(".tmp.npy")
+        np.save(vectors_tmp, matrix)
+        os.replace(vectors_tmp, self.vectors_path)
+        _atomic_write(
+            self.manifest_path,
+            json.dumps({"documents": manifest}).encode("utf-8")
+        )
+        _atomic_write(self.index_path, index_bytes)
+        _atomic_write(self.metadata_path, metadata_bytes)
+        write_metadata_store(metadata, self.metadata_store_path)
+
+        config = {
+            "embedding_model": self.embeddings.model_name,
+            "embedding_dimension": int(matrix.shape[1]),
+            "total_documents": int(index.ntotal),
+            **describe_index(index),
+            "search": search or {},
+            "created_at": datetime.now().isoformat(),
+            "version": content_hash[:12],
+            "content_hash": content_hash
+        }
+        _atomic_write(
+            self.config_path,
+            json.dumps(config, indent=2).encode("utf-8")
+        )
+
+        logger.info(f"✅ Wrote index with {index.ntotal} documents (version {config['version']})")
+        return config
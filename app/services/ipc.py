@@ -0,0 +1,114 @@
+import asyncio
+import json
+import socket
+import struct
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# Frame layout (network byte order):
+#   u8  message type
+#   u32 request id
+#   u32 meta length  -> UTF-8 JSON object
+#   u32 body length  -> raw bytes (float32 little-endian for embeddings)
+HEADER = struct.Struct("!BIII")
+
+# Requests
+EMBED = 1
+GENERATE = 2
+GENERATE_BATCH = 3
+STREAM = 4
+STATUS = 5
+
+# Replies
+RESULT = 64
+CHUNK = 65
+END = 66
+ERROR = 127
+
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+
+
+@dataclass
+class Frame:
+    """One protocol message."""
+    type: int
+    request_id: int
+    meta: Dict[str, Any]
+    body: bytes = b""
+
+
+class RemoteInferenceError(RuntimeError):
+    """Raised on the client when the inference server reports an error."""
+
+
+def encode_frame(frame: Frame) -> bytes:
+    """Serialize a frame."""
+    meta = json.dumps(frame.meta, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(frame.type, frame.request_id, len(meta), len(frame.body)) + meta + frame.body
+
+
+def _decode(header: bytes) -> tuple:
+    message_type, request_id, meta_length, body_length = HEADER.unpack(header)
+    if meta_length + body_length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame too large: {meta_length + body_length} bytes")
+    return message_type, request_id, meta_length, body_length
+
+
+def _build(message_type: int, request_id: int, meta: bytes, body: bytes) -> Frame:
+    return Frame(message_type, request_id, json.loads(meta) if meta else {}, body)
+
+
+def array_to_body(array: np.ndarray) -> bytes:
+    """Encode a float32 matrix as frame body."""
+    return np.ascontiguousarray(array, dtype="<f4").tobytes()
+
+
+def body_to_array(body: bytes, shape: list) -> np.ndarray:
+    """Decode a float32 matrix from a frame body."""
+    return np.frombuffer(body, dtype="<f4").reshape(shape).astype("float32")
+
+
+async def read_frame_async(reader: asyncio.StreamReader) -> Frame:
+    """Read one frame from an asyncio stream."""
+    message_type, request_id, meta_length, body_length = _decode(
+        await reader.readexactly(HEADER.size)
+    )
+    meta = await reader.readexactly(meta_length)
+    body = await reader.readexactly(body_length)
+    return _build(message_type, request_id, meta, body)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ConnectionError("Inference server closed the connection")
+        received += count
+    return bytes(buffer)
+
+
+def read_frame(sock: socket.socket) -> Frame:
+    """Read one frame from a blocking socket."""
+    message_type, request_id, meta_length, body_length = _decode(
+        _recv_exactly(sock, HEADER.size)
+    )
+    meta = _recv_exactly(sock, meta_length) if meta_length else b""
+    body = _recv_exactly(sock, body_length) if body_length else b""
+    return _build(message_type, request_id, meta, body)
+
+
+def raise_for_error(frame: Frame, expected: Optional[int] = None) -> Frame:
+    """Turn an ERROR frame into an exception."""
+    if frame.type == ERROR:
+        error_type = frame.meta.get("type")
+        message = frame.meta.get("error", "Unknown inference server error")
+        if error_type == "ValueError":
+            raise ValueError(message)
+        raise RemoteInferenceError(message)
+    if expected is not None and frame.type != expected:
+        raise RemoteInferenceError(f"Unexpected frame type {frame.type}, wanted {expected}")
+    return frame
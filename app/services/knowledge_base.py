@@ -0,0 +1,322 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.faiss_db import FAISSDatabase
+from app.core.metrics import KB_RELOADS
+from app.core.logging import logger
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# File in KB_DIR naming the version directory to serve
+POINTER_FILE = "CURRENT"
+
+
+def list_versions(root: Path) -> List[str]:
+    """Version directories under root, oldest first."""
+    if not root.is_dir():
+        return []
+    directories = [
+        path for path in root.iterdir()
+        if path.is_dir() and not path.name.startswith(".")
+    ]
+    return [path.name for path in sorted(directories, key=lambda path: path.stat().st_mtime)]
+
+
+def read_pointer(root: Path) -> Optional[str]:
+    """Version named by the pointer file, else the newest version directory."""
+    pointer = root / POINTER_FILE
+    if pointer.exists():
+        return pointer.read_text(encoding="utf-8").strip() or None
+    versions = list_versions(root)
+    return versions[-1] if versions else None
+
+
+def version_directory(root: Path, version: str) -> Path:
+    """Directory of a version under root, refusing names that leave root."""
+    if Path(version).name != version or version.startswith("."):
+        raise ValueError(f"Invalid knowledge base version: {version}")
+    directory = root / version
+    if not directory.is_dir():
+        raise FileNotFoundError(f"Knowledge base version not found: {directory}")
+    return directory
+
+
+def write_pointer(root: Path, version: str):
+    """Point root at a version directory, atomically."""
+    version_directory(root, version)
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix=f".{POINTER_FILE}.")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, root / POINTER_FILE)
+
+
+def staging_directory(root: Path, base_version: Optional[str] = None) -> Path:
+    """Fresh directory to build a version in, seeded with base_version for incremental builds."""
+    root.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=root, prefix=".staging-"))
+    if base_version:
+        shutil.copytree(root / base_version, staging, dirs_exist_ok=True)
+    return staging
+
+
+def publish_version(root: Path, staging: Path) -> str:
+    """Rename a finished build to its config version and point root at it."""
+    config_path = staging / Path(settings.config_path).name
+    with open(config_path, "r", encoding="utf-8") as f:
+        version = json.load(f)["version"]
+
+    target = root / version
+    if target.exists():
+        # Same content as an existing version
+        shutil.rmtree(staging)
+    else:
+        os.replace(staging, target)
+    write_pointer(root, version)
+    return version
+
+
+def prune_versions(
+    root: Path,
+    keep: int,
+    protect: Sequence[Optional[str]] = (),
+    min_age: float = 0.0
+) -> List[str]:
+    """Delete all but the newest keep versions, never the current one or protect.
+
+    Pass the version that was current before a publish in protect: workers
+    that have not swapped yet may still be loading its files. Versions
+    modified less than min_age seconds ago are kept as well.
+    """
+    current = read_pointer(root)
+    old = [
+        version for version in list_versions(root)
+        if version != current and version not in protect
+    ]
+    now = time.time()
+    removed = [
+        version for version in old[:max(len(old) - (keep - 1), 0)]
+        if now - (root / version).stat().st_mtime >= min_age
+    ]
+    for version in removed:
+        shutil.rmtree(root / version)
+    return removed
+
+
+class _Version:
+    """A database being served and the searches currently using it."""
+
+    def __init__(self, database: FAISSDatabase, name: Optional[str], marker: Any):
+        self.database = database
+        self.name = name
+        self.marker = marker
+        self.refs = 0
+        self.retired = False
+        self.activated_at = time.time()
+
+
+class KnowledgeBase:
+    """The FAISS database being served, swappable for a new version without downtime.
+
+    With KB_DIR set, every version lives in its own directory and the pointer
+    file names the one to serve. Without it the flat artifact paths from the
+    settings are served and a rebuilt config file counts as a new version.
+
+    Searches lease the current database with acquire(). A reload loads and
+    warms the new version next to the old one, then swaps it in; the old
+    database is closed once its last lease is returned.
+    """
+
+    def __init__(self, root: Optional[str] = None, watch_interval: Optional[float] = None):
+        root = root or settings.kb_dir
+        self.root = Path(root) if root else None
+        self.watch_interval = (
+            watch_interval if watch_interval is not None else settings.kb_watch_interval
+        )
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._retired: List[_Version] = []
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+        # Target that failed to load, the watcher does not retry it
+        self._failed_marker: Any = None
+
+        name, directory, marker = self._target()
+        self._current = _Version(self._open(directory), name, marker)
+
+    def _target(self) -> Tuple[Optional[str], Optional[Path], Any]:
+        """Version that should be served: its name, directory and change marker."""
+        if self.root is None:
+            config_path = Path(settings.config_path)
+            marker = config_path.stat().st_mtime_ns if config_path.exists() else None
+            return None, None, marker
+
+        name = read_pointer(self.root)
+        if name is None:
+            # Nothing published yet, loading fails until a version appears
+            return None, self.root, None
+        return name, self.root / name, name
+
+    @staticmethod
+    def _open(directory: Optional[Path]) -> FAISSDatabase:
+        if directory is None:
+            return FAISSDatabase()
+        return FAISSDatabase.from_directory(directory)
+
+    @property
+    def database(self) -> FAISSDatabase:
+        """The database new searches go to."""
+        return self._current.database
+
+    @contextmanager
+    def acquire(self) -> Iterator[FAISSDatabase]:
+        """Lease the current database; a reload does not free it before the lease ends."""
+        with self._lock:
+            version = self._current
+            version.refs += 1
+        try:
+            yield version.database
+        finally:
+            with self._lock:
+                version.refs -= 1
+                free = version.retired and version.refs == 0
+                if free:
+                    self._retired.remove(version)
+            if free:
+                self._free(version)
+
+    def _free(self, version: _Version):
+        logger.info(f"Closing knowledge base version {version.name or version.database.version}")
+        version.database.close()
+
+    def swap(self, database: FAISSDatabase, name: Optional[str] = None, marker: Any = None):
+        """Serve database from now on; the old one is closed once its searches finish."""
+        with self._lock:
+            old = self._current
+            self._current = _Version(database, name, marker)
+            old.retired = True
+            free = old.refs == 0
+            if not free:
+                self._retired.append(old)
+        if free:
+            self._free(old)
+
+    def _check_compatible(self, database: FAISSDatabase):
+        """Refuse versions built for a different embedding model."""
+        model = database.config.get("embedding_model")
+        if model and model != settings.embedding_model:
+            raise ValueError(
+                f"Knowledge base was built with {model}, the service embeds with "
+                f"{settings.embedding_model}"
+            )
+        current = self._current.database
+        if current.is_loaded() and current.index.d != database.index.d:
+            raise ValueError(
+                f"Knowledge base dimension {database.index.d} does not match "
+                f"the served {current.index.d}"
+            )
+
+    def reload(self, version: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+        """Load the target version, or version, and swap it in.
+
+        Blocks the calling thread while loading; searches keep using the old
+        version until the swap. A selected version is only written to the
+        pointer file once it loaded and passed the checks, so a broken one is
+        never activated for other workers or restarts. Returns the status
+        afterwards.
+        """
+        with self._reload_lock:
+            if version is not None:
+                if self.root is None:
+                    raise ValueError("Selecting a version needs KB_DIR")
+                name, directory, marker = version, version_directory(self.root, version), version
+            else:
+                name, directory, marker = self._target()
+            if marker == self._current.marker and not force:
+                if version is not None:
+                    write_pointer(self.root, version)
+                return self.status()
+
+            logger.info(f"Loading knowledge base version {name or marker}")
+            start_time = time.perf_counter()
+            database = self._open(directory)
+            try:
+                database.load()
+                self._check_compatible(database)
+                # Fault in the index pages before requests hit them
+                database.search(np.zeros(database.index.d, dtype="float32"), k=1)
+                if version is not None:
+                    write_pointer(self.root, version)
+            except Exception as e:
+                KB_RELOADS.labels(result="failed").inc()
+                self.last_error = str(e)
+                self._failed_marker = marker
+                database.close()
+                logger.error(f"Knowledge base reload failed: {str(e)}")
+                raise
+
+            self.swap(database, name, marker)
+            self.last_error = None
+            self._failed_marker = None
+            KB_RELOADS.labels(result="ok").inc()
+            logger.info(
+                f"✅ Serving knowledge base version {database.version} "
+                f"(loaded in {time.perf_counter() - start_time:.2f}s)"
+            )
+            return self.status()
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            try:
+                marker = self._target()[2]
+                # A version that failed to load is retried once the target changes again
+                if marker != self._current.marker and marker != self._failed_marker:
+                    self.reload()
+            except Exception as e:
+                # Keep serving the old version
+                logger.warning(f"Knowledge base watch: {str(e)}")
+
+    def start_watcher(self):
+        """Poll for a new version every KB_WATCH_INTERVAL seconds, if set."""
+        if self.watch_interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="kb-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching for knowledge base versions every {self.watch_interval}s")
+
+    def stop_watcher(self):
+        """Stop polling for new versions."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def status(self) -> Dict[str, Any]:
+        """Served version and versions still finishing searches, without loading anything."""
+        with self._lock:
+            current = self._current
+            retiring = [
+                {"version": version.name or version.database.version, "in_flight": version.refs}
+                for version in self._retired
+            ]
+        return {
+            "version": current.database.version,
+            "created_at": current.database.created_at,
+            "directory": str(self.root / current.name) if current.name else None,
+            "activated_at": current.activated_at,
+            "in_flight": current.refs,
+            "retiring": retiring,
+            "available": list_versions(self.root) if self.root else [],
+            "last_error": self.last_error,
+        }
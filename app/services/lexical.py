@@ -0,0 +1,198 @@
+import os
+import tempfile
+import numpy as np
+from collections import Counter
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Iterable, List, Dict, Sequence, Tuple
+from app.utils.text_processing import tokenize
+from app.core.logging import logger
+
+FORMAT_VERSION = 1
+
+
+class BM25Index:
+    """BM25 inverted index with postings in CSR arrays.
+
+    Postings of term t are doc_ids[indptr[t]:indptr[t + 1]] with their
+    precomputed BM25 weights in the same slice of weights, so a query is a
+    handful of array slices and one bincount.
+    """
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+        num_docs: int,
+        source: str = ""
+    ):
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.num_docs = num_docs
+        self.source = source
+
+    @classmethod
+    def build(
+        cls,
+        documents: Iterable[str],
+        k1: float = 1.2,
+        b: float = 0.75,
+        source: str = ""
+    ) -> "BM25Index":
+        """Tokenize documents and precompute the weight of every posting."""
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for doc_id, text in enumerate(documents):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        num_docs = len(lengths)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avg_length = float(lengths.mean()) if num_docs and lengths.sum() else 1.0
+
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            indptr[i + 1] = indptr[i] + len(postings[term])
+
+        doc_ids = np.empty(indptr[-1], dtype=np.int32)
+        tfs = np.empty(indptr[-1], dtype=np.float32)
+        idf = np.empty(indptr[-1], dtype=np.float32)
+        for i, term in enumerate(terms):
+            start, end = indptr[i], indptr[i + 1]
+            entries = np.asarray(postings[term], dtype=np.int64)
+            doc_ids[start:end] = entries[:, 0]
+            tfs[start:end] = entries[:, 1]
+            df = end - start
+            idf[start:end] = np.log(1.0 + (num_docs - df + 0.5) / (df + 0.5))
+
+        norm = k1 * (1.0 - b + b * lengths[doc_ids] / avg_length)
+        weights = (idf * tfs * (k1 + 1.0) / (tfs + norm)).astype(np.float32)
+
+        return cls(terms, indptr, doc_ids, weights, num_docs, source)
+
+    @classmethod
+    def from_metadata(
+        cls,
+        metadata: Sequence[Mapping],
+        fields: Sequence[str] = ("subject", "answer"),
+        k1: float = 1.2,
+        b: float = 0.75,
+        source: str = ""
+    ) -> "BM25Index":
+        """Index the text fields of every metadata row."""
+        documents = (
+            " ".join(str(row[field]) for field in fields if row.get(field))
+            for row in metadata
+        )
+        return cls.build(documents, k1=k1, b=b, source=source)
+
+    def search(self, query: str, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k documents by BM25 score, best first."""
+        term_ids = [
+            self.vocabulary[term] for term in set(tokenize(query))
+            if term in self.vocabulary
+        ]
+        if not term_ids:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        docs = np.concatenate([self.doc_ids[self.indptr[t]:self.indptr[t + 1]] for t in term_ids])
+        weights = np.concatenate([self.weights[self.indptr[t]:self.indptr[t + 1]] for t in term_ids])
+
+        # Sum per document over the matched postings only
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights).astype(np.float32)
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top], unique_docs[top].astype(np.int64)
+
+    def save(self, path: Path):
+        """Write the index as a single .npz, atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        terms = np.array(
+            sorted(self.vocabulary, key=self.vocabulary.get), dtype=np.str_
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    format=np.array(FORMAT_VERSION),
+                    source=np.array(self.source),
+                    num_docs=np.array(self.num_docs),
+                    terms=terms,
+                    indptr=self.indptr,
+                    doc_ids=self.doc_ids,
+                    weights=self.weights
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        """Read an index written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format"]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported BM25 index format: {int(data['format'])}")
+            return cls(
+                data["terms"].tolist(),
+                data["indptr"],
+                data["doc_ids"],
+                data["weights"],
+                int(data["num_docs"]),
+                str(data["source"])
+            )
+
+
+def load_or_build(
+    path: Path,
+    metadata: Sequence[Mapping],
+    source: str,
+    k1: float = 1.2,
+    b: float = 0.75
+) -> BM25Index:
+    """Load the persisted index if it was built from the same knowledge base, else rebuild it."""
+    path = Path(path)
+    if path.exists():
+        try:
+            index = BM25Index.load(path)
+            if index.source == source and index.num_docs == len(metadata):
+                return index
+            logger.info("BM25 index is stale, rebuilding")
+        except (ValueError, KeyError, OSError) as e:
+            logger.warning(f"Cannot read BM25 index {path}: {str(e)}")
+
+    logger.info(f"Building BM25 index over {len(metadata)} documents")
+    index = BM25Index.from_metadata(metadata, k1=k1, b=b, source=source)
+    try:
+        index.save(path)
+    except OSError as e:
+        # Read-only data directory: keep the in-memory index
+        logger.warning(f"Cannot persist BM25 index to {path}: {str(e)}")
+    return index
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]],
+    k: int = 60
+) -> List[Tuple[int, float]]:
+    """Fuse ranked lists of document ids, best first."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
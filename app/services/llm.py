@@ -1,33 +1,306 @@
-import torch
-import re
-from typing import List, Dict, Optional
-from transformers import pipeline
+import copy
+import hashlib
+import threading
+import time
+from pathlib import Path
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import TYPE_CHECKING, List, Dict, Optional, Iterator, Any, Tuple
+from app.utils.text_processing import clean_generated_text, truncate_after_bullets, StreamingTextCleaner
+from app.services.loader import LazyResource, save_atomically
+from app.core.resources import apply_stage_limits
+from app.core.startup import startup_timeline
+from app.core.metrics import (
+    STAGE_LATENCY, LLM_PROMPT_TOKENS, LLM_GENERATED_TOKENS, LLM_TOKENS_PER_SECOND, LLM_STOP_REASONS,
+    LLM_DRAFT_TOKENS, LLM_DRAFT_ACCEPTANCE
+)
 from app.core.logging import logger
 from app.core.config import get_settings
 
+if TYPE_CHECKING:
+    from app.services.stopping import DecodeClock, EarlyStoppingCriteria
+
 settings = get_settings()
 
+LLM_BACKENDS = ("bf16", "int8")
+SPECULATIVE_MODES = ("off", "prompt_lookup", "draft_model")
+# State dict of the int8 model, next to its config in the quantized cache
+QUANTIZED_WEIGHTS = "quantized_state_dict.pt"
+
+SYSTEM_PROMPT = (
+    "You are an IT helpdesk assistant.\n"
+    "Rules: Answer ONLY in English. Be concise. Use clear bullet points.\n"
+    "If the provided context is irrelevant or empty, answer with standard best-practice steps.\n"
+    "Do NOT mention purchases, receipts, or unrelated items."
+)
+
+
+class StopReason(str, Enum):
+    """Why generation of a response ended."""
+    EOS = "eos"
+    MAX_TOKENS = "max_tokens"
+    BULLETS = "bullets"
+    REPETITION = "repetition"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class _PrefixCache:
+    """Prefilled KV cache of the prompt tokens shared by every request."""
+    key: Tuple[Any, ...]
+    input_ids: List[int]
+    past_key_values: Any
+
+
+@dataclass
+class GenerationStats:
+    """Token counts and stage timings of one generate call (shared by its whole batch)."""
+    batch_size: int = 0
+    prompt_tokens: int = 0
+    generated_tokens: int = 0
+    template_time: float = 0.0
+    prefill_time: float = 0.0
+    decode_time: float = 0.0
+    # One StopReason value per row
+    stop_reasons: List[str] = field(default_factory=list)
+    # Forward passes of the LLM after the prompt, and with speculative
+    # decoding the drafted tokens it accepted
+    decode_steps: int = 0
+    speculative: bool = False
+    draft_tokens: int = 0
+    
+    @property
+    def tokens_per_second(self) -> float:
+        """Decode throughput over the batch."""
+        return self.generated_tokens / self.decode_time if self.decode_time > 0 else 0.0
+    
+    @property
+    def draft_acceptance_rate(self) -> float:
+        """Share of the generated tokens that came from the drafter."""
+        return self.draft_tokens / self.generated_tokens if self.generated_tokens else 0.0
+    
+    def record(self):
+        """Export to the Prometheus stage histograms and token counters."""
+        STAGE_LATENCY.labels(stage="template").observe(self.template_time)
+        STAGE_LATENCY.labels(stage="prefill").observe(self.prefill_time)
+        STAGE_LATENCY.labels(stage="decode").observe(self.decode_time)
+        LLM_PROMPT_TOKENS.inc(self.prompt_tokens)
+        LLM_GENERATED_TOKENS.inc(self.generated_tokens)
+        if self.decode_time > 0:
+            LLM_TOKENS_PER_SECOND.observe(self.tokens_per_second)
+        for reason in self.stop_reasons:
+            LLM_STOP_REASONS.labels(reason=reason).inc()
+        if self.speculative:
+            LLM_DRAFT_TOKENS.inc(self.draft_tokens)
+            LLM_DRAFT_ACCEPTANCE.observe(self.draft_acceptance_rate)
+
 
 class LLMService:
-    """Service for managing the TinyLlama LLM."""
+    """Service for managing the TinyLlama LLM.
+    
+    torch and transformers are imported when a model is first loaded, so
+    importing the service (e.g. in API workers of a remote setup) stays cheap.
+    """
     
-    def __init__(self, model_id: Optional[str] = None):
+    def __init__(
+        self,
+        model_id: Optional[str] = None,
+        backend: Optional[str] = None,
+        speculative_mode: Optional[str] = None,
+        draft_model_id: Optional[str] = None
+    ):
         self.model_id = model_id or settings.llm_model_id
-        self._pipeline = None
+        self.backend = backend or settings.llm_backend
+        if self.backend not in LLM_BACKENDS:
+            raise ValueError(f"Invalid LLM backend. Must be one of {list(LLM_BACKENDS)}")
+        self.speculative_mode = speculative_mode or settings.llm_speculative_mode
+        if self.speculative_mode not in SPECULATIVE_MODES:
+            raise ValueError(f"Invalid speculative decoding mode. Must be one of {list(SPECULATIVE_MODES)}")
+        self.draft_model_id = draft_model_id or settings.llm_draft_model_id
+        if self.speculative_mode == "draft_model" and not self.draft_model_id:
+            raise ValueError("Speculative decoding with a draft model needs LLM_DRAFT_MODEL_ID")
+        self._pipeline = LazyResource("llm", self._load_pipeline)
+        self._draft_model = LazyResource("llm_draft", self._load_draft_model)
+        self._tokenizer = LazyResource("llm_tokenizer", self._load_tokenizer)
+        self._prefix_cache: Optional[_PrefixCache] = None
+        self._prefix_lock = threading.Lock()
+        # Off in the inference server, API workers export the stats it returns
+        self.record_metrics = True
         
     @property
-    def pipeline(self):
-        """Lazy load pipeline."""
-        if self._pipeline is None:
-            logger.info(f"Loading LLM pipeline: {self.model_id}")
-            self._pipeline = pipeline(
+    def quantized_cache_path(self) -> Path:
+        """Directory where the int8 model is cached between startups."""
+        import torch
+        import transformers
+        
+        name = self.model_id.replace("/", "--")
+        versions = f"torch{torch.__version__}-transformers{transformers.__version__}"
+        return Path(settings.llm_quantized_cache_dir) / f"{name}-int8-{versions}"
+    
+    @property
+    def local_model_dir(self) -> Optional[Path]:
+        """Where persist() saves the tokenizer and weights, None without MODEL_CACHE_DIR."""
+        if not settings.model_cache_dir:
+            return None
+        return Path(settings.model_cache_dir) / "llm" / self.model_id.replace("/", "--")
+    
+    def _pretrained_source(self, part: str) -> str:
+        """Local copy of the tokenizer or bf16 weights if persisted, else the hub model id."""
+        local_dir = self.local_model_dir
+        if local_dir is not None and (local_dir / part).exists():
+            return str(local_dir / part)
+        return self.model_id
+    
+    def _load_tokenizer(self):
+        """Load the tokenizer on its own, for counting tokens without the model."""
+        from transformers import AutoTokenizer
+        
+        return AutoTokenizer.from_pretrained(self._pretrained_source("tokenizer"))
+    
+    @staticmethod
+    def _quantize(model):
+        """Replace the Linear layers by dynamically quantized int8 ones."""
+        import torch
+        
+        return torch.ao.quantization.quantize_dynamic(
+            model,
+            {torch.nn.Linear},
+            dtype=torch.qint8
+        )
+    
+    def _load_int8_model(self):
+        """Load the int8 dynamically quantized model, quantizing on first use.
+        
+        The cache holds the config and the quantized state_dict, no pickled
+        module: a cached model is rebuilt from its config, quantized the same
+        way and filled with weights loaded with weights_only=True.
+        """
+        import torch
+        from transformers import AutoConfig, AutoModelForCausalLM, GenerationConfig
+        
+        cache_dir = self.quantized_cache_path
+        if cache_dir.exists():
+            logger.info(f"Loading quantized LLM from {cache_dir}")
+            model = AutoModelForCausalLM.from_config(
+                AutoConfig.from_pretrained(str(cache_dir)),
+                torch_dtype=torch.float32
+            )
+            model.eval()
+            model = self._quantize(model)
+            model.load_state_dict(
+                torch.load(cache_dir / QUANTIZED_WEIGHTS, weights_only=True)
+            )
+            if (cache_dir / "generation_config.json").exists():
+                model.generation_config = GenerationConfig.from_pretrained(str(cache_dir))
+            return model
+        
+        logger.info("Quantizing LLM Linear layers to int8 (first startup only)")
+        model = AutoModelForCausalLM.from_pretrained(
+            self.model_id,
+            torch_dtype=torch.float32
+        )
+        model.eval()
+        model = self._quantize(model)
+        
+        def save(path: str):
+            model.config.save_pretrained(path)
+            model.generation_config.save_pretrained(path)
+            torch.save(model.state_dict(), Path(path) / QUANTIZED_WEIGHTS)
+        
+        save_atomically(save, cache_dir)
+        return model
+    
+    def _load_pipeline(self):
+        """Load the text-generation pipeline for the configured backend."""
+        logger.info(f"Loading LLM pipeline: {self.model_id} ({self.backend})")
+        with startup_timeline.phase("import:transformers"):
+            import torch
+            from transformers import AutoTokenizer, pipeline
+        
+        tokenizer_source = self._pretrained_source("tokenizer")
+        if self.backend == "int8":
+            llm_pipeline = pipeline(
+                "text-generation",
+                model=self._load_int8_model(),
+                tokenizer=AutoTokenizer.from_pretrained(tokenizer_source),
+                device="cpu"
+            )
+        else:
+            llm_pipeline = pipeline(
                 "text-generation",
-                model=self.model_id,
+                model=self._pretrained_source("bf16"),
+                tokenizer=tokenizer_source,
                 torch_dtype=torch.bfloat16,
                 device_map="auto"
             )
-            logger.info("✅ LLM pipeline loaded")
-        return self._pipeline
+        tokenizer = llm_pipeline.tokenizer
+        # Batched generation needs left padding and a pad token
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        logger.info("✅ LLM pipeline loaded")
+        return llm_pipeline
+    
+    def _load_draft_model(self):
+        """Load the small model that drafts tokens for the LLM to verify.
+        
+        It has to share the LLM's tokenizer (e.g. a small Llama for TinyLlama).
+        """
+        import torch
+        from transformers import AutoModelForCausalLM
+        
+        logger.info(f"Loading draft model: {self.draft_model_id}")
+        model = AutoModelForCausalLM.from_pretrained(
+            self.draft_model_id,
+            # The int8 backend runs in float32 apart from its Linear layers
+            torch_dtype=torch.float32 if self.backend == "int8" else torch.bfloat16
+        ).to(self.model.device)
+        model.eval()
+        logger.info("✅ Draft model loaded")
+        return model
+    
+    def persist(self) -> Optional[Path]:
+        """Save the loaded tokenizer (and bf16 weights) to MODEL_CACHE_DIR.
+        
+        Later startups load them from local disk instead of resolving the model
+        on the hub; the int8 backend loads its own quantized cache.
+        """
+        local_dir = self.local_model_dir
+        if local_dir is None:
+            return None
+        llm_pipeline = self.pipeline
+        save_atomically(llm_pipeline.tokenizer.save_pretrained, local_dir / "tokenizer")
+        if self.backend == "bf16":
+            save_atomically(llm_pipeline.model.save_pretrained, local_dir / "bf16")
+        return local_dir
+    
+    @property
+    def draft_model(self):
+        """Lazy load the draft model."""
+        return self._draft_model.get()
+    
+    @property
+    def pipeline(self):
+        """Lazy load pipeline."""
+        return self._pipeline.get()
+    
+    @property
+    def model(self):
+        """Get the underlying causal LM."""
+        return self.pipeline.model
+    
+    @property
+    def tokenizer(self):
+        """Get the tokenizer."""
+        return self.pipeline.tokenizer
+    
+    @property
+    def text_tokenizer(self):
+        """Tokenizer for counting tokens, without loading the model for it."""
+        llm_pipeline = self._pipeline.peek()
+        if llm_pipeline is not None:
+            return llm_pipeline.tokenizer
+        return self._tokenizer.get()
     
     def build_messages(
         self,
@@ -35,13 +308,6 @@ class LLMService:
         context_snippet: str = ""
     ) -> List[Dict[str, str]]:
         """Build chat messages."""
-        system_prompt = (
-            "You are an IT helpdesk assistant.\n"
-            "Rules: Answer ONLY in English. Be concise. Use clear bullet points.\n"
-            "If the provided context is irrelevant or empty, answer with standard best-practice steps.\n"
-            "Do NOT mention purchases, receipts, or unrelated items."
-        )
-        
         user_prompt = (
             f"Question: {question}\n\n"
             f"Context (may be empty or unrelated):\n```{context_snippet}```\n\n"
@@ -49,50 +315,324 @@ class LLMService:
         )
         
         return [
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": user_prompt},
         ]
     
+    def render_prompt(self, messages: List[Dict[str, str]]) -> str:
+        """Apply the chat template to messages."""
+        return self.tokenizer.apply_chat_template(
+            messages,
+            tokenize=False,
+            add_generation_prompt=True
+        )
+    
+    def _prefix_key(self) -> Tuple[Any, ...]:
+        """Changes whenever the model, its chat template or the system prompt does."""
+        template = self.tokenizer.chat_template or ""
+        return (
+            self.model_id,
+            id(self.model),
+            hashlib.sha1(template.encode("utf-8")).hexdigest(),
+            SYSTEM_PROMPT
+        )
+    
+    def _shared_prefix_ids(self) -> List[int]:
+        """Tokens every rendered prompt starts with (system prompt and template)."""
+        first, second = (
+            self.tokenizer(self.render_prompt(self.build_messages(question)))["input_ids"]
+            for question in ("a", "z")
+        )
+        length = 0
+        for a, b in zip(first, second):
+            if a != b:
+                break
+            length += 1
+        return first[:length]
+    
+    def warmup_prefix_cache(self) -> Optional[_PrefixCache]:
+        """Prefill the shared prompt prefix once and keep its past_key_values."""
+        if not settings.llm_prefix_cache_enabled:
+            return None
+        
+        key = self._prefix_key()
+        cache = self._prefix_cache
+        if cache is not None and cache.key == key:
+            return cache
+        
+        with self._prefix_lock:
+            cache = self._prefix_cache
+            if cache is not None and cache.key == key:
+                return cache
+            
+            prefix_ids = self._shared_prefix_ids()
+            if not prefix_ids:
+                return None
+            
+            import torch
+            
+            logger.info(f"Prefilling {len(prefix_ids)} shared prompt tokens")
+            with torch.inference_mode():
+                outputs = self.model(
+                    torch.tensor([prefix_ids], device=self.model.device),
+                    use_cache=True
+                )
+            self._prefix_cache = _PrefixCache(key, prefix_ids, outputs.past_key_values)
+            return self._prefix_cache
+    
+    def _prepare_inputs(self, prompts: List[str]) -> Dict[str, Any]:
+        """Tokenize prompts, reusing the prefilled prefix cache when possible."""
+        tokenizer = self.tokenizer
+        prefix = self.warmup_prefix_cache()
+        
+        if prefix is not None:
+            encoded = tokenizer(prompts)["input_ids"]
+            length = len(prefix.input_ids)
+            if all(ids[:length] == prefix.input_ids for ids in encoded):
+                # Layout per row: [prefix][padding][suffix]; positions come
+                # from the attention mask, so the prefix cache fits every row
+                suffixes = [ids[length:] for ids in encoded]
+                width = max(len(suffix) for suffix in suffixes)
+                input_ids, attention_mask = [], []
+                for suffix in suffixes:
+                    padding = width - len(suffix)
+                    input_ids.append(
+                        prefix.input_ids + [tokenizer.pad_token_id] * padding + suffix
+                    )
+                    attention_mask.append([1] * length + [0] * padding + [1] * len(suffix))
+                
+                past_key_values = copy.deepcopy(prefix.past_key_values)
+                if len(prompts) > 1:
+                    past_key_values.batch_repeat_interleave(len(prompts))
+                
+                import torch
+                
+                device = self.model.device
+                return {
+                    "input_ids": torch.tensor(input_ids, device=device),
+                    "attention_mask": torch.tensor(attention_mask, device=device),
+                    "past_key_values": past_key_values,
+                }
+            
+            logger.warning("Prompt does not start with the cached prefix, prefilling in full")
+        
+        # Left-padded so every prompt ends right where generation starts
+        return tokenizer(
+            prompts,
+            return_tensors="pt",
+            padding=True
+        ).to(self.model.device)
+    
     def generate(
         self,
         messages: List[Dict[str, str]],
-        max_new_tokens: int = 130
+        max_new_tokens: int = 130,
+        stats: Optional[GenerationStats] = None
     ) -> str:
         """Generate response from messages."""
-        # Apply chat template
-        prompt = self.pipeline.tokenizer.apply_chat_template(
-            messages,
-            tokenize=False,
-            add_generation_prompt=True
+        return self.generate_batch([messages], [max_new_tokens], stats)[0]
+    
+    def _tokenize_prompts(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        stats: GenerationStats
+    ) -> Dict[str, Any]:
+        """Render and tokenize the prompts, timing it as the template stage."""
+        start_time = time.perf_counter()
+        prompts = [self.render_prompt(messages) for messages in batch_messages]
+        inputs = self._prepare_inputs(prompts)
+        stats.template_time = time.perf_counter() - start_time
+        stats.batch_size = len(batch_messages)
+        stats.prompt_tokens = int(inputs["attention_mask"].sum())
+        return inputs
+    
+    def _finish_stats(
+        self,
+        stats: GenerationStats,
+        clock: "DecodeClock",
+        start_time: float,
+        generated_tokens: int,
+        speculative: bool = False
+    ):
+        """Split the generate call into prefill and decode and export it."""
+        end_time = time.perf_counter()
+        first_token_at = clock.first_token_at or end_time
+        stats.prefill_time = first_token_at - start_time
+        stats.decode_time = end_time - first_token_at
+        stats.generated_tokens = generated_tokens
+        stats.decode_steps = clock.steps
+        stats.speculative = speculative
+        if speculative:
+            # Every verification pass adds one token of the LLM's own
+            # after the drafted tokens it accepted
+            stats.draft_tokens = max(generated_tokens - clock.steps, 0)
+        if self.record_metrics:
+            stats.record()
+    
+    def _stopping_criteria(self, prompt_length: int, max_new_tokens: List[int]) -> "EarlyStoppingCriteria":
+        """Per-row stopping on EOS, token limit, completed bullets and repetition."""
+        from app.services.stopping import EarlyStoppingCriteria
+        
+        return EarlyStoppingCriteria(
+            self.tokenizer,
+            prompt_length,
+            max_new_tokens,
+            eos_token_id=self.tokenizer.eos_token_id,
+            max_bullets=settings.llm_max_bullets,
+            ngram_size=settings.llm_repetition_ngram,
+            max_ngram_repeats=settings.llm_repetition_max
         )
+    
+    def _speculative_kwargs(self, batch_size: int) -> Dict[str, Any]:
+        """generate() arguments for assisted decoding, which only runs one prompt at a time."""
+        if self.speculative_mode == "off" or batch_size != 1:
+            return {}
+        if self.speculative_mode == "prompt_lookup":
+            # Drafts by copying what followed the latest n-gram in the
+            # prompt, which holds the retrieved answers
+            return {
+                "prompt_lookup_num_tokens": settings.llm_speculative_tokens,
+                "max_matching_ngram_size": settings.llm_prompt_lookup_ngram,
+            }
+        return {
+            "assistant_model": self.draft_model,
+            "num_assistant_tokens": settings.llm_speculative_tokens,
+        }
+    
+    def generate_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        max_new_tokens: List[int],
+        stats: Optional[GenerationStats] = None
+    ) -> List[str]:
+        """Generate responses for several conversations in one forward pass."""
+        if len(batch_messages) != len(max_new_tokens):
+            raise ValueError("batch_messages and max_new_tokens must have the same length")
+        
+        import torch
+        from transformers import StoppingCriteriaList
+        from app.services.stopping import DecodeClock
+        
+        stats = stats if stats is not None else GenerationStats()
+        tokenizer = self.tokenizer
+        inputs = self._tokenize_prompts(batch_messages, stats)
+        
+        prompt_length = inputs["input_ids"].shape[1]
+        clock = DecodeClock()
+        stopper = self._stopping_criteria(prompt_length, max_new_tokens)
+        speculative = self._speculative_kwargs(len(batch_messages))
+        start_time = time.perf_counter()
+        with torch.inference_mode():
+            output_ids = self.model.generate(
+                **inputs,
+                **speculative,
+                max_new_tokens=max(max_new_tokens),
+                do_sample=False,  # Deterministic for consistency
+                pad_token_id=tokenizer.pad_token_id,
+                eos_token_id=tokenizer.eos_token_id,
+                stopping_criteria=StoppingCriteriaList([clock, stopper]),
+            )
+        
+        # Greedy decoding is per-row, so cutting each row where it stopped
+        # gives the same text as a standalone call
+        responses = []
+        generated_tokens = 0
+        stats.stop_reasons = []
+        for row, (reason, cut) in zip(output_ids, stopper.finish()):
+            generated = row[prompt_length:prompt_length + cut]
+            # Finished rows are padded up to the longest one
+            generated_tokens += int((generated != tokenizer.pad_token_id).sum())
+            text = tokenizer.decode(generated, skip_special_tokens=True)
+            if reason == StopReason.BULLETS:
+                # The last token may run past the line break
+                text = truncate_after_bullets(text, settings.llm_max_bullets) or text
+            responses.append(clean_generated_text(text))
+            stats.stop_reasons.append(reason.value)
         
-        # Generate
-        outputs = self.pipeline(
-            prompt,
-            max_new_tokens=max_new_tokens,
-            do_sample=False,  # Deterministic for consistency
-            temperature=0.7,
-            top_k=50,
-            top_p=0.95,
-            pad_token_id=self.pipeline.tokenizer.pad_token_id,
-            eos_token_id=self.pipeline.tokenizer.eos_token_id,
+        self._finish_stats(stats, clock, start_time, generated_tokens, bool(speculative))
+        return responses
+    
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_new_tokens: int = 130,
+        stats: Optional[GenerationStats] = None
+    ) -> Iterator[str]:
+        """Generate a response, yielding cleaned text as tokens are decoded."""
+        import torch
+        from transformers import StoppingCriteriaList, TextIteratorStreamer
+        from app.services.stopping import CancelledCriteria, DecodeClock
+        
+        stats = stats if stats is not None else GenerationStats()
+        tokenizer = self.tokenizer
+        inputs = self._tokenize_prompts([messages], stats)
+        
+        streamer = TextIteratorStreamer(
+            tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True
         )
+        cancelled = threading.Event()
+        clock = DecodeClock()
+        stopper = self._stopping_criteria(inputs["input_ids"].shape[1], [max_new_tokens])
+        speculative = self._speculative_kwargs(1)
+        errors: List[Exception] = []
+        start_time = time.perf_counter()
         
-        # Extract generated text (remove the prompt)
-        generated_text = outputs[0]["generated_text"]
-        # Remove the prompt part to get only the response
-        if prompt in generated_text:
-            generated_text = generated_text[len(prompt):].strip()
+        def _run():
+            apply_stage_limits("llm")
+            try:
+                with torch.inference_mode():
+                    self.model.generate(
+                        **inputs,
+                        **speculative,
+                        streamer=streamer,
+                        max_new_tokens=max_new_tokens,
+                        do_sample=False,  # Deterministic for consistency
+                        pad_token_id=tokenizer.pad_token_id,
+                        eos_token_id=tokenizer.eos_token_id,
+                        stopping_criteria=StoppingCriteriaList(
+                            [clock, stopper, CancelledCriteria(cancelled)]
+                        ),
+                    )
+            except Exception as e:
+                errors.append(e)
+                # Unblock the consumer
+                streamer.end()
         
-        # Clean output (ASCII only to avoid encoding issues)
-        generated_text = re.sub(r"[^\x09\x0A\x0D\x20-\x7E]", "", generated_text)
+        thread = threading.Thread(target=_run, name="llm-stream", daemon=True)
+        thread.start()
         
-        # Remove any remaining template tokens
-        generated_text = re.sub(r"<\|.*?\|>", "", generated_text).strip()
-        generated_text = re.sub(r"</s>", "", generated_text).strip()
+        # The bullet criterion stops after the step that completed the
+        # bullets, whose tokens can run past the line break
+        cleaner = StreamingTextCleaner(max_bullets=settings.llm_max_bullets)
+        try:
+            for chunk in streamer:
+                text = cleaner.feed(chunk)
+                if text:
+                    yield text
+            
+            tail = cleaner.flush()
+            if tail:
+                yield tail
+        finally:
+            cancelled.set()
+            thread.join()
+            stats.stop_reasons = [reason.value for reason, _ in stopper.finish()]
+            # A decode step can add several tokens when speculating
+            generated_tokens = len(stopper.tokens[0]) if speculative else clock.steps
+            self._finish_stats(stats, clock, start_time, generated_tokens, bool(speculative))
         
-        return generated_text
+        if errors:
+            raise errors[0]
     
     def is_loaded(self) -> bool:
         """Check if model is loaded."""
-        return self._pipeline is not None
\ No newline at end of file
+        return self._pipeline.loaded
+    
+    def load_status(self) -> dict:
+        """Load state of the pipeline, without loading it."""
+        status = self._pipeline.status()
+        if self.speculative_mode == "draft_model":
+            status["draft_model"] = self._draft_model.status()
+        return status
\ No newline at end of file
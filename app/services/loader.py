@@ -0,0 +1,107 @@
+import os
+import shutil
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Dict, Any, Generic, Optional, TypeVar
+from app.core.startup import startup_timeline
+from app.core.logging import logger
+
+T = TypeVar("T")
+
+
+class LoadState(str, Enum):
+    """Lifecycle of a lazily loaded resource."""
+    NOT_LOADED = "not_loaded"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class LazyResource(Generic[T]):
+    """A lazily loaded resource with single-flight initialization.
+
+    Concurrent first callers of get() wait for one load instead of each
+    loading their own copy. A failed load is retried by the next get().
+    State can be inspected without ever triggering a load.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self.state = LoadState.NOT_LOADED
+        self.load_time: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def get(self) -> T:
+        """Return the resource, loading it on first use."""
+        if self.state is LoadState.READY:
+            return self._value
+
+        with self._lock:
+            if self.state is LoadState.READY:
+                return self._value
+
+            self.state = LoadState.LOADING
+            start = time.time()
+            start_time = time.perf_counter()
+            try:
+                value = self._factory()
+            except BaseException as e:
+                self.state = LoadState.FAILED
+                self.error = str(e)
+                logger.error(f"Loading {self.name} failed: {str(e)}")
+                raise
+
+            self._value = value
+            self.load_time = time.perf_counter() - start_time
+            startup_timeline.record(f"load:{self.name}", start, self.load_time)
+            self.error = None
+            self.state = LoadState.READY
+            return value
+
+    def peek(self) -> Optional[T]:
+        """Return the resource if it is loaded, without loading it."""
+        return self._value if self.state is LoadState.READY else None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the resource is loaded."""
+        return self.state is LoadState.READY
+
+    def reset(self):
+        """Forget the loaded resource, the next get() loads it again."""
+        with self._lock:
+            self._value = None
+            self.state = LoadState.NOT_LOADED
+            self.load_time = None
+            self.error = None
+
+    def status(self) -> Dict[str, Any]:
+        """State, load time and last error."""
+        return {
+            "state": self.state.value,
+            "load_time": self.load_time,
+            "error": self.error
+        }
+
+
+def save_atomically(save: Callable[[str], None], target: Path) -> bool:
+    """Write a model directory with save(path) and move it into place when complete.
+
+    Loaders check for target only, so a crash mid-write never leaves a
+    half-written model behind. Returns False if target already exists.
+    """
+    target = Path(target)
+    if target.exists():
+        return False
+    tmp_dir = target.with_name(f".{target.name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.parent.mkdir(parents=True, exist_ok=True)
+    save(str(tmp_dir))
+    os.replace(tmp_dir, target)
+    logger.info(f"Saved {target}")
+    return True
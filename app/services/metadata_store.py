@@ -0,0 +1,204 @@
+import json
+import mmap
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Iterable, Iterator, List, Dict, Any, Optional
+from app.core.logging import logger
+
+FORMAT_VERSION = 1
+
+SCHEMA_FILE = "schema.json"
+OFFSETS_FILE = "offsets.npy"
+PRESENT_FILE = "present.npy"
+BLOB_FILE = "blob.bin"
+
+
+class MetadataRow(Mapping):
+    """Read-only view of one metadata row, fields are decoded on access."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "MetadataStore", row: int):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, key: str) -> Any:
+        column = self._store.column_index.get(key)
+        if column is None or not self._store.present[self._row, column]:
+            raise KeyError(key)
+        return self._store.read_value(self._row, column)
+
+    def __iter__(self) -> Iterator[str]:
+        present = self._store.present[self._row]
+        return (
+            name for column, name in enumerate(self._store.column_names)
+            if present[column]
+        )
+
+    def __len__(self) -> int:
+        return int(self._store.present[self._row].sum())
+
+    def __repr__(self) -> str:
+        return f"MetadataRow({self._row}, {dict(self)!r})"
+
+
+class MetadataStore:
+    """Memory-mapped columnar metadata: per-row offsets into a UTF-8 blob.
+
+    Layout of the store directory:
+    - schema.json: row count and column names/kinds ("str" or "json")
+    - offsets.npy: uint64 (rows, columns + 1), column j of row i spans
+      blob[offsets[i, j]:offsets[i, j + 1]]
+    - present.npy: bool (rows, columns), whether the row has the field
+    - blob.bin: UTF-8 encoded values
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+        with open(self.path / SCHEMA_FILE, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        if schema.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported metadata store format: {schema.get('format')}")
+
+        self.column_names: List[str] = [column["name"] for column in schema["columns"]]
+        self.column_kinds: List[str] = [column["kind"] for column in schema["columns"]]
+        self.column_index: Dict[str, int] = {
+            name: column for column, name in enumerate(self.column_names)
+        }
+        self.rows: int = schema["rows"]
+
+        # Pages are shared between processes through the page cache
+        self.offsets = np.load(self.path / OFFSETS_FILE, mmap_mode="r")
+        self.present = np.load(self.path / PRESENT_FILE, mmap_mode="r")
+        with open(self.path / BLOB_FILE, "rb") as f:
+            self._blob = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if os.fstat(f.fileno()).st_size else b""
+            )
+
+    @classmethod
+    def open(cls, path: Path) -> "MetadataStore":
+        """Open an existing store."""
+        logger.info(f"Opening metadata store {path}")
+        return cls(path)
+
+    def read_value(self, row: int, column: int) -> Any:
+        """Decode a single field."""
+        start = int(self.offsets[row, column])
+        end = int(self.offsets[row, column + 1])
+        text = self._blob[start:end].decode("utf-8")
+        if self.column_kinds[column] == "json":
+            return json.loads(text)
+        return text
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, row: int) -> MetadataRow:
+        row = int(row)
+        if row < 0:
+            row += self.rows
+        if not 0 <= row < self.rows:
+            raise IndexError(f"Metadata row out of range: {row}")
+        return MetadataRow(self, row)
+
+    def __iter__(self) -> Iterator[MetadataRow]:
+        for row in range(self.rows):
+            yield MetadataRow(self, row)
+
+    def close(self):
+        """Release the blob mapping."""
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+
+
+def write_metadata_store(records: List[Dict[str, Any]], path: Path) -> Path:
+    """Write records as a metadata store, replacing any existing one."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Column kinds: plain strings are stored raw, everything else as JSON
+    column_names: List[str] = []
+    string_only: Dict[str, bool] = {}
+    for record in records:
+        for name, value in record.items():
+            if name not in string_only:
+                column_names.append(name)
+                string_only[name] = True
+            if not isinstance(value, str):
+                string_only[name] = False
+    column_kinds = ["str" if string_only[name] else "json" for name in column_names]
+
+    offsets = np.zeros((len(records), len(column_names) + 1), dtype=np.uint64)
+    present = np.zeros((len(records), len(column_names)), dtype=bool)
+
+    tmp_dir = Path(tempfile.mkdtemp(dir=path.parent, prefix=f".{path.name}."))
+    try:
+        position = 0
+        with open(tmp_dir / BLOB_FILE, "wb") as blob:
+            for row, record in enumerate(records):
+                for column, (name, kind) in enumerate(zip(column_names, column_kinds)):
+                    offsets[row, column] = position
+                    if name in record:
+                        present[row, column] = True
+                        value = record[name]
+                        text = value if kind == "str" else json.dumps(value, default=str)
+                        data = text.encode("utf-8")
+                        blob.write(data)
+                        position += len(data)
+                offsets[row, len(column_names)] = position
+            blob.flush()
+            os.fsync(blob.fileno())
+
+        np.save(tmp_dir / OFFSETS_FILE, offsets)
+        np.save(tmp_dir / PRESENT_FILE, present)
+        with open(tmp_dir / SCHEMA_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": FORMAT_VERSION,
+                "rows": len(records),
+                "columns": [
+                    {"name": name, "kind": kind}
+                    for name, kind in zip(column_names, column_kinds)
+                ]
+            }, f, indent=2)
+
+        # Swap the directory in; open readers keep their mappings
+        old_dir = None
+        if path.exists():
+            old_dir = path.with_name(f".{path.name}.old")
+            if old_dir.exists():
+                shutil.rmtree(old_dir)
+            os.replace(path, old_dir)
+        os.replace(tmp_dir, path)
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return path
+
+
+def read_records(store: Iterable[Mapping]) -> List[Dict[str, Any]]:
+    """Materialize rows as plain dicts."""
+    return [dict(row) for row in store]
+
+
+def convert_pickle(pickle_path: Path, store_path: Optional[Path] = None) -> Path:
+    """One-shot conversion of a pickled metadata list into a metadata store."""
+    pickle_path = Path(pickle_path)
+    store_path = Path(store_path or pickle_path.with_suffix(".store"))
+
+    logger.info(f"Converting {pickle_path} to {store_path}")
+    with open(pickle_path, "rb") as f:
+        records = pickle.load(f)
+
+    write_metadata_store(records, store_path)
+    logger.info(f"✅ Wrote {len(records)} rows to {store_path}")
+    return store_path
@@ -0,0 +1,99 @@
+import math
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.utils.text_processing import format_as_bullets
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Vector hits fetched when routing, so the margin has a runner-up to compare with
+MIN_CANDIDATES = 4
+
+
+def answer_key(answer: Any) -> str:
+    """Normalized answer text; hits with the same key give the same response."""
+    return " ".join(str(answer or "").lower().split())
+
+
+def score_margin(hits: Iterable[Tuple[float, Any]]) -> Tuple[float, float]:
+    """Top score and its lead over the best hit with a different answer.
+
+    hits are (score, answer) pairs in descending score order and are consumed
+    lazily. Hits repeating the top answer do not compete with it; without a
+    different answer the margin is infinite.
+    """
+    hits = iter(hits)
+    top_score, top_answer = next(hits)
+    top_key = answer_key(top_answer)
+    for score, answer in hits:
+        if answer_key(answer) != top_key:
+            return float(top_score), float(top_score) - float(score)
+    return float(top_score), math.inf
+
+
+class DirectAnswerRouter:
+    """Decides when the top search hit's stored answer is the response, skipping the LLM.
+
+    A hit qualifies when its vector similarity reaches min_score and leads the
+    best hit with a different answer by min_margin. Both thresholds are picked
+    with scripts/calibrate_direct_answers.py from labelled queries.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        min_score: Optional[float] = None,
+        min_margin: Optional[float] = None,
+        max_bullets: Optional[int] = None
+    ):
+        self.enabled = enabled if enabled is not None else settings.direct_answer_enabled
+        self.min_score = min_score if min_score is not None else settings.direct_answer_min_score
+        self.min_margin = (
+            min_margin if min_margin is not None else settings.direct_answer_min_margin
+        )
+        self.max_bullets = max_bullets if max_bullets is not None else settings.llm_max_bullets
+
+    def accepts(self, score: float, margin: float) -> bool:
+        """Whether a hit with this score and margin is answered directly."""
+        return score >= self.min_score and margin >= self.min_margin
+
+    def candidate_count(self, count: int) -> int:
+        """Vector hits to fetch when count would be fetched without routing."""
+        return max(count, MIN_CANDIDATES) if self.enabled else count
+
+    def evaluate(
+        self,
+        scores: np.ndarray,
+        indices: np.ndarray,
+        get_row: Callable[[int], Mapping[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """The top vector hit with its score and margin, whatever the thresholds."""
+        hits = [(float(score), int(idx)) for score, idx in zip(scores, indices) if idx >= 0]
+        if not hits:
+            return None
+        top_score, margin = score_margin(
+            (score, get_row(idx).get("answer")) for score, idx in hits
+        )
+        return {**get_row(hits[0][1]), "score": top_score, "margin": margin}
+
+    def route(
+        self,
+        scores: np.ndarray,
+        indices: np.ndarray,
+        get_row: Callable[[int], Mapping[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """The top vector hit if its stored answer should be the response, else None."""
+        if not self.enabled:
+            return None
+        hit = self.evaluate(scores, indices, get_row)
+        if hit is None or not answer_key(hit.get("answer")):
+            return None
+        if not self.accepts(hit["score"], hit["margin"]):
+            return None
+        return hit
+
+    def respond(self, hit: Mapping[str, Any]) -> str:
+        """The response for a routed hit: its stored answer as bullet points."""
+        return format_as_bullets(str(hit.get("answer", "")), self.max_bullets)
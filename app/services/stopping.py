@@ -0,0 +1,141 @@
+import threading
+import time
+import torch
+from typing import Dict, List, Optional, Tuple
+from transformers import StoppingCriteria
+from app.services.llm import StopReason
+from app.utils.text_processing import truncate_after_bullets
+
+
+class DecodeClock(StoppingCriteria):
+    """Never stops generation; notes when the first token is out and counts decode steps.
+
+    Stopping criteria run once per forward pass of the LLM, so the first call
+    marks the end of the prefill. With speculative decoding a pass can add
+    several tokens.
+    """
+
+    def __init__(self):
+        self.first_token_at: Optional[float] = None
+        self.steps = 0
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.steps += 1
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+
+class CancelledCriteria(StoppingCriteria):
+    """Stops generation once the consumer has gone away."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        return torch.full(
+            (input_ids.shape[0],), self.event.is_set(),
+            dtype=torch.bool, device=input_ids.device
+        )
+
+
+class EarlyStoppingCriteria(StoppingCriteria):
+    """Stops each row of a batch once its answer is complete or degenerate.
+
+    A row stops on EOS, when it reaches its own token limit, when the
+    requested number of bullet points is complete, or when an n-gram of
+    generated tokens keeps repeating. Called once per decode step with every
+    row's tokens so far; only the newest tokens of a row are examined.
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        prompt_length: int,
+        max_new_tokens: List[int],
+        eos_token_id: Optional[int] = None,
+        max_bullets: int = 5,
+        ngram_size: int = 8,
+        max_ngram_repeats: int = 3
+    ):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.max_new_tokens = max_new_tokens
+        self.eos_token_id = eos_token_id
+        self.max_bullets = max_bullets
+        self.ngram_size = ngram_size
+        self.max_ngram_repeats = max_ngram_repeats
+
+        rows = len(max_new_tokens)
+        self.tokens: List[List[int]] = [[] for _ in range(rows)]
+        self.reasons: List[Optional[StopReason]] = [None] * rows
+        # Generated tokens to keep per stopped row (repetitions are cut off)
+        self.cuts: List[Optional[int]] = [None] * rows
+        self._ngrams: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(rows)]
+
+    def _stop(self, row: int, reason: StopReason, cut: Optional[int] = None):
+        self.reasons[row] = reason
+        self.cuts[row] = len(self.tokens[row]) if cut is None else cut
+
+    def _check_repetition(self, row: int) -> bool:
+        tokens = self.tokens[row]
+        n = self.ngram_size
+        if not n or len(tokens) < n:
+            return False
+        start = len(tokens) - n
+        positions = self._ngrams[row].setdefault(tuple(tokens[start:]), [])
+        positions.append(start)
+        if len(positions) >= self.max_ngram_repeats:
+            # Keep the text up to the end of the first occurrence
+            self._stop(row, StopReason.REPETITION, positions[0] + n)
+            return True
+        return False
+
+    def _check_bullets(self, row: int, new_tokens: List[int]) -> bool:
+        if not self.max_bullets:
+            return False
+        # Bullets only complete at a line break, skip the full decode otherwise
+        if "\n" not in self.tokenizer.decode(new_tokens, skip_special_tokens=True):
+            return False
+        text = self.tokenizer.decode(self.tokens[row], skip_special_tokens=True)
+        if truncate_after_bullets(text, self.max_bullets) is not None:
+            self._stop(row, StopReason.BULLETS)
+            return True
+        return False
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        done = []
+        for row, limit in enumerate(self.max_new_tokens):
+            if self.reasons[row] is not None:
+                done.append(True)
+                continue
+
+            seen = len(self.tokens[row])
+            new_tokens = input_ids[row, self.prompt_length + seen:].tolist()
+            for token in new_tokens:
+                if token == self.eos_token_id:
+                    # generate() pads the row from here on, ignore the padding
+                    self._stop(row, StopReason.EOS)
+                    break
+                self.tokens[row].append(token)
+                if self._check_repetition(row):
+                    break
+
+            if self.reasons[row] is None and len(self.tokens[row]) >= limit:
+                self._stop(row, StopReason.MAX_TOKENS, limit)
+            elif self.reasons[row] is None:
+                self._check_bullets(row, new_tokens)
+            done.append(self.reasons[row] is not None)
+
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    def finish(self) -> List[Tuple[StopReason, int]]:
+        """Stop reason and generated tokens to keep per row once generate() returned."""
+        results = []
+        for row, limit in enumerate(self.max_new_tokens):
+            if self.reasons[row] is None:
+                # Only a cancelled generate() ends before every row stopped
+                results.append((StopReason.CANCELLED, min(len(self.tokens[row]), limit)))
+            else:
+                results.append((self.reasons[row], self.cuts[row]))
+        return results
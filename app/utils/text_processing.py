@@ -1,34 +1,60 @@
-from typing import List, Dict, Any, Set, Optional
-
-
-def extract_password_context(
-    candidates: List[Dict[str, Any]],
-    password_keywords: Set[str],
-    max_length: int = 500
-) -> str:
-    """Extract relevant context about passwords from search results."""
-    
-    def has_password_keyword(text: str) -> bool:
-        """Check if text contains password-related keywords."""
-        if not text:
-            return False
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in password_keywords)
-    
-    # Look for password-related content
-    for candidate in candidates:
-        subject = str(candidate.get("subject", ""))
-        answer = str(candidate.get("answer", ""))
-        
-        if has_password_keyword(subject) or has_password_keyword(answer):
-            # Combine subject and answer, truncate to max length
-            context = f"{subject} — {answer}"
-            if len(context) > max_length:
-                context = context[:max_length] + "..."
-            return context
+import re
+from typing import List, Optional
+
+# Cleanup applied to LLM output
+_NON_ASCII = re.compile(r"[^\x09\x0A\x0D\x20-\x7E]")
+_TEMPLATE_TOKEN = re.compile(r"<\|.*?\|>")
+_EOS_TOKEN = "</s>"
+
+# Lexical search tokens: words, numbers and codes such as 0x80070005
+_WORD = re.compile(r"\w+")
+
+# A list item with content: "- x", "* x", "• x", "1. x", "2) x"
+_BULLET = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])\s+\S")
+_BULLET_MARKER = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])\s+")
+
+# Whitespace after a sentence end, where a one-paragraph answer is split
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z\u00C0-\u00DE])")
+
+
+def truncate_after_bullets(text: str, max_bullets: int) -> Optional[str]:
+    """Cut text after the line that completes the max_bullets-th bullet.
     
-    # No relevant context found
-    return ""
+    Returns None while fewer bullets are complete; the last line only counts
+    once a newline ends it.
+    """
+    bullets = 0
+    position = 0
+    for line in text.splitlines(keepends=True):
+        if not line.endswith("\n"):
+            break
+        position += len(line)
+        if _BULLET.match(line):
+            bullets += 1
+            if bullets >= max_bullets:
+                return text[:position].rstrip()
+    return None
+
+
+def format_as_bullets(text: str, max_bullets: int) -> str:
+    """Render a stored answer as bullet points, like a generated response.
+    
+    Each line becomes a bullet, a single paragraph is split into sentences.
+    Existing list markers are replaced by "- ". At most max_bullets are kept
+    (0 keeps all).
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(lines) == 1:
+        lines = [sentence for sentence in _SENTENCE_END.split(lines[0]) if sentence]
+    bullets = [f"- {clean_text(_BULLET_MARKER.sub('', line))}" for line in lines]
+    if max_bullets:
+        bullets = bullets[:max_bullets]
+    return "\n".join(bullets)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercased word tokens for lexical search."""
+    return _WORD.findall(text.lower())
 
 
 def clean_text(text: str) -> str:
@@ -42,4 +68,89 @@ def clean_text(text: str) -> str:
     # Trim
     text = text.strip()
     
-    return text
\ No newline at end of file
+    return text
+
+
+def clean_generated_text(text: str) -> str:
+    """Clean LLM output (ASCII only, no template tokens)."""
+    # Clean output (ASCII only to avoid encoding issues)
+    text = _NON_ASCII.sub("", text)
+    
+    # Remove any remaining template tokens
+    text = _TEMPLATE_TOKEN.sub("", text).strip()
+    text = text.replace(_EOS_TOKEN, "").strip()
+    
+    return text
+
+
+class StreamingTextCleaner:
+    """Incremental version of clean_generated_text for streamed chunks.
+    
+    With max_bullets, text after the line that completes that many bullets
+    is dropped, as truncate_after_bullets does for a whole response.
+    """
+    
+    # A "<" with no closing ">" is held back this long at most
+    max_pending: int = 64
+    
+    def __init__(self, max_bullets: int = 0):
+        self.max_bullets = max_bullets
+        self.finished = False
+        self._raw = ""
+        self._buffer = ""
+        self._trailing_whitespace = ""
+        self._started = False
+    
+    def _strip_tokens(self, text: str) -> str:
+        text = _TEMPLATE_TOKEN.sub("", text)
+        return text.replace(_EOS_TOKEN, "")
+    
+    def _emit(self, text: str) -> str:
+        """Drop leading whitespace and hold trailing whitespace back."""
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        
+        text = self._trailing_whitespace + text
+        stripped = text.rstrip()
+        self._trailing_whitespace = text[len(stripped):]
+        return stripped
+    
+    def _limit(self, chunk: str) -> str:
+        """The part of chunk up to the end of the last bullet allowed."""
+        self._raw += chunk
+        cut = truncate_after_bullets(self._raw, self.max_bullets)
+        if cut is None:
+            return chunk
+        self.finished = True
+        return chunk[:max(len(chunk) - (len(self._raw) - len(cut)), 0)]
+    
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return the text that is safe to emit."""
+        if self.finished:
+            return ""
+        if self.max_bullets:
+            chunk = self._limit(chunk)
+        self._buffer = self._strip_tokens(self._buffer + _NON_ASCII.sub("", chunk))
+        
+        # Hold back a possible partial "<|...|>" or "</s>"
+        cut = self._buffer.rfind("<")
+        if (
+            cut != -1
+            and ">" not in self._buffer[cut:]
+            and len(self._buffer) - cut < self.max_pending
+        ):
+            ready, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        else:
+            ready, self._buffer = self._buffer, ""
+        
+        return self._emit(ready)
+    
+    def flush(self) -> str:
+        """Return whatever is left at the end of the stream."""
+        ready, self._buffer = self._buffer, ""
+        text = self._emit(ready)
+        self._trailing_whitespace = ""
+        return text
@@ -0,0 +1,14 @@
+"""Micro-benchmarks and load tests for the chat service.
+
+Run from the repository root:
+    python -m benchmarks.micro faiss --stub
+    python -m benchmarks.micro embeddings --batch-sizes 1 8 32 128
+    python -m benchmarks.micro llm --max-new-tokens 32 128
+    python -m benchmarks.load --stub --rps 5 --duration 30
+    python -m benchmarks.load --url http://localhost:8000 --rps 2 --duration 60
+    python -m benchmarks.compare results.json --baseline benchmarks/baselines/load.json
+
+With --stub no model is downloaded: a hashing embedding model, a simulated
+LLM and a synthetic knowledge base stand in for the real ones (see stubs.py).
+Every run writes JSON that compare.py checks against a stored baseline.
+"""
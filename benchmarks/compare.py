@@ -0,0 +1,30 @@
+"""Compare a benchmark result file with a baseline and flag regressions.
+
+Usage:
+    python -m benchmarks.compare faiss.json --baseline benchmarks/baselines/faiss.json
+    python -m benchmarks.compare load.json --baseline benchmarks/baselines/load.json --tolerance 0.2
+    python -m benchmarks.compare load.json --baseline benchmarks/baselines/load.json --update
+"""
+import argparse
+import sys
+
+from benchmarks.results import check_baseline, load_result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("result", help="Result JSON written by benchmarks.micro or benchmarks.load")
+    parser.add_argument("--baseline", required=True)
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative change accepted before a metric counts as regressed")
+    parser.add_argument("--update", action="store_true",
+                        help="Replace the baseline with this result")
+    args = parser.parse_args()
+
+    sys.exit(check_baseline(
+        load_result(args.result), args.baseline, args.tolerance, args.update
+    ))
+
+
+if __name__ == "__main__":
+    main()
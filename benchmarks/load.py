@@ -0,0 +1,195 @@
+"""Open-loop load generator for POST /api/v1/chat/ at a fixed request rate.
+
+Requests are sent on a fixed schedule whether or not earlier ones have
+finished, so queueing shows up in the latencies instead of lowering the
+offered load.
+
+Usage:
+    python -m benchmarks.load --stub --rps 5 --duration 30
+    python -m benchmarks.load --url http://localhost:8000 --rps 2 --duration 60 --output load.json
+    python -m benchmarks.load --stub --rps 10 --baseline benchmarks/baselines/load-stub.json
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks.queries import sample_queries
+from benchmarks.results import check_baseline, make_result, percentiles, write_result
+
+CHAT_PATH = "/api/v1/chat/"
+
+
+def stub_client(args) -> httpx.AsyncClient:
+    """The real app in-process, with stub models and a synthetic knowledge base."""
+    from main import app
+    from app.api.dependencies import get_chatbot_service
+    from app.services.batching import GenerationBatcher
+    from app.services.chatbot import ChatbotService
+    from benchmarks.stubs import HashingEmbeddingService, StubLLMService, build_synthetic_kb
+
+    chatbot = ChatbotService()
+    chatbot.embeddings = HashingEmbeddingService()
+    chatbot.llm = StubLLMService(
+        prefill_tokens_per_second=args.stub_prefill_tps,
+        decode_tokens_per_second=args.stub_decode_tps
+    )
+    chatbot.batcher = GenerationBatcher(chatbot.llm, chatbot.executor)
+    chatbot.knowledge_base.swap(build_synthetic_kb(
+        args.cache_dir, args.num_docs, embeddings=chatbot.embeddings, seed=args.seed
+    ))
+    chatbot.load_models()
+    app.dependency_overrides[get_chatbot_service] = lambda: chatbot
+
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://benchmark",
+        timeout=args.timeout
+    )
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    category: str,
+    query: str,
+    max_tokens: Optional[int]
+) -> Dict[str, Any]:
+    body = {"query": query, "include_timings": True}
+    if max_tokens:
+        body["max_tokens"] = max_tokens
+
+    start = time.perf_counter()
+    try:
+        response = await client.post(CHAT_PATH, json=body)
+        status = response.status_code
+        timings = response.json().get("timings") if status == 200 else None
+    except httpx.HTTPError as e:
+        status, timings = type(e).__name__, None
+    return {
+        "category": category,
+        "status": status,
+        "latency": time.perf_counter() - start,
+        "timings": timings,
+    }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    rps: float,
+    duration: float,
+    max_tokens: Optional[int],
+    warmup: int,
+    seed: int
+) -> Dict[str, Any]:
+    """Send rps * duration requests on a fixed schedule and collect their outcomes."""
+    for _, query in sample_queries(warmup, seed=seed + 1):
+        await _send(client, "warmup", query, max_tokens)
+
+    queries = sample_queries(max(1, int(rps * duration)), seed=seed)
+    tasks = []
+    start = time.perf_counter()
+    for i, (category, query) in enumerate(queries):
+        delay = start + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_send(client, category, query, max_tokens)))
+
+    outcomes = await asyncio.gather(*tasks)
+    return {"outcomes": outcomes, "elapsed": time.perf_counter() - start}
+
+
+def summarize(outcomes: List[Dict[str, Any]], elapsed: float) -> Dict[str, Dict[str, float]]:
+    """Latency percentiles overall and per query category, plus server-side stage medians."""
+    ok = [outcome for outcome in outcomes if outcome["status"] == 200]
+    metrics = {
+        "overall": {
+            **percentiles([outcome["latency"] for outcome in ok]),
+            "throughput_rps": len(ok) / elapsed,
+            "success_rate": len(ok) / len(outcomes),
+            "requests": float(len(outcomes)),
+        }
+    }
+
+    for category in sorted({outcome["category"] for outcome in ok}):
+        metrics[f"category={category}"] = percentiles([
+            outcome["latency"] for outcome in ok if outcome["category"] == category
+        ])
+
+    stage_times: Dict[str, List[float]] = {}
+    for outcome in ok:
+        for stage, seconds in (outcome["timings"] or {}).items():
+            stage_times.setdefault(stage, []).append(seconds)
+    if stage_times:
+        metrics["stages"] = {
+            f"{stage}_p50_ms": float(np.median(times) * 1000)
+            for stage, times in stage_times.items()
+        }
+    return metrics
+
+
+async def _main(args) -> Dict[str, Any]:
+    if args.stub:
+        client = stub_client(args)
+    else:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+
+    async with client:
+        run = await run_load(
+            client, args.rps, args.duration, args.max_tokens, args.warmup, args.seed
+        )
+
+    result = make_result("load", {
+        "target": "stub" if args.stub else args.url,
+        "rps": args.rps,
+        "duration": args.duration,
+        "max_tokens": args.max_tokens,
+        "seed": args.seed,
+    }, summarize(run["outcomes"], run["elapsed"]))
+    result["status_counts"] = {
+        str(status): count
+        for status, count in Counter(outcome["status"] for outcome in run["outcomes"]).items()
+    }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running server")
+    target.add_argument("--stub", action="store_true",
+                        help="Run the app in-process with stub models, no downloads")
+    parser.add_argument("--rps", type=float, default=2.0, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--max-tokens", type=int, default=None)
+    parser.add_argument("--warmup", type=int, default=3,
+                        help="Sequential requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num-docs", type=int, default=5000,
+                        help="Documents of the synthetic index (--stub)")
+    parser.add_argument("--cache-dir", default="./.cache/benchmarks")
+    parser.add_argument("--stub-prefill-tps", type=float, default=400.0,
+                        help="Simulated prefill tokens per second (--stub)")
+    parser.add_argument("--stub-decode-tps", type=float, default=20.0,
+                        help="Simulated decode tokens per second (--stub)")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    parser.add_argument("--baseline", default=None,
+                        help="Compare with this result file, exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Save this run as the baseline instead of comparing")
+    args = parser.parse_args()
+
+    result = asyncio.run(_main(args))
+    print(f"Status codes: {result['status_counts']}")
+    write_result(result, args.output)
+    sys.exit(check_baseline(result, args.baseline, args.tolerance, args.update_baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Micro-benchmarks of the embedding model, FAISS search and LLM generation.
+
+Usage:
+    python -m benchmarks.micro embeddings --batch-sizes 1 8 32 128
+    python -m benchmarks.micro faiss --k 1 4 10 --nprobe 1 4 16 64
+    python -m benchmarks.micro faiss --stub --num-docs 50000 --output faiss.json
+    python -m benchmarks.micro llm --context-words 0 200 --max-new-tokens 32 128
+"""
+import argparse
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app.services.embeddings import EmbeddingService
+from app.services.faiss_db import FAISSDatabase
+from app.services.ingest import INDEX_TYPES
+from app.services.llm import LLMService, GenerationStats
+from benchmarks.queries import sample_queries
+from benchmarks.results import check_baseline, make_result, percentiles, write_result
+from benchmarks.stubs import (
+    HashingEmbeddingService, StubLLMService, build_synthetic_kb, synthetic_corpus
+)
+
+
+def _time_calls(func: Callable[[], Any], repeats: int) -> List[float]:
+    """Latency of each call, after one untimed call."""
+    func()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_embeddings(args) -> Dict[str, Dict[str, float]]:
+    """Texts per second of EmbeddingService.encode per batch size."""
+    embeddings = HashingEmbeddingService() if args.stub else EmbeddingService()
+    texts = [
+        f"{record['subject']} {record['answer']}"
+        for record in synthetic_corpus(max(args.batch_sizes), args.seed)
+    ]
+
+    metrics = {}
+    for batch_size in args.batch_sizes:
+        batch = texts[:batch_size]
+        latencies = _time_calls(
+            lambda: embeddings.encode(batch, batch_size=batch_size, use_cache=False),
+            args.repeats
+        )
+        metrics[f"batch_size={batch_size}"] = {
+            **percentiles(latencies),
+            "texts_per_second": batch_size / float(np.median(latencies)),
+        }
+    return metrics
+
+
+def bench_faiss(args) -> Dict[str, Dict[str, float]]:
+    """Single-query latency and batched queries per second per k and nprobe."""
+    if args.stub:
+        embeddings = HashingEmbeddingService()
+        database = build_synthetic_kb(
+            args.cache_dir, args.num_docs, args.index_type, embeddings=embeddings, seed=args.seed
+        )
+    else:
+        embeddings = EmbeddingService()
+        database = FAISSDatabase()
+    database.load()
+
+    queries = embeddings.encode(
+        [query for _, query in sample_queries(args.num_queries, seed=args.seed)]
+    )
+    nprobes = args.nprobe if database.is_ivf else [None]
+
+    metrics = {}
+    for k in args.k:
+        for nprobe in nprobes:
+            latencies = []
+            for query in queries[:args.repeats]:
+                start = time.perf_counter()
+                database.search(query, k=k, nprobe=nprobe)
+                latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            database.search_batch(queries, k=k, nprobe=nprobe)
+            batch_time = time.perf_counter() - start
+
+            metrics[f"k={k},nprobe={nprobe}"] = {
+                **percentiles(latencies),
+                "batch_qps": len(queries) / batch_time,
+            }
+    return metrics
+
+
+def bench_llm(args) -> Dict[str, Dict[str, float]]:
+    """Prefill and decode tokens per second per context size and output length.
+
+    Set LLM_SPECULATIVE_MODE to measure speculative decoding and its acceptance rate.
+    """
+    llm = StubLLMService() if args.stub else LLMService()
+    llm.warmup_prefix_cache()
+    context_source = " ".join(
+        record["answer"] for record in synthetic_corpus(200, args.seed)
+    ).split()
+
+    metrics = {}
+    for context_words in args.context_words:
+        context = " ".join(context_source[:context_words])
+        messages = llm.build_messages("How do I reset my password?", context)
+        for max_new_tokens in args.max_new_tokens:
+            # Untimed call for lazy initialization
+            llm.generate(messages, max_new_tokens)
+            runs = []
+            for _ in range(args.repeats):
+                stats = GenerationStats()
+                llm.generate(messages, max_new_tokens, stats)
+                runs.append(stats)
+
+            prefill = [stats.prefill_time for stats in runs]
+            decode = [stats.decode_time for stats in runs]
+            case = {
+                "prompt_tokens": float(np.mean([stats.prompt_tokens for stats in runs])),
+                "generated_tokens": float(np.mean([stats.generated_tokens for stats in runs])),
+                "prefill_p50_ms": float(np.median(prefill) * 1000),
+                "decode_p50_ms": float(np.median(decode) * 1000),
+                "prefill_tokens_per_second": float(np.median([
+                    stats.prompt_tokens / stats.prefill_time
+                    for stats in runs if stats.prefill_time > 0
+                ] or [0.0])),
+                "decode_tokens_per_second": float(np.median([
+                    stats.tokens_per_second for stats in runs
+                ])),
+                "tokens_per_step": float(np.mean([
+                    stats.generated_tokens / stats.decode_steps
+                    for stats in runs if stats.decode_steps
+                ] or [0.0])),
+            }
+            if any(stats.speculative for stats in runs):
+                case["draft_acceptance_rate"] = float(np.mean([
+                    stats.draft_acceptance_rate for stats in runs
+                ]))
+            metrics[f"context_words={context_words},max_new_tokens={max_new_tokens}"] = case
+    return metrics
+
+
+BENCHMARKS = {
+    "embeddings": bench_embeddings,
+    "faiss": bench_faiss,
+    "llm": bench_llm,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmark", choices=list(BENCHMARKS))
+    parser.add_argument("--stub", action="store_true",
+                        help="Use stub models and a synthetic index, no downloads")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 4, 10, 50])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--num-queries", type=int, default=1000,
+                        help="Queries of the batched FAISS search")
+    parser.add_argument("--num-docs", type=int, default=20000,
+                        help="Documents of the synthetic index")
+    parser.add_argument("--index-type", default="IVF", choices=list(INDEX_TYPES))
+    parser.add_argument("--cache-dir", default="./.cache/benchmarks",
+                        help="Where synthetic indexes are kept between runs")
+    parser.add_argument("--context-words", type=int, nargs="+", default=[0, 100, 300])
+    parser.add_argument("--max-new-tokens", type=int, nargs="+", default=[32, 128])
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    parser.add_argument("--baseline", default=None,
+                        help="Compare with this result file, exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative change accepted before a metric counts as regressed")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Save this run as the baseline instead of comparing")
+    args = parser.parse_args()
+
+    metrics = BENCHMARKS[args.benchmark](args)
+    result = make_result(args.benchmark, {
+        key: value for key, value in vars(args).items()
+        if key not in ("output", "baseline", "update_baseline")
+    }, metrics)
+    write_result(result, args.output)
+    sys.exit(check_baseline(result, args.baseline, args.tolerance, args.update_baseline))
+
+
+if __name__ == "__main__":
+    main()
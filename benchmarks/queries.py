@@ -0,0 +1,82 @@
+"""Query mix for load tests, shaped like helpdesk traffic."""
+import random
+from typing import Dict, List, Tuple
+
+# Frequently asked, word for word repeats hit the response cache
+FAQ_EN = [
+    "How do I reset my password?",
+    "VPN is not connecting",
+    "Outlook keeps asking for my password",
+    "MFA is not working on my new phone",
+    "The printer shows offline",
+    "How do I share a folder in OneDrive?",
+    "Teams says my account is locked",
+    "Wi-Fi keeps disconnecting",
+]
+
+FAQ_DE = [
+    "Wie setze ich mein Passwort zurück?",
+    "VPN verbindet nicht",
+    "Outlook fragt ständig nach meinem Passwort",
+    "Drucker ist offline",
+    "Mein Laptop ist nach dem Update sehr langsam",
+    "Zugriff auf ein freigegebenes Postfach beantragen",
+]
+
+# Long descriptions, more prompt tokens and a longer embedding pass
+LONG = [
+    "Since this morning my laptop cannot connect to the VPN. I already restarted it "
+    "twice and reinstalled the client, but it still fails with error 809 after the "
+    "login window. Colleagues in the same office have no problem. What can I do?",
+    "Nach dem letzten Windows Update startet mein Rechner nur noch mit schwarzem "
+    "Bildschirm, wenn er an der Dockingstation hängt. Ohne Dock funktioniert alles. "
+    "Ich habe die Treiber schon neu installiert. Wie kann ich das beheben?",
+    "I changed my password yesterday and now Outlook on my phone, Teams on the laptop "
+    "and the file share all keep asking for credentials. Do I have to update it "
+    "everywhere by hand, and in which order?",
+]
+
+DEVICES = ["laptop", "printer", "monitor", "phone", "docking station", "headset"]
+PROBLEMS = ["does not turn on", "is very slow", "shows error", "keeps freezing", "is not detected"]
+
+# Share of the traffic per category
+DEFAULT_MIX: Dict[str, float] = {
+    "faq_en": 0.45,
+    "faq_de": 0.25,
+    "long": 0.15,
+    "unique": 0.15,
+}
+
+
+def _unique_query(rng: random.Random) -> str:
+    """A query that never repeats, so it always misses the caches."""
+    return (
+        f"My {rng.choice(DEVICES)} {rng.choice(PROBLEMS)} "
+        f"{rng.randint(1000, 9999)} since ticket INC{rng.randint(100000, 999999)}"
+    )
+
+
+def sample_queries(
+    count: int,
+    mix: Dict[str, float] = DEFAULT_MIX,
+    seed: int = 0
+) -> List[Tuple[str, str]]:
+    """Draw (category, query) pairs, reproducible for a given seed."""
+    rng = random.Random(seed)
+    categories = list(mix)
+    weights = [mix[category] for category in categories]
+
+    queries = []
+    for category in rng.choices(categories, weights=weights, k=count):
+        if category == "faq_en":
+            query = rng.choice(FAQ_EN)
+        elif category == "faq_de":
+            query = rng.choice(FAQ_DE)
+        elif category == "long":
+            query = rng.choice(LONG)
+        elif category == "unique":
+            query = _unique_query(rng)
+        else:
+            raise ValueError(f"Unknown query category: {category}")
+        queries.append((category, query))
+    return queries
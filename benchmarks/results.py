@@ -0,0 +1,160 @@
+"""Result files and baseline comparison."""
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Metric name fragments where a bigger number is better; everything else
+# (latencies, times) is better when smaller
+HIGHER_IS_BETTER = (
+    "per_second", "per_step", "throughput", "qps", "rps", "recall", "success_rate", "acceptance"
+)
+# Informational or too noisy to compare
+IGNORED = ("requests", "prompt_tokens", "generated_tokens", "max_ms")
+
+
+def percentiles(values: Sequence[float], scale: float = 1000.0) -> Dict[str, float]:
+    """p50/p95/p99, mean and max of seconds, in milliseconds by default."""
+    if not len(values):
+        return {}
+    array = np.asarray(values, dtype=np.float64) * scale
+    p50, p95, p99 = np.percentile(array, [50, 95, 99])
+    return {
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "mean_ms": float(array.mean()),
+        "max_ms": float(array.max()),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """Where the numbers were measured, results only compare on similar machines."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def make_result(
+    benchmark: str,
+    params: Dict[str, Any],
+    metrics: Dict[str, Dict[str, float]]
+) -> Dict[str, Any]:
+    """Result document: metrics are grouped by case, e.g. {"k=4": {"p50_ms": ...}}."""
+    return {
+        "benchmark": benchmark,
+        "created_at": datetime.now().isoformat(),
+        "environment": environment(),
+        "params": params,
+        "metrics": metrics,
+    }
+
+
+def write_result(result: Dict[str, Any], path: Optional[str]):
+    """Print the result and write it as JSON if a path is given."""
+    print(json.dumps(result["metrics"], indent=2))
+    if path:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Wrote {path}")
+
+
+def load_result(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _higher_is_better(metric: str) -> bool:
+    return any(fragment in metric for fragment in HIGHER_IS_BETTER)
+
+
+def compare(
+    result: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = 0.2
+) -> List[Dict[str, Any]]:
+    """Metrics that got worse than the baseline by more than tolerance (relative)."""
+    if result.get("benchmark") != baseline.get("benchmark"):
+        raise ValueError(
+            f"Cannot compare {result.get('benchmark')} results with a "
+            f"{baseline.get('benchmark')} baseline"
+        )
+
+    regressions = []
+    for case, baseline_metrics in baseline["metrics"].items():
+        metrics = result["metrics"].get(case)
+        if metrics is None:
+            continue
+        for metric, expected in baseline_metrics.items():
+            actual = metrics.get(metric)
+            if actual is None or metric in IGNORED or not expected:
+                continue
+            change = (actual - expected) / abs(expected)
+            worse = -change if _higher_is_better(metric) else change
+            if worse > tolerance:
+                regressions.append({
+                    "case": case,
+                    "metric": metric,
+                    "baseline": expected,
+                    "actual": actual,
+                    "change": change,
+                })
+    return regressions
+
+
+def check_baseline(
+    result: Dict[str, Any],
+    baseline_path: Optional[str],
+    tolerance: float = 0.2,
+    update: bool = False
+) -> int:
+    """Compare against the baseline file, or replace it with update; returns an exit code.
+
+    A missing baseline is an error (exit code 2): saving the run in its place
+    would let a regressed first run become the reference.
+    """
+    if not baseline_path:
+        return 0
+
+    path = Path(baseline_path)
+    if update:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved this run as the baseline {path}")
+        return 0
+
+    if not path.exists():
+        print(
+            f"Error: no baseline at {path}. Record one from a known-good build with "
+            f"--update-baseline (benchmarks.compare: --update)",
+            file=sys.stderr
+        )
+        return 2
+
+    baseline = load_result(str(path))
+    if baseline.get("environment", {}).get("cpu_count") != os.cpu_count():
+        print("Warning: baseline was measured on a machine with a different CPU count", file=sys.stderr)
+
+    regressions = compare(result, baseline, tolerance)
+    if not regressions:
+        print(f"No regressions against {path} (tolerance {tolerance:.0%})")
+        return 0
+
+    print(f"{len(regressions)} regression(s) against {path} (tolerance {tolerance:.0%}):")
+    for regression in regressions:
+        print(
+            f"  {regression['case']} {regression['metric']}: "
+            f"{regression['baseline']:.4g} -> {regression['actual']:.4g} "
+            f"({regression['change']:+.1%})"
+        )
+    return 1
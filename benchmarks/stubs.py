@@ -0,0 +1,255 @@
+"""Stand-ins for the models so benchmarks run without downloads.
+
+HashingEmbeddingService embeds a text as the normalized sum of per-token
+random vectors, so texts sharing words are similar and retrieval behaves
+plausibly. StubLLMService sleeps for a prefill and decode time derived from
+the prompt length. build_synthetic_kb writes a helpdesk corpus through the
+regular IndexBuilder, so the artifacts have the production format.
+"""
+import json
+import random
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.services.embeddings import EmbeddingService
+from app.services.faiss_db import FAISSDatabase
+from app.services.ingest import IndexBuilder
+from app.services.llm import LLMService, GenerationStats, StopReason
+from app.services.loader import LazyResource
+from app.utils.text_processing import tokenize
+
+
+class HashingEmbeddingService(EmbeddingService):
+    """Deterministic bag-of-words embeddings, no model download."""
+
+    def __init__(self, dimension: int = 384, latency_ms: float = 0.0):
+        super().__init__(model_name="stub-hashing")
+        self.dimension = dimension
+        self.latency = latency_ms / 1000.0
+        self._token_vectors: Dict[str, np.ndarray] = {}
+        self._model = LazyResource("embeddings", lambda: self)
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(token.encode("utf-8")))
+            vector = rng.standard_normal(self.dimension).astype("float32")
+            self._token_vectors[token] = vector
+        return vector
+
+    def _encode(
+        self,
+        texts: List[str],
+        normalize: bool,
+        batch_size: int
+    ) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimension), dtype="float32")
+        for row, text in enumerate(texts):
+            for token in tokenize(text) or [""]:
+                embeddings[row] += self._token_vector(token)
+        if normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        if self.latency:
+            time.sleep(self.latency * len(texts))
+        return embeddings
+
+
+class WordTokenizer:
+    """Word-level stand-in for the LLM tokenizer, enough for token budgets."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._words: List[str] = []
+
+    def __call__(self, text: str, add_special_tokens: bool = True) -> Dict[str, List[int]]:
+        ids = []
+        for word in text.split():
+            if word not in self._ids:
+                self._ids[word] = len(self._words)
+                self._words.append(word)
+            ids.append(self._ids[word])
+        return {"input_ids": ids}
+
+    def decode(self, token_ids: List[int], skip_special_tokens: bool = False) -> str:
+        return " ".join(self._words[token_id] for token_id in token_ids)
+
+
+class StubLLMService(LLMService):
+    """Simulates generation time; prefill scales with prompt tokens, decode with new tokens."""
+
+    def __init__(
+        self,
+        prefill_tokens_per_second: float = 400.0,
+        decode_tokens_per_second: float = 20.0
+    ):
+        super().__init__()
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.decode_tokens_per_second = decode_tokens_per_second
+        self._pipeline = LazyResource("llm", lambda: self)
+        self._word_tokenizer = WordTokenizer()
+
+    @property
+    def model(self) -> "StubLLMService":
+        return self._pipeline.get()
+
+    @property
+    def tokenizer(self) -> WordTokenizer:
+        return self._word_tokenizer
+
+    @property
+    def text_tokenizer(self) -> WordTokenizer:
+        return self._word_tokenizer
+
+    def warmup_prefix_cache(self):
+        return None
+
+    def render_prompt(self, messages: List[Dict[str, str]]) -> str:
+        return "\n".join(f"<|{message['role']}|>\n{message['content']}" for message in messages)
+
+    @staticmethod
+    def _count_tokens(text: str) -> int:
+        # Roughly what a BPE tokenizer makes of English text
+        return int(len(text.split()) * 1.3) + 1
+
+    def generate_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        max_new_tokens: List[int],
+        stats: Optional[GenerationStats] = None
+    ) -> List[str]:
+        stats = stats if stats is not None else GenerationStats()
+        start_time = time.perf_counter()
+        prompts = [self.render_prompt(messages) for messages in batch_messages]
+        stats.template_time = time.perf_counter() - start_time
+        stats.batch_size = len(prompts)
+        stats.prompt_tokens = sum(self._count_tokens(prompt) for prompt in prompts)
+
+        stats.prefill_time = stats.prompt_tokens / self.prefill_tokens_per_second
+        time.sleep(stats.prefill_time)
+        # A decode step produces one token for every row of the batch
+        steps = max(max_new_tokens)
+        stats.decode_time = steps / self.decode_tokens_per_second
+        time.sleep(stats.decode_time)
+        stats.generated_tokens = sum(max_new_tokens)
+        stats.decode_steps = steps
+        stats.stop_reasons = [StopReason.MAX_TOKENS.value] * len(prompts)
+        if self.record_metrics:
+            stats.record()
+
+        return [
+            "- Stub answer\n" + " ".join(["step"] * max(limit - 3, 0))
+            for limit in max_new_tokens
+        ]
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_new_tokens: int = 130,
+        stats: Optional[GenerationStats] = None
+    ) -> Iterator[str]:
+        stats = stats if stats is not None else GenerationStats()
+        stats.batch_size = 1
+        stats.prompt_tokens = self._count_tokens(self.render_prompt(messages))
+        stats.prefill_time = stats.prompt_tokens / self.prefill_tokens_per_second
+        time.sleep(stats.prefill_time)
+
+        start_time = time.perf_counter()
+        try:
+            for _ in range(max_new_tokens):
+                time.sleep(1.0 / self.decode_tokens_per_second)
+                stats.generated_tokens += 1
+                yield "step "
+        finally:
+            stats.decode_time = time.perf_counter() - start_time
+            stats.decode_steps = stats.generated_tokens
+            stats.stop_reasons = [
+                StopReason.MAX_TOKENS.value if stats.generated_tokens == max_new_tokens
+                else StopReason.CANCELLED.value
+            ]
+            if self.record_metrics:
+                stats.record()
+
+
+TOPICS = [
+    ("password", "Passwort"),
+    ("VPN", "VPN"),
+    ("printer", "Drucker"),
+    ("Outlook", "Outlook"),
+    ("Teams", "Teams"),
+    ("laptop", "Laptop"),
+    ("MFA", "MFA"),
+    ("OneDrive", "OneDrive"),
+    ("Wi-Fi", "WLAN"),
+    ("monitor", "Bildschirm"),
+]
+ISSUES = [
+    ("cannot connect", "verbindet nicht"),
+    ("is very slow", "ist sehr langsam"),
+    ("keeps asking for credentials", "fragt ständig nach Anmeldedaten"),
+    ("shows an error after the update", "zeigt einen Fehler nach dem Update"),
+    ("is not working", "funktioniert nicht"),
+    ("was locked", "wurde gesperrt"),
+]
+STEPS = [
+    "Restart the device and try again.",
+    "Check that you are connected to the company network.",
+    "Sign out and sign in again with your company account.",
+    "Install the latest updates from the Software Center.",
+    "Clear the cached credentials in the Credential Manager.",
+    "Open a ticket with the service desk if the problem persists.",
+    "Reset the password in the self-service portal.",
+    "Remove the device from the list and pair it again.",
+]
+
+
+def synthetic_corpus(num_docs: int, seed: int = 0) -> Iterator[Dict[str, str]]:
+    """Helpdesk-like tickets in English and German."""
+    rng = random.Random(seed)
+    for i in range(num_docs):
+        (topic_en, topic_de), (issue_en, issue_de) = rng.choice(TOPICS), rng.choice(ISSUES)
+        if rng.random() < 0.3:
+            subject = f"{topic_de} {issue_de}"
+        else:
+            subject = f"{topic_en} {issue_en}"
+        yield {
+            "id": f"SYN-{i:07d}",
+            "subject": f"{subject} ({rng.randint(1, 500)})",
+            "answer": " ".join(rng.sample(STEPS, rng.randint(2, 4))),
+        }
+
+
+def build_synthetic_kb(
+    directory: Path,
+    num_docs: int = 5000,
+    index_type: str = "IVF",
+    nlist: Optional[int] = None,
+    embeddings: Optional[EmbeddingService] = None,
+    seed: int = 0
+) -> FAISSDatabase:
+    """Build (or reuse) a synthetic knowledge base and return a database over it."""
+    directory = Path(directory) / f"kb-{index_type.lower()}-{num_docs}-{seed}"
+    paths = {
+        "index_path": str(directory / "index.faiss"),
+        "metadata_path": str(directory / "metadata.pkl"),
+        "config_path": str(directory / "config.json"),
+        "metadata_store_path": str(directory / "metadata.store"),
+    }
+
+    if not Path(paths["config_path"]).exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        corpus_path = directory / "corpus.jsonl"
+        with open(corpus_path, "w", encoding="utf-8") as f:
+            for record in synthetic_corpus(num_docs, seed):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        builder = IndexBuilder(
+            embeddings=embeddings or HashingEmbeddingService(),
+            **paths
+        )
+        builder.build(str(corpus_path), index_type=index_type, nlist=nlist)
+
+    return FAISSDatabase(**paths)
@@ -0,0 +1,227 @@
+"""Sweep CPU thread plans: worker counts and LLM core shares, measured end to end.
+
+Every candidate starts WORKERS processes that plan their threads for their
+slot like gunicorn workers do (app/core/resources.py), load the models and
+answer chat queries for --duration seconds with --concurrency requests in
+flight each. All processes start measuring together; the candidate with the
+most queries per second in total wins. The response cache is disabled so every
+query goes through embedding, search and generation.
+
+Usage:
+    python -m benchmarks.threads --workers 1 2 4 --llm-share 0.5 0.75 0.9 --duration 60
+    python -m benchmarks.threads --workers 2 4 --affinity --output threads.json
+    python -m benchmarks.threads --stub --workers 1 2 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.queries import sample_queries
+from benchmarks.results import check_baseline, make_result, percentiles, write_result
+
+
+def _build_chatbot(args):
+    """Chatbot of one worker process, with stub models if requested."""
+    from app.services.chatbot import ChatbotService
+
+    chatbot = ChatbotService()
+    if args.stub:
+        from app.services.batching import GenerationBatcher
+        from benchmarks.stubs import HashingEmbeddingService, StubLLMService, build_synthetic_kb
+
+        chatbot.embeddings = HashingEmbeddingService()
+        chatbot.llm = StubLLMService()
+        chatbot.batcher = GenerationBatcher(chatbot.llm, chatbot.executor)
+        chatbot.knowledge_base.swap(build_synthetic_kb(
+            args.cache_dir, args.num_docs, embeddings=chatbot.embeddings, seed=args.seed
+        ))
+    chatbot.load_models()
+    chatbot.warmup()
+    return chatbot
+
+
+async def _drive(chatbot, args) -> Dict[str, Any]:
+    """Answer queries with a fixed number in flight until the duration is over."""
+    from app.services.executor import QueueFullError
+
+    queries = [query for _, query in sample_queries(1000, seed=args.seed + args.child_slot)]
+    latencies: List[float] = []
+    rejected = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def client(offset: int):
+        nonlocal rejected
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await chatbot.process_query(queries[i % len(queries)], max_tokens=args.max_tokens)
+                latencies.append(time.perf_counter() - start)
+            except QueueFullError:
+                rejected += 1
+                await asyncio.sleep(0.01)
+            i += args.concurrency
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(offset) for offset in range(args.concurrency)))
+    return {
+        "completed": len(latencies),
+        "rejected": rejected,
+        "elapsed": time.perf_counter() - start,
+        "latencies": latencies,
+    }
+
+
+def run_child(args):
+    """One worker: plan threads, load, report ready, wait for the start signal, measure."""
+    from app.core.resources import configure_threads
+
+    plan = configure_threads(slot=args.child_slot)
+    chatbot = _build_chatbot(args)
+    print(json.dumps({"ready": True}), flush=True)
+    sys.stdin.readline()
+
+    result = asyncio.run(_drive(chatbot, args))
+    result["plan"] = plan.to_dict() if plan is not None else None
+    print(json.dumps(result), flush=True)
+    chatbot.shutdown()
+
+
+def _child_command(args, slot: int) -> List[str]:
+    command = [
+        sys.executable, "-m", "benchmarks.threads", "--child-slot", str(slot),
+        "--duration", str(args.duration), "--concurrency", str(args.concurrency),
+        "--seed", str(args.seed), "--cache-dir", args.cache_dir, "--num-docs", str(args.num_docs),
+    ]
+    if args.max_tokens:
+        command += ["--max-tokens", str(args.max_tokens)]
+    if args.stub:
+        command.append("--stub")
+    return command
+
+
+def _read_json(process: subprocess.Popen) -> Dict[str, Any]:
+    """Next JSON line of a child, skipping its log output."""
+    for line in process.stdout:
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"Worker exited with code {process.wait()} before reporting")
+
+
+def run_candidate(args, workers: int, llm_share: float) -> Dict[str, float]:
+    """Start the workers of one plan together and add up their throughput."""
+    env = {
+        **os.environ,
+        "WORKERS": str(workers),
+        "CPU_LLM_SHARE": str(llm_share),
+        "CPU_AFFINITY": str(args.affinity).lower(),
+        "CPU_THREAD_PLANNING": "true",
+        "RESPONSE_CACHE_ENABLED": "false",
+        # Workers report on stdout, keep request logs from filling the pipe
+        "LOG_LEVEL": "WARNING",
+    }
+    # Thread counts are per plan, explicit ones would make all candidates equal
+    for name in ("EMBEDDING_THREADS", "SEARCH_THREADS", "LLM_THREADS",
+                 "OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        env.pop(name, None)
+
+    processes = [
+        subprocess.Popen(
+            _child_command(args, slot), env=env, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+        for slot in range(workers)
+    ]
+    try:
+        for process in processes:
+            _read_json(process)
+        for process in processes:
+            process.stdin.write("go\n")
+            process.stdin.flush()
+        reports = [_read_json(process) for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+
+    latencies = [latency for report in reports for latency in report["latencies"]]
+    elapsed = max(report["elapsed"] for report in reports)
+    plan = reports[0]["plan"] or {}
+    return {
+        **percentiles(latencies),
+        "throughput_qps": len(latencies) / elapsed,
+        "requests": float(len(latencies)),
+        "rejected": float(sum(report["rejected"] for report in reports)),
+        "cores_per_worker": float(len(plan.get("cores", []))),
+        "embedding_threads": float(plan.get("embedding_threads", 0)),
+        "search_threads": float(plan.get("search_threads", 0)),
+        "llm_threads": float(plan.get("llm_threads", 0)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--llm-share", type=float, nargs="+", default=[0.5, 0.75, 0.9])
+    parser.add_argument("--affinity", action="store_true", help="Pin every worker to its cores")
+    parser.add_argument("--duration", type=float, default=30.0,
+                        help="Seconds every candidate is measured")
+    parser.add_argument("--concurrency", type=int, default=2,
+                        help="Requests in flight per worker")
+    parser.add_argument("--max-tokens", type=int, default=None)
+    parser.add_argument("--stub", action="store_true",
+                        help="Use stub models and a synthetic index, no downloads")
+    parser.add_argument("--num-docs", type=int, default=20000,
+                        help="Documents of the synthetic index")
+    parser.add_argument("--cache-dir", default="./.cache/benchmarks",
+                        help="Where synthetic indexes are kept between runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child-slot", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    parser.add_argument("--baseline", default=None,
+                        help="Compare with this result file, exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative change accepted before a metric counts as regressed")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Save this run as the baseline instead of comparing")
+    args = parser.parse_args()
+
+    if args.child_slot is not None:
+        run_child(args)
+        return
+
+    if args.stub:
+        # Build the synthetic index once, not in every worker at the same time
+        from benchmarks.stubs import HashingEmbeddingService, build_synthetic_kb
+        build_synthetic_kb(
+            args.cache_dir, args.num_docs, embeddings=HashingEmbeddingService(), seed=args.seed
+        )
+
+    metrics = {}
+    for workers in args.workers:
+        for llm_share in args.llm_share:
+            case = f"workers={workers},llm_share={llm_share}"
+            print(f"Measuring {case}...", file=sys.stderr)
+            metrics[case] = run_candidate(args, workers, llm_share)
+
+    result = make_result("threads", {
+        key: value for key, value in vars(args).items()
+        if key not in ("output", "baseline", "update_baseline", "child_slot")
+    }, metrics)
+    write_result(result, args.output)
+
+    best = max(metrics, key=lambda case: metrics[case]["throughput_qps"])
+    workers, llm_share = (part.split("=")[1] for part in best.split(","))
+    print(f"\nHighest throughput ({metrics[best]['throughput_qps']:.2f} queries/s): "
+          f"WORKERS={workers} CPU_LLM_SHARE={llm_share}"
+          + (" CPU_AFFINITY=true" if args.affinity else ""))
+    sys.exit(check_baseline(result, args.baseline, args.tolerance, args.update_baseline))
+
+
+if __name__ == "__main__":
+    main()
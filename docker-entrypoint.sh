@@ -50,31 +50,13 @@ else
     echo "✅ Config file found: $CONFIG_FILE"
 fi
 
-# Pre-download models if in production mode
+# Pre-download and convert models if in production mode. A separate process
+# cannot hand its loaded models to the server, so it saves them to MODEL_CACHE_DIR
+# (a volume) and the server loads them from local disk.
 if [ "${DEBUG:-true}" = "false" ]; then
     echo "🤖 Pre-warming models in production mode..."
-    python -c "
-import os
-os.environ['PYTHONPATH'] = '/app'
-try:
-    from app.services.embeddings import EmbeddingService
-    print('📥 Loading embedding model...')
-    emb = EmbeddingService()
-    print('✅ Embedding model loaded successfully')
-except Exception as e:
-    print(f'⚠️  Warning: Could not pre-load embedding model: {e}')
-
-try:
-    from app.services.chatbot import ChatbotService
-    print('🧠 Initializing chatbot service...')
-    chatbot = ChatbotService()
-    if chatbot.is_ready():
-        print('✅ Chatbot service ready')
-    else:
-        print('⚠️  Warning: Chatbot service not fully ready')
-except Exception as e:
-    print(f'⚠️  Warning: Could not initialize chatbot service: {e}')
-"
+    python scripts/prewarm_models.py \
+        || echo "⚠️  Warning: Could not pre-warm models, they are loaded on startup"
 else
     echo "🔧 Running in debug mode - skipping model pre-warming"
 fi
@@ -10,12 +10,15 @@ interface ChatMessage {
   contextUsed?: string;
 }
 
-interface ApiResponse {
+interface StreamToken {
+  text: string;
+}
+
+interface StreamDone {
   response: string;
-  context_used: string;
+  context_used: string | null;
+  time_to_first_token: number | null;
   processing_time: number;
-  query: string;
-  timestamp: string;
 }
 
 interface ApiError {
@@ -79,8 +82,10 @@ function App() {
     setLoading(true);
     setError(null);
 
+    const aiMessageId = (Date.now() + 1).toString();
+
     try {
-      const response = await fetch('/api/v1/chat/', {
+      const response = await fetch('/api/v1/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -92,23 +97,71 @@ function App() {
         }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         const errorData: ApiError = await response.json();
         throw new Error(errorData.detail || errorData.error || 'Failed to get response');
       }
 
-      const data: ApiResponse = await response.json();
-      
-      const aiMessage: ChatMessage = {
-        id: (Date.now() + 1).toString(),
-        type: 'ai',
-        content: data.response,
-        timestamp: new Date(),
-        processingTime: data.processing_time,
-        contextUsed: data.context_used,
+      const upsertAiMessage = (update: (content: string) => Partial<ChatMessage>) => {
+        setMessages(prev => {
+          if (!prev.some(message => message.id === aiMessageId)) {
+            const aiMessage: ChatMessage = {
+              id: aiMessageId,
+              type: 'ai',
+              content: '',
+              timestamp: new Date(),
+            };
+            return [...prev, { ...aiMessage, ...update('') }];
+          }
+          return prev.map(message =>
+            message.id === aiMessageId ? { ...message, ...update(message.content) } : message
+          );
+        });
+      };
+
+      const handleEvent = (event: string, data: unknown) => {
+        if (event === 'token') {
+          // First token replaces the "Thinking..." indicator
+          const { text } = data as StreamToken;
+          setLoading(false);
+          upsertAiMessage(content => ({ content: content + text }));
+        } else if (event === 'done') {
+          const done = data as StreamDone;
+          upsertAiMessage(() => ({
+            content: done.response,
+            processingTime: done.processing_time,
+            contextUsed: done.context_used ?? undefined,
+          }));
+        } else if (event === 'error') {
+          throw new Error((data as ApiError).detail || 'Failed to get response');
+        }
       };
 
-      setMessages(prev => [...prev, aiMessage]);
+      // Parse the Server-Sent Events stream
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary = buffer.indexOf('\n\n');
+        while (boundary !== -1) {
+          const rawEvent = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          boundary = buffer.indexOf('\n\n');
+
+          let event = 'message';
+          let data = '';
+          for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          }
+          if (data) handleEvent(event, JSON.parse(data));
+        }
+      }
     } catch (error) {
       const errorMessage = error instanceof Error ? error.message : 'Something went wrong';
       setError(errorMessage);
@@ -0,0 +1,52 @@
+"""Gunicorn configuration.
+
+Usage:
+    PRELOAD_MODELS=true gunicorn main:app -c gunicorn.conf.py
+
+With PRELOAD_MODELS enabled the app (and all models) are loaded once in the
+master process; workers are forked afterwards and share the read-only model
+weights, FAISS index and metadata pages copy-on-write.
+
+Every worker gets its own slot of the CPU cores (see app/core/resources.py):
+torch, FAISS and BLAS thread counts are sized to the slot, and with
+CPU_AFFINITY=true the worker is pinned to it.
+
+With more than one worker, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+so /metrics reports the sum over all workers instead of whichever one
+answered the scrape.
+"""
+import os
+from prometheus_client import multiprocess
+from app.core.config import get_settings
+from app.core.memory import memory_report
+from app.core.resources import configure_threads
+
+settings = get_settings()
+
+bind = f"{settings.host}:{settings.port}"
+workers = settings.workers
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = settings.preload_models
+
+# Model loading in the master can take a while
+timeout = 300
+
+
+def pre_fork(server, worker):
+    # Runs in the master: a replacement worker takes over the slot of the dead one
+    used = {getattr(other, "cpu_slot", None) for other in server.WORKERS.values()}
+    worker.cpu_slot = next(slot for slot in range(len(used) + 1) if slot not in used)
+
+
+def post_fork(server, worker):
+    configure_threads(slot=worker.cpu_slot, workers=server.num_workers)
+    report = memory_report()
+    server.log.info(
+        f"Worker {worker.pid} forked: rss={report['rss_mb']}MiB, uss={report['uss_mb']}MiB"
+    )
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of the dead worker from the aggregated metrics
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,16 +1,32 @@
+import os
+from app.core.resources import configure_threads
+
+# Before torch, FAISS and tokenizers are imported, their pools size themselves on first use
+configure_threads()
+
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
 from contextlib import asynccontextmanager
 from app.core.config import get_settings
 from app.core.logging import logger
-from app.api.routes import chat
-from app.api.dependencies import get_chatbot_service
+from app.api.routes import admin, chat, search
+from app.api.dependencies import get_chatbot_service, preload_chatbot_service
+from app.core.memory import memory_report
+from app.core.startup import startup_timeline
 from app.models.requests import HealthCheckResponse
 from app import __version__
 
 settings = get_settings()
 
+# torch and transformers are not imported yet, the models load them on first use
+startup_timeline.mark("import")
+
+# With gunicorn --preload this runs once in the master, before workers fork
+if settings.preload_models:
+    preload_chatbot_service()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -26,10 +42,15 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Failed to warmup models: {str(e)}")
     
+    # Per worker: threads started before a gunicorn fork do not survive it
+    get_chatbot_service().knowledge_base.start_watcher()
+    startup_timeline.mark_ready()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down application")
+    get_chatbot_service().shutdown()
 
 
 # Create FastAPI app
@@ -51,6 +72,8 @@ app.add_middleware(
 
 # Include routers
 app.include_router(chat.router, prefix=settings.api_v1_prefix)
+app.include_router(search.router, prefix=settings.api_v1_prefix)
+app.include_router(admin.router, prefix=settings.api_v1_prefix)
 
 
 @app.get("/", response_model=HealthCheckResponse)
@@ -71,5 +94,30 @@ async def health():
     return HealthCheckResponse(
         status="ok",
         version=__version__,
-        models_loaded=chatbot.is_ready()
-    )
\ No newline at end of file
+        models_loaded=chatbot.is_ready(),
+        kb_version=chatbot.database.version,
+        kb_created_at=chatbot.database.created_at
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Aggregate the metric files of all gunicorn workers, not just this one
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/health/memory")
+async def health_memory():
+    """Memory usage of the worker that served this request."""
+    return memory_report()
+
+
+@app.get("/health/startup")
+async def health_startup():
+    """Startup timeline of the worker that served this request."""
+    return startup_timeline.report()
\ No newline at end of file
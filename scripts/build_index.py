@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""Build or incrementally update the FAISS index, metadata and config.
+
+Usage:
+    python scripts/build_index.py --input data/tickets.jsonl
+    python scripts/build_index.py --input data/new_tickets.csv --incremental
+    python scripts/build_index.py --input data/tickets.jsonl --incremental --prune-missing
+    python scripts/build_index.py --input data/tickets.jsonl --index-type IVFPQ --pq-m 48
+
+    # Versioned: builds into a new KB_DIR/<version> directory and activates it.
+    # Without --kb-dir the files are replaced one by one, do not build into
+    # the served paths while the service is running.
+    python scripts/build_index.py --input data/new_tickets.csv --incremental --kb-dir data/kb
+"""
+import argparse
+import json
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import get_settings
+from app.services.ingest import INDEX_TYPES, IndexBuilder
+from app.services.knowledge_base import (
+    prune_versions, publish_version, read_pointer, staging_directory
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", required=True, help="CSV or JSONL ticket corpus")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only embed new or changed documents")
+    parser.add_argument("--prune-missing", action="store_true",
+                        help="In incremental mode, remove documents missing from --input "
+                             "(pass the full corpus)")
+    parser.add_argument("--retrain", action="store_true",
+                        help="Retrain the index in incremental mode (done anyway when "
+                             "--index-type, --nlist, --pq-m or --hnsw-m change it)")
+    parser.add_argument("--index-type", default=None, choices=list(INDEX_TYPES),
+                        help="Index type (default: the type of the existing build, else IVF)")
+    parser.add_argument("--nlist", type=int, default=None,
+                        help="Number of IVF lists (default: 4 * sqrt(N))")
+    parser.add_argument("--pq-m", type=int, default=None,
+                        help="IVFPQ sub-quantizers, must divide the dimension (default: ~dimension / 8)")
+    parser.add_argument("--hnsw-m", type=int, default=None,
+                        help="HNSW neighbors per node (default: 32)")
+    parser.add_argument("--chunk-size", type=int, default=2048,
+                        help="Documents read and embedded per chunk")
+    parser.add_argument("--batch-size", type=int, default=128,
+                        help="Embedding batch size")
+    parser.add_argument("--train-sample", type=int, default=50000,
+                        help="Vectors used to train the IVF quantizer")
+    parser.add_argument("--text-fields", nargs="+", default=["subject", "answer"],
+                        help="Record fields that are embedded")
+    parser.add_argument("--id-field", default="id",
+                        help="Record field with a stable document id")
+    parser.add_argument("--index-path", default=None)
+    parser.add_argument("--metadata-path", default=None)
+    parser.add_argument("--config-path", default=None)
+    parser.add_argument("--kb-dir", default=get_settings().kb_dir,
+                        help="Versioned knowledge base root (default: KB_DIR)")
+    parser.add_argument("--keep", type=int, default=3,
+                        help="Versions kept in --kb-dir, including the new one")
+    args = parser.parse_args()
+
+    kb_dir = Path(args.kb_dir) if args.kb_dir else None
+    staging = None
+    paths = {
+        "index_path": args.index_path,
+        "metadata_path": args.metadata_path,
+        "config_path": args.config_path,
+    }
+    if kb_dir is not None:
+        # Incremental builds start from a copy of the served version
+        base_version = read_pointer(kb_dir) if args.incremental and kb_dir.exists() else None
+        staging = staging_directory(kb_dir, base_version)
+        settings = get_settings()
+        paths = {
+            "index_path": str(staging / Path(settings.faiss_index_path).name),
+            "metadata_path": str(staging / Path(settings.metadata_path).name),
+            "config_path": str(staging / Path(settings.config_path).name),
+            "metadata_store_path": str(staging / Path(settings.metadata_store_path).name),
+        }
+
+    builder = IndexBuilder(
+        **paths,
+        text_fields=args.text_fields,
+        id_field=args.id_field,
+        batch_size=args.batch_size
+    )
+    try:
+        config = builder.build(
+            args.input,
+            incremental=args.incremental,
+            index_type=args.index_type,
+            nlist=args.nlist,
+            chunk_size=args.chunk_size,
+            train_sample_size=args.train_sample,
+            retrain=args.retrain,
+            pq_m=args.pq_m,
+            hnsw_m=args.hnsw_m,
+            prune_missing=args.prune_missing
+        )
+    except BaseException:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if kb_dir is not None:
+        previous = read_pointer(kb_dir)
+        version = publish_version(kb_dir, staging)
+        # Workers that have not swapped yet still serve the previous version
+        removed = prune_versions(kb_dir, max(args.keep, 1), protect=[previous])
+        print(f"Activated version {version} in {kb_dir}" + (
+            f", removed {', '.join(removed)}" if removed else ""
+        ))
+    print(json.dumps(config, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""Pick the direct-answer thresholds from labelled queries.
+
+Every query is embedded and searched like a chat request with --top-k: the
+same number of vector hits, with the search settings of the service, so the
+top hit and its margin over the other hits are the ones the service routes
+on. A threshold pair is good if the
+stored answers it would serve are correct at least --target of the time; the
+pair serving the most queries without the LLM is recommended.
+
+The log is JSON lines with the query and the knowledge base entry that answers
+it. "expected" is the entry's row number, its subject or its answer text, or
+null if no entry answers the query (it must go to the LLM):
+
+    {"query": "How do I reset my password?", "expected": "Password reset"}
+    {"query": "Drucker ist offline", "expected": 1234}
+    {"query": "Can I expense a new keyboard?", "expected": null}
+
+Usage:
+    python scripts/calibrate_direct_answers.py --log data/labelled_queries.jsonl
+    python scripts/calibrate_direct_answers.py --log queries.jsonl --target 0.99 --min-served 20
+    python scripts/calibrate_direct_answers.py --log queries.jsonl --kb-dir ./kb --output calibration.json
+"""
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.faiss_db import FAISSDatabase
+from app.services.knowledge_base import read_pointer
+from app.services.chatbot import candidate_count
+from app.services.routing import DirectAnswerRouter, answer_key
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def load_log(path: str) -> list:
+    """Labelled queries of a JSON lines file."""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not record.get("query"):
+                raise ValueError(f"{path}:{number}: missing query")
+            records.append(record)
+    return records
+
+
+def open_database(args) -> FAISSDatabase:
+    """The served knowledge base version, or the flat artifacts from the settings."""
+    kb_dir = args.kb_dir or settings.kb_dir
+    if kb_dir:
+        version = read_pointer(Path(kb_dir))
+        if version is None:
+            raise FileNotFoundError(f"No knowledge base version in {kb_dir}")
+        return FAISSDatabase.from_directory(Path(kb_dir) / version)
+    return FAISSDatabase(index_path=args.index_path, config_path=args.config_path)
+
+
+def is_correct(database: FAISSDatabase, hit: dict, expected) -> bool:
+    """Whether the top hit's stored answer answers the query."""
+    if expected is None:
+        return False
+    if isinstance(expected, int):
+        return answer_key(database.get_row(expected).get("answer")) == answer_key(hit.get("answer"))
+    expected = answer_key(expected)
+    return expected in (answer_key(hit.get("subject")), answer_key(hit.get("answer")))
+
+
+def evaluate(
+    tops: np.ndarray,
+    margins: np.ndarray,
+    correct: np.ndarray,
+    min_score: float,
+    min_margin: float
+) -> dict:
+    """Coverage and precision of one threshold pair."""
+    served = (tops >= min_score) & (margins >= min_margin)
+    count = int(served.sum())
+    return {
+        "min_score": round(float(min_score), 4),
+        "min_margin": round(float(min_margin), 4),
+        "served": count,
+        "coverage": count / len(tops) if len(tops) else 0.0,
+        "precision": float(correct[served].mean()) if count else 1.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log", required=True, help="JSON lines file of labelled queries")
+    parser.add_argument("--target", type=float, default=0.98,
+                        help="Share of direct answers that have to be correct")
+    parser.add_argument("--min-served", type=int, default=10,
+                        help="Ignore threshold pairs serving fewer queries directly")
+    parser.add_argument("--scores", type=float, nargs=3, default=[0.5, 1.0, 0.01],
+                        metavar=("FROM", "TO", "STEP"), help="min_score grid")
+    parser.add_argument("--margins", type=float, nargs=3, default=[0.0, 0.3, 0.01],
+                        metavar=("FROM", "TO", "STEP"), help="min_margin grid")
+    parser.add_argument("--top-k", type=int, default=settings.top_k_results,
+                        help="top_k of the chat requests (default: TOP_K_RESULTS)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--kb-dir", default=None)
+    parser.add_argument("--index-path", default=None)
+    parser.add_argument("--config-path", default=None)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    from app.services.embeddings import EmbeddingService
+
+    records = load_log(args.log)
+    database = open_database(args)
+    embeddings = EmbeddingService().encode(
+        [record["query"] for record in records], batch_size=args.batch_size
+    )
+
+    # Thresholds are applied below, the router only measures
+    router = DirectAnswerRouter(enabled=True, min_score=-math.inf, min_margin=0.0)
+    scores, indices = database.search_batch(embeddings, k=candidate_count(args.top_k, router))
+    tops, margins, correct = [], [], []
+    for record, row_scores, row_indices in zip(records, scores, indices):
+        hit = router.evaluate(row_scores, row_indices, database.get_row)
+        if hit is None or not answer_key(hit.get("answer")):
+            tops.append(-math.inf)
+            margins.append(-math.inf)
+            correct.append(False)
+            continue
+        tops.append(hit["score"])
+        margins.append(hit["margin"])
+        correct.append(is_correct(database, hit, record.get("expected")))
+    tops, margins, correct = np.array(tops), np.array(margins), np.array(correct)
+
+    grid = [
+        evaluate(tops, margins, correct, min_score, min_margin)
+        for min_score in np.arange(args.scores[0], args.scores[1] + 1e-9, args.scores[2])
+        for min_margin in np.arange(args.margins[0], args.margins[1] + 1e-9, args.margins[2])
+    ]
+    passing = [
+        result for result in grid
+        if result["precision"] >= args.target and result["served"] >= args.min_served
+    ]
+    # Most traffic first, then the more conservative thresholds
+    passing.sort(key=lambda result: (
+        -result["served"], -result["precision"], -result["min_score"], -result["min_margin"]
+    ))
+    current = evaluate(
+        tops, margins, correct, settings.direct_answer_min_score, settings.direct_answer_min_margin
+    )
+
+    answerable = sum(record.get("expected") is not None for record in records)
+    print()
+    print(f"{len(records)} queries, {answerable} answered by a knowledge base entry, "
+          f"top hit correct for {int(correct.sum())}")
+    print(f"{'min_score':>10} {'min_margin':>11} {'served':>7} {'coverage':>9} {'precision':>10}")
+    for result in [current] + passing[:10]:
+        print(f"{result['min_score']:>10.2f} {result['min_margin']:>11.2f} {result['served']:>7} "
+              f"{result['coverage']:>9.3f} {result['precision']:>10.3f}"
+              + ("  (configured)" if result is current else ""))
+
+    recommended = passing[0] if passing else None
+    if recommended is not None:
+        print(f"\nServes {recommended['coverage']:.1%} of queries without the LLM at "
+              f"precision {recommended['precision']:.3f}:")
+        print("DIRECT_ANSWER_ENABLED=True")
+        print(f"DIRECT_ANSWER_MIN_SCORE={recommended['min_score']}")
+        print(f"DIRECT_ANSWER_MIN_MARGIN={recommended['min_margin']}")
+    else:
+        print(f"\nNo thresholds reach precision {args.target} "
+              f"with at least {args.min_served} direct answers")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "queries": len(records),
+                "target": args.target,
+                "min_served": args.min_served,
+                "configured": current,
+                "recommended": recommended,
+                "results": passing
+            }, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""Check cosine parity and latency of embedding backends against the torch reference.
+
+Usage:
+    python scripts/compare_embedding_backends.py
+    python scripts/compare_embedding_backends.py --backends torch onnx onnx-int8 --min-cosine 0.99
+    python scripts/compare_embedding_backends.py --texts data/sample_queries.txt --output parity.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.embeddings import EmbeddingService, EMBEDDING_BACKENDS
+
+TEXTS = [
+    "How do I reset my password?",
+    "Wie setze ich mein Passwort zurück?",
+    "Outlook fragt ständig nach meinem Passwort",
+    "MFA is not working on my new phone.",
+    "VPN Cisco AnyConnect verbindet nicht",
+    "Fehlercode 0x80070005 beim Windows Update",
+    "The printer on the 3rd floor shows offline.",
+    "How do I share a folder in OneDrive with an external partner?",
+    "Mein Laptop ist nach dem letzten Update sehr langsam",
+    "I cannot log in to Teams, it says my account is locked.",
+    "Zugriff auf ein freigegebenes Postfach beantragen",
+    "Bildschirm bleibt schwarz nach dem Andocken",
+]
+
+
+def run_backend(backend: str, texts: list, batch_size: int, repeats: int) -> dict:
+    """Embed the texts with one backend, one query at a time and as a batch."""
+    service = EmbeddingService(backend=backend)
+    service.cache = None
+
+    start = time.perf_counter()
+    _ = service.model
+    load_time = time.perf_counter() - start
+
+    # Untimed pass for lazy initialization
+    service.encode(texts[:2])
+
+    query_latencies = []
+    for _ in range(repeats):
+        for text in texts:
+            start = time.perf_counter()
+            service.encode_query(text)
+            query_latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    vectors = service.encode(texts, batch_size=batch_size)
+    batch_time = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "load_time": load_time,
+        "query_ms_mean": statistics.mean(query_latencies) * 1000,
+        "query_ms_p50": statistics.median(query_latencies) * 1000,
+        "batch_texts_per_s": len(texts) / batch_time,
+        "vectors": vectors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS),
+                        choices=list(EMBEDDING_BACKENDS),
+                        help="Backends to compare, the first one is the reference")
+    parser.add_argument("--texts", default=None, help="Text file with one text per line")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes over the texts")
+    parser.add_argument("--min-cosine", type=float, default=0.99,
+                        help="Fail if any text falls below this cosine to the reference")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    texts = TEXTS
+    if args.texts:
+        with open(args.texts, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    results = []
+    for backend in args.backends:
+        print(f"Running {backend}...")
+        results.append(run_backend(backend, texts, args.batch_size, args.repeats))
+
+    reference = results[0]
+    for result in results:
+        # Vectors are normalized, so the row-wise dot product is the cosine
+        cosines = np.sum(result["vectors"] * reference["vectors"], axis=1)
+        result["cosine_min"] = float(cosines.min())
+        result["cosine_mean"] = float(cosines.mean())
+        result["speedup"] = reference["query_ms_mean"] / result["query_ms_mean"]
+
+    print()
+    print(f"{'backend':<10} {'load s':>8} {'query ms':>9} {'p50 ms':>8} {'speedup':>8} "
+          f"{'batch/s':>9} {'cos min':>8} {'cos mean':>9}")
+    for result in results:
+        print(
+            f"{result['backend']:<10} {result['load_time']:>8.2f} {result['query_ms_mean']:>9.2f} "
+            f"{result['query_ms_p50']:>8.2f} {result['speedup']:>7.2f}x "
+            f"{result['batch_texts_per_s']:>9.1f} {result['cosine_min']:>8.4f} "
+            f"{result['cosine_mean']:>9.4f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "texts": texts,
+                "results": [
+                    {key: value for key, value in result.items() if key != "vectors"}
+                    for result in results
+                ]
+            }, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    failing = [result["backend"] for result in results if result["cosine_min"] < args.min_cosine]
+    if failing:
+        print(f"\nCosine parity below {args.min_cosine}: {', '.join(failing)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""Compare LLM backends on a fixed question set: latency vs. answer agreement.
+
+The first backend is the reference; every other backend is scored by how
+closely its answers match the reference answers.
+
+Usage:
+    python scripts/compare_llm_backends.py
+    python scripts/compare_llm_backends.py --backends bf16 int8 --max-tokens 130 --output results.json
+"""
+import argparse
+import difflib
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.llm import LLMService, LLM_BACKENDS
+
+QUESTIONS = [
+    "How do I reset my password?",
+    "My Outlook keeps asking for my password, what should I do?",
+    "MFA is not working on my new phone.",
+    "How do I connect to the VPN with Cisco AnyConnect?",
+    "The printer on the 3rd floor shows offline.",
+    "Windows update fails with error 0x80070005.",
+    "How do I share a folder in OneDrive with an external partner?",
+    "My laptop is very slow after the last update.",
+    "I cannot log in to Teams, it says my account is locked.",
+    "How do I request access to a shared mailbox?",
+]
+
+
+def token_f1(candidate: str, reference: str) -> float:
+    """Bag-of-words F1 between two answers."""
+    candidate_tokens = candidate.lower().split()
+    reference_tokens = reference.lower().split()
+    if not candidate_tokens or not reference_tokens:
+        return float(candidate_tokens == reference_tokens)
+
+    remaining = list(reference_tokens)
+    common = 0
+    for token in candidate_tokens:
+        if token in remaining:
+            remaining.remove(token)
+            common += 1
+    if common == 0:
+        return 0.0
+    precision = common / len(candidate_tokens)
+    recall = common / len(reference_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def run_backend(backend: str, max_tokens: int) -> dict:
+    """Load a backend and answer every question."""
+    llm = LLMService(backend=backend)
+
+    start = time.perf_counter()
+    _ = llm.model
+    load_time = time.perf_counter() - start
+
+    # One untimed generation for lazy kernel initialization
+    llm.generate(llm.build_messages(QUESTIONS[0]), 8)
+
+    answers, latencies = [], []
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        answers.append(llm.generate(llm.build_messages(question), max_tokens))
+        latencies.append(time.perf_counter() - start)
+        print(f"  [{backend}] {latencies[-1]:.2f}s  {question}")
+
+    return {
+        "backend": backend,
+        "load_time": load_time,
+        "latency_mean": statistics.mean(latencies),
+        "latency_p50": statistics.median(latencies),
+        "latency_max": max(latencies),
+        "latencies": latencies,
+        "answers": answers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=list(LLM_BACKENDS),
+                        choices=list(LLM_BACKENDS),
+                        help="Backends to compare, the first one is the reference")
+    parser.add_argument("--max-tokens", type=int, default=130)
+    parser.add_argument("--output", default=None, help="Write full results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for backend in args.backends:
+        print(f"Running {backend}...")
+        results.append(run_backend(backend, args.max_tokens))
+
+    reference = results[0]
+    for result in results:
+        result["token_f1"] = statistics.mean(
+            token_f1(answer, ref) for answer, ref in zip(result["answers"], reference["answers"])
+        )
+        result["similarity"] = statistics.mean(
+            difflib.SequenceMatcher(None, answer, ref).ratio()
+            for answer, ref in zip(result["answers"], reference["answers"])
+        )
+        result["speedup"] = reference["latency_mean"] / result["latency_mean"]
+
+    print()
+    print(f"{'backend':<8} {'load s':>8} {'mean s':>8} {'p50 s':>8} {'speedup':>8} {'token F1':>9} {'similarity':>10}")
+    for result in results:
+        print(
+            f"{result['backend']:<8} {result['load_time']:>8.2f} {result['latency_mean']:>8.2f} "
+            f"{result['latency_p50']:>8.2f} {result['speedup']:>7.2f}x {result['token_f1']:>9.3f} "
+            f"{result['similarity']:>10.3f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"questions": QUESTIONS, "results": results}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
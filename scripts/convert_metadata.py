@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+"""Convert the pickled metadata list into a memory-mapped metadata store.
+
+Usage:
+    python scripts/convert_metadata.py
+    python scripts/convert_metadata.py --pickle data/it_support_metadata.pkl --store data/it_support_metadata.store
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import get_settings
+from app.services.metadata_store import convert_pickle, MetadataStore
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pickle", default=settings.metadata_path)
+    parser.add_argument("--store", default=settings.metadata_store_path)
+    args = parser.parse_args()
+
+    store_path = convert_pickle(Path(args.pickle), Path(args.store))
+    store = MetadataStore.open(store_path)
+    print(f"Converted {len(store)} rows, columns: {', '.join(store.column_names)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""Measure recall@k of the FAISS index against brute-force search for several nprobe values.
+
+Queries are sampled from the stored document vectors (slightly perturbed so a
+document does not trivially find itself), or embedded from a text file with
+one query per line. Ground truth comes from an exact IndexFlatIP over the
+same vectors.
+
+Usage:
+    python scripts/evaluate_recall.py
+    python scripts/evaluate_recall.py --nprobe 1 2 4 8 16 32 --k 4 --target 0.95
+    python scripts/evaluate_recall.py --queries data/sample_queries.txt --oversample 2
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.faiss_db import FAISSDatabase
+
+
+def load_vectors(database: FAISSDatabase) -> np.ndarray:
+    """All document vectors, from the vectors file or reconstructed from the index."""
+    if database.vectors_path.exists():
+        return np.load(database.vectors_path).astype("float32")
+    index = database.index
+    if database.is_ivf:
+        index.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def sample_queries(vectors: np.ndarray, size: int, noise: float, seed: int) -> np.ndarray:
+    """Perturbed copies of random document vectors."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), min(size, len(vectors)), replace=False)
+    queries = vectors[rows] + noise * rng.standard_normal((len(rows), vectors.shape[1]))
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.ascontiguousarray(queries, dtype="float32")
+
+
+def embed_queries(path: str) -> np.ndarray:
+    """Embed the queries of a text file, one per line."""
+    from app.services.embeddings import EmbeddingService
+
+    with open(path, "r", encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+    return EmbeddingService().encode(texts)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Fraction of the exact top-k that the approximate search returned."""
+    hits = sum(len(set(row[row >= 0]) & set(true_row)) for row, true_row in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--oversample", type=int, default=1,
+                        help="Candidate multiplier with exact re-ranking")
+    parser.add_argument("--target", type=float, default=0.95,
+                        help="Recall the recommended nprobe has to reach")
+    parser.add_argument("--queries", default=None,
+                        help="Text file with one query per line (default: sampled vectors)")
+    parser.add_argument("--sample-size", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=0.05,
+                        help="Perturbation of sampled document vectors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--index-path", default=None)
+    parser.add_argument("--config-path", default=None)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    database = FAISSDatabase(index_path=args.index_path, config_path=args.config_path)
+    vectors = load_vectors(database)
+
+    if args.queries:
+        queries = embed_queries(args.queries)
+    else:
+        queries = sample_queries(vectors, args.sample_size, args.noise, args.seed)
+
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    start = time.perf_counter()
+    _, truth = exact.search(queries, args.k)
+    flat_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    nprobes = args.nprobe if database.is_ivf else [None]
+    if not database.is_ivf:
+        print("Index is not IVF, nprobe does not apply")
+
+    results = []
+    for nprobe in nprobes:
+        start = time.perf_counter()
+        _, found = database.search_batch(
+            queries, args.k, nprobe=nprobe, oversample=args.oversample
+        )
+        latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        results.append({
+            "nprobe": nprobe,
+            "recall": recall_at_k(found, truth),
+            "latency_ms": latency_ms
+        })
+
+    print()
+    print(f"{len(queries)} queries, k={args.k}, oversample={args.oversample}, "
+          f"flat search {flat_ms:.3f} ms/query")
+    print(f"{'nprobe':>8} {f'recall@{args.k}':>10} {'ms/query':>10}")
+    for result in results:
+        print(f"{str(result['nprobe']):>8} {result['recall']:>10.4f} {result['latency_ms']:>10.3f}")
+
+    passing = [result for result in results if result["recall"] >= args.target]
+    recommended = passing[0]["nprobe"] if passing else None
+    if recommended is not None:
+        print(f"\nCheapest nprobe with recall >= {args.target}: {recommended} (FAISS_NPROBE={recommended})")
+    else:
+        print(f"\nNo nprobe reached recall {args.target}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "k": args.k,
+                "oversample": args.oversample,
+                "queries": len(queries),
+                "target": args.target,
+                "recommended_nprobe": recommended,
+                "flat_latency_ms": flat_ms,
+                "results": results
+            }, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""Download, convert and save the models so server startups load them from local disk.
+
+Run once per image or volume, e.g. from docker-entrypoint.sh. It writes what
+the services load on later startups instead of repeating the work:
+
+- the embedding model under MODEL_CACHE_DIR (torch backend), or its ONNX
+  export under EMBEDDING_ONNX_DIR (onnx backends)
+- the LLM tokenizer and bf16 weights under MODEL_CACHE_DIR, or the quantized
+  model under LLM_QUANTIZED_CACHE_DIR (int8 backend)
+- the draft model into the Hugging Face cache (LLM_SPECULATIVE_MODE=draft_model)
+
+Existing copies are kept, so running it again is cheap.
+
+Usage:
+    MODEL_CACHE_DIR=./.cache/models python scripts/prewarm_models.py
+    MODEL_CACHE_DIR=./.cache/models python scripts/prewarm_models.py --skip-llm
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.core.startup import startup_timeline
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skip-embeddings", action="store_true")
+    parser.add_argument("--skip-llm", action="store_true")
+    args = parser.parse_args()
+
+    if not settings.model_cache_dir:
+        print("MODEL_CACHE_DIR is not set, only the converted caches are written",
+              file=sys.stderr)
+
+    from app.services.embeddings import EmbeddingService
+    from app.services.llm import LLMService
+
+    if not args.skip_embeddings:
+        embeddings = EmbeddingService()
+        _ = embeddings.model
+        saved = embeddings.persist()
+        if embeddings.backend != "torch":
+            saved = embeddings.onnx_dir
+        print(f"Embedding model ({embeddings.backend}): {saved or 'Hugging Face cache'}")
+
+    if not args.skip_llm:
+        llm = LLMService()
+        _ = llm.model
+        saved = llm.persist()
+        if llm.backend == "int8":
+            print(f"Quantized LLM: {llm.quantized_cache_path}")
+        print(f"LLM ({llm.backend}): {saved or 'Hugging Face cache'}")
+        if llm.speculative_mode == "draft_model":
+            _ = llm.draft_model
+            print(f"Draft model: {llm.draft_model_id}")
+
+    print(json.dumps(startup_timeline.report()["phases"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
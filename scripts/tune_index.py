@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+"""Tune the FAISS index type and search parameters for memory, p99 latency and recall.
+
+Every candidate index (Flat, IVF, IVFPQ, SQ8, HNSW with their build
+parameters) is built over the stored document vectors and searched one query
+at a time with each search parameter (nprobe, ef_search). Recall@k is
+measured against exact search. Candidates that are beaten on memory, p99
+latency and recall at once by another candidate are dropped; of the rest
+(the Pareto front) reaching --target recall, the fastest is recommended, or
+the smallest with --objective memory.
+
+With --write the index is rebuilt with the recommended type over the stored
+vectors, and the config gets its search parameters, which FAISSDatabase
+applies at load. With a versioned knowledge base this publishes a new version.
+
+Usage:
+    python scripts/tune_index.py
+    python scripts/tune_index.py --types IVF IVFPQ HNSW --target 0.95 --max-memory-mb 200
+    python scripts/tune_index.py --objective memory --oversample 4 --write
+    python scripts/tune_index.py --kb-dir data/kb --write --output tuning.json
+"""
+import argparse
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from evaluate_recall import embed_queries, load_vectors, recall_at_k, sample_queries
+from app.services.embeddings import EmbeddingService
+from app.services.faiss_db import FAISSDatabase
+from app.services.ingest import (
+    DEFAULT_HNSW_M, INDEX_TYPES, IndexBuilder, create_index, default_pq_m, describe_index
+)
+from app.services.knowledge_base import publish_version, read_pointer, staging_directory
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def build_candidates(args, vectors: np.ndarray):
+    """Yield each candidate index with its build parameters and its search parameters to try."""
+    dimension = vectors.shape[1]
+    for index_type in args.types:
+        kind = index_type.upper()
+        if kind == "IVFPQ":
+            builds = [{"pq_m": m} for m in (args.pq_m or [default_pq_m(dimension)])]
+        elif kind == "HNSW":
+            builds = [{"hnsw_m": m} for m in args.hnsw_m]
+        else:
+            builds = [{}]
+
+        for build in builds:
+            start = time.perf_counter()
+            try:
+                index = create_index(
+                    vectors, index_type, nlist=args.nlist, train_sample_size=args.train_sample, **build
+                )
+            except ValueError as e:
+                print(f"Skipping {index_type} {build}: {e}", file=sys.stderr)
+                continue
+            index.add(vectors)
+            build_time = time.perf_counter() - start
+
+            if isinstance(index, faiss.IndexIVF):
+                searches = [{"nprobe": n} for n in args.nprobe if n <= index.nlist]
+            elif isinstance(index, faiss.IndexHNSW):
+                searches = [{"ef_search": ef} for ef in args.ef_search]
+            else:
+                searches = [{}]
+            yield index, build_time, searches
+
+
+def search_params(search: dict):
+    """FAISS search parameters for a candidate's nprobe or ef_search."""
+    if "nprobe" in search:
+        return faiss.SearchParametersIVF(nprobe=search["nprobe"])
+    if "ef_search" in search:
+        return faiss.SearchParametersHNSW(efSearch=search["ef_search"])
+    return None
+
+
+def measure(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    k: int,
+    search: dict,
+    oversample: int = 1
+) -> dict:
+    """Single-query latency percentiles and recall@k of one search setting.
+
+    With oversample > 1 the candidates are re-scored exactly against the
+    stored vectors, as FAISSDatabase does with SEARCH_OVERSAMPLE.
+    """
+    params = search_params(search)
+    candidates = min(k * oversample, index.ntotal)
+    # Untimed pass, so every candidate is measured with warm caches
+    index.search(queries[:16], candidates, params=params)
+
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, indices = index.search(query.reshape(1, -1), candidates, params=params)
+        ids = indices[0]
+        if oversample > 1:
+            ids = ids[ids >= 0]
+            ids = ids[np.argsort(-(vectors[ids] @ query), kind="stable")[:k]]
+        latencies.append(time.perf_counter() - start)
+        found.append(np.pad(ids, (0, k - len(ids)), constant_values=-1))
+    p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+    return {
+        "p50_ms": float(p50),
+        "p99_ms": float(p99),
+        "recall": recall_at_k(np.array(found), truth)
+    }
+
+
+def pareto_front(results: list) -> list:
+    """Results no other result beats on memory, p99 latency and recall at the same time."""
+    def dominates(a: dict, b: dict) -> bool:
+        no_worse = (
+            a["memory_mb"] <= b["memory_mb"] and a["p99_ms"] <= b["p99_ms"]
+            and a["recall"] >= b["recall"]
+        )
+        better = (
+            a["memory_mb"] < b["memory_mb"] or a["p99_ms"] < b["p99_ms"]
+            or a["recall"] > b["recall"]
+        )
+        return no_worse and better
+
+    return [result for result in results if not any(dominates(other, result) for other in results)]
+
+
+def open_database(args) -> FAISSDatabase:
+    """The served knowledge base version, or the flat artifacts from the settings."""
+    kb_dir = args.kb_dir or settings.kb_dir
+    if kb_dir:
+        version = read_pointer(Path(kb_dir))
+        if version is None:
+            raise FileNotFoundError(f"No knowledge base version in {kb_dir}")
+        return FAISSDatabase.from_directory(Path(kb_dir) / version)
+    return FAISSDatabase(
+        index_path=args.index_path,
+        metadata_path=args.metadata_path,
+        config_path=args.config_path,
+        metadata_store_path=args.metadata_store_path
+    )
+
+
+def write_recommendation(args, database: FAISSDatabase, recommended: dict) -> dict:
+    """Rebuild the index with the recommended type and write its search parameters."""
+    kb_dir = args.kb_dir or settings.kb_dir
+    kb_dir = Path(kb_dir) if kb_dir else None
+    staging = None
+    paths = {
+        "index_path": str(database.index_path),
+        "metadata_path": str(database.metadata_path),
+        "config_path": str(database.config_path),
+        "metadata_store_path": str(database.metadata_store_path),
+    }
+    if kb_dir is not None:
+        # Versions are immutable, the tuned index becomes a new one
+        staging = staging_directory(kb_dir, read_pointer(kb_dir))
+        paths = {name: str(staging / Path(path).name) for name, path in paths.items()}
+
+    builder = IndexBuilder(
+        **paths,
+        embeddings=EmbeddingService(model_name=database.config.get("embedding_model"))
+    )
+    try:
+        config = builder.reindex(
+            recommended["index_type"],
+            nlist=recommended["nlist"],
+            pq_m=recommended["pq_m"],
+            hnsw_m=recommended["hnsw_m"],
+            search=recommended["search"],
+            train_sample_size=args.train_sample
+        )
+    except BaseException:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if kb_dir is not None:
+        print(f"Activated version {publish_version(kb_dir, staging)} in {kb_dir}")
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=list(INDEX_TYPES))
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--oversample", type=int, default=settings.search_oversample,
+                        help="Candidate multiplier with exact re-ranking (default: SEARCH_OVERSAMPLE)")
+    parser.add_argument("--target", type=float, default=0.95,
+                        help="Recall the recommended candidate has to reach")
+    parser.add_argument("--objective", choices=["latency", "memory"], default="latency",
+                        help="What the recommendation minimizes among the Pareto front")
+    parser.add_argument("--max-memory-mb", type=float, default=None)
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    parser.add_argument("--nlist", type=int, default=None,
+                        help="IVF lists (default: 4 * sqrt(N))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64, 128])
+    parser.add_argument("--pq-m", type=int, nargs="+", default=None,
+                        help="IVFPQ sub-quantizers to try (default: ~dimension / 8)")
+    parser.add_argument("--hnsw-m", type=int, nargs="+", default=[16, DEFAULT_HNSW_M])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--train-sample", type=int, default=50000)
+    parser.add_argument("--queries", default=None,
+                        help="Text file with one query per line (default: sampled vectors)")
+    parser.add_argument("--sample-size", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=0.05,
+                        help="Perturbation of sampled document vectors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kb-dir", default=None)
+    parser.add_argument("--index-path", default=None)
+    parser.add_argument("--config-path", default=None)
+    parser.add_argument("--metadata-path", default=None)
+    parser.add_argument("--metadata-store-path", default=None)
+    parser.add_argument("--write", action="store_true",
+                        help="Rebuild the index with the recommendation and write its config")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    database = open_database(args)
+    vectors = np.ascontiguousarray(load_vectors(database), dtype="float32")
+    if args.queries:
+        queries = embed_queries(args.queries)
+    else:
+        queries = sample_queries(vectors, args.sample_size, args.noise, args.seed)
+
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    results = []
+    for index, build_time, searches in build_candidates(args, vectors):
+        description = describe_index(index)
+        memory_mb = len(faiss.serialize_index(index)) / (1024 * 1024)
+        for search in searches:
+            result = {
+                **description,
+                "search": search,
+                "memory_mb": memory_mb,
+                "build_s": build_time,
+                **measure(index, vectors, queries, truth, args.k, search, args.oversample)
+            }
+            results.append(result)
+            print(f"{result['index_type']:>6} {json.dumps(search):<20} {memory_mb:8.1f} MB "
+                  f"p99 {result['p99_ms']:.3f} ms recall {result['recall']:.4f}", file=sys.stderr)
+
+    front = pareto_front(results)
+    for result in results:
+        result["pareto"] = result in front
+    eligible = [
+        result for result in front
+        if result["recall"] >= args.target
+        and (args.max_memory_mb is None or result["memory_mb"] <= args.max_memory_mb)
+        and (args.max_p99_ms is None or result["p99_ms"] <= args.max_p99_ms)
+    ]
+    if args.objective == "memory":
+        eligible.sort(key=lambda result: (result["memory_mb"], result["p99_ms"]))
+    else:
+        eligible.sort(key=lambda result: (result["p99_ms"], result["memory_mb"]))
+    recommended = eligible[0] if eligible else None
+
+    print()
+    print(f"{len(vectors)} documents, {len(queries)} queries, k={args.k}, oversample={args.oversample}")
+    print(f"{'type':>6} {'build':<18} {'search':<18} {'MB':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{f'recall@{args.k}':>9}")
+    for result in sorted(results, key=lambda result: (not result["pareto"], result["memory_mb"])):
+        build = ",".join(
+            f"{name}={result[name]}" for name in ("nlist", "pq_m", "hnsw_m") if result[name]
+        )
+        search = ",".join(f"{name}={value}" for name, value in result["search"].items())
+        print(f"{result['index_type']:>6} {build:<18} {search:<18} {result['memory_mb']:>8.1f} "
+              f"{result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f} {result['recall']:>9.4f}"
+              + ("  *" if result["pareto"] else "") + ("  <-" if result is recommended else ""))
+    print("* Pareto front (no candidate has less memory, lower p99 and higher recall)")
+
+    if recommended is None:
+        print(f"\nNo candidate on the Pareto front reaches recall {args.target} within the limits")
+    else:
+        print(f"\nRecommended: {recommended['index_type']} {recommended['search'] or ''} "
+              f"({recommended['memory_mb']:.1f} MB, p99 {recommended['p99_ms']:.3f} ms, "
+              f"recall {recommended['recall']:.4f})")
+        if args.write:
+            config = write_recommendation(args, database, recommended)
+            print(json.dumps(config, indent=2))
+        else:
+            print("Run again with --write to rebuild the index and write the config")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "documents": len(vectors),
+                "queries": len(queries),
+                "k": args.k,
+                "oversample": args.oversample,
+                "target": args.target,
+                "objective": args.objective,
+                "recommended": recommended,
+                "results": results
+            }, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
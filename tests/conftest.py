@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.ingest import IndexBuilder
+from benchmarks.stubs import HashingEmbeddingService
+
+
+def artifact_paths(directory: Path) -> Dict[str, str]:
+    """Artifact paths of a knowledge base in directory, named as in the settings."""
+    settings = get_settings()
+    return {
+        "index_path": str(directory / Path(settings.faiss_index_path).name),
+        "metadata_path": str(directory / Path(settings.metadata_path).name),
+        "config_path": str(directory / Path(settings.config_path).name),
+        "metadata_store_path": str(directory / Path(settings.metadata_store_path).name),
+    }
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """The shared settings; set attributes with monkeypatch.setattr so they are restored."""
+    settings = get_settings()
+    # Knowledge bases built by the tests are embedded with the hashing stub
+    monkeypatch.setattr(settings, "embedding_model", "stub-hashing")
+    return settings
+
+
+@pytest.fixture
+def embeddings(settings) -> HashingEmbeddingService:
+    return HashingEmbeddingService(dimension=64)
+
+
+@pytest.fixture
+def write_corpus(tmp_path):
+    """Write records as a JSONL corpus and return its path."""
+    def write(records: Iterable[Dict[str, Any]], name: str = "corpus.jsonl") -> Path:
+        path = tmp_path / name
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return path
+    return write
+
+
+@pytest.fixture
+def make_builder(embeddings):
+    """IndexBuilder writing its artifacts into a directory."""
+    def make(directory: Path) -> IndexBuilder:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        return IndexBuilder(embeddings=embeddings, **artifact_paths(directory))
+    return make
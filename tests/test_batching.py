@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.services.batching import GenerationBatcher
+from app.services.executor import InferenceExecutor
+from app.services.llm import GenerationStats
+from benchmarks.stubs import StubLLMService
+
+
+class RecordingLLM(StubLLMService):
+    """Stub LLM that notes the batch sizes and in-flight count it ran with."""
+
+    def __init__(self, executor: InferenceExecutor):
+        super().__init__(prefill_tokens_per_second=1e6, decode_tokens_per_second=1e4)
+        self.record_metrics = False
+        self.executor = executor
+        self.batches = []
+        self.in_flight = []
+
+    def generate_batch(self, batch_messages, max_new_tokens, stats=None):
+        self.batches.append(len(batch_messages))
+        self.in_flight.append(self.executor.in_flight)
+        return super().generate_batch(batch_messages, max_new_tokens, stats)
+
+
+@pytest.fixture
+def executor():
+    executor = InferenceExecutor(cpu_workers=1, llm_concurrency=1, queue_size=8)
+    yield executor
+    executor.shutdown()
+
+
+def messages(query: str):
+    return [{"role": "user", "content": query}]
+
+
+def test_concurrent_prompts_share_a_batch(executor):
+    llm = RecordingLLM(executor)
+    batcher = GenerationBatcher(llm, executor, max_batch_size=4, window_ms=50)
+
+    async def scenario():
+        stats = [GenerationStats() for _ in range(3)]
+        texts = await asyncio.gather(*(
+            batcher.submit(messages(f"q{i}"), 8 + i, stats[i]) for i in range(3)
+        ))
+        return texts, stats
+
+    try:
+        texts, stats = asyncio.run(scenario())
+    finally:
+        batcher.shutdown(timeout=5)
+
+    assert llm.batches == [3]
+    assert [len(text.split()) for text in texts] == [8, 9, 10]
+    assert all(item.batch_size == 3 for item in stats)
+    assert [item.stop_reasons for item in stats] == [["max_tokens"]] * 3
+
+
+def test_batches_run_in_the_executor_llm_pool(executor):
+    llm = RecordingLLM(executor)
+    batcher = GenerationBatcher(llm, executor, max_batch_size=2, window_ms=20)
+
+    async def scenario():
+        await asyncio.gather(*(batcher.submit(messages(f"q{i}"), 4) for i in range(5)))
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        batcher.shutdown(timeout=5)
+
+    assert sum(llm.batches) == 5
+    assert max(llm.batches) <= 2
+    # Every batch held the single LLM slot
+    assert llm.in_flight == [1] * len(llm.batches)
+    assert executor.in_flight == 0
+
+
+def test_failed_batch_fails_its_prompts(executor, monkeypatch):
+    llm = RecordingLLM(executor)
+    batcher = GenerationBatcher(llm, executor, max_batch_size=4, window_ms=20)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("out of memory")
+    monkeypatch.setattr(llm, "generate_batch", fail)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(batcher.submit(messages(f"q{i}"), 4) for i in range(2)),
+            return_exceptions=True
+        )
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        batcher.shutdown(timeout=5)
+    assert [str(result) for result in results] == ["out of memory"] * 2
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from benchmarks.results import check_baseline, compare, make_result
+
+
+def result(p50_ms: float, rps: float):
+    return make_result("load", {"rps": 2}, {"all": {"p50_ms": p50_ms, "rps": rps, "requests": 10}})
+
+
+def test_missing_baseline_fails_without_creating_it(tmp_path, capsys):
+    path = tmp_path / "baselines" / "load.json"
+
+    assert check_baseline(result(100, 2.0), str(path)) == 2
+    assert not path.exists()
+    assert "no baseline" in capsys.readouterr().err
+
+
+def test_update_records_baseline(tmp_path):
+    path = tmp_path / "baselines" / "load.json"
+
+    assert check_baseline(result(100, 2.0), str(path), update=True) == 0
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["metrics"]["all"]["p50_ms"] == 100
+    assert check_baseline(result(110, 2.0), str(path)) == 0
+    assert check_baseline(result(130, 2.0), str(path)) == 1
+
+
+def test_regression_direction_per_metric():
+    baseline = result(100, 2.0)
+
+    assert compare(result(90, 2.5), baseline) == []
+    regressions = compare(result(125, 1.5), baseline)
+    assert [(item["metric"], item["change"]) for item in regressions] == [
+        ("p50_ms", pytest.approx(0.25)), ("rps", pytest.approx(-0.25))
+    ]
+    # Informational counters are never compared
+    worse = result(100, 2.0)
+    worse["metrics"]["all"]["requests"] = 1
+    assert compare(worse, baseline) == []
+
+
+def test_results_of_another_benchmark_are_refused():
+    with pytest.raises(ValueError):
+        compare(make_result("faiss", {}, {}), result(100, 2.0))
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from app.models.responses import ChatResponse
+from app.services import cache as cache_module
+from app.services.cache import EmbeddingCache, ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def unit(*values: float) -> np.ndarray:
+    vector = np.asarray(values, dtype="float32")
+    return vector / np.linalg.norm(vector)
+
+
+def response(text: str) -> ChatResponse:
+    return ChatResponse(response=text, query=text, processing_time=0.0)
+
+
+def test_exact_hit_normalizes_query(clock):
+    cache = ResponseCache(max_entries=4, ttl=60, similarity_threshold=0.95)
+    cache.put("Reset my  Password", 5, 128, unit(1, 0, 0), response("a"))
+
+    assert cache.get_exact("reset my password", 5, 128).response == "a"
+    # Parameters are part of the key
+    assert cache.get_exact("reset my password", 3, 128) is None
+
+
+def test_semantic_hit_respects_threshold(clock):
+    cache = ResponseCache(max_entries=4, ttl=60, similarity_threshold=0.95)
+    cache.put("reset my password", 5, 128, unit(1, 0, 0), response("a"))
+
+    assert cache.get_semantic(unit(1, 0.1, 0), 5, 128).response == "a"
+    assert cache.get_semantic(unit(1, 1, 0), 5, 128) is None
+    assert cache.get_semantic(unit(1, 0.1, 0), 5, 256) is None
+    assert cache.stats()["semantic_hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(max_entries=4, ttl=60, similarity_threshold=0.95)
+    cache.put("reset my password", 5, 128, unit(1, 0, 0), response("a"))
+
+    clock.now += 59
+    assert cache.get_exact("reset my password", 5, 128) is not None
+    clock.now += 2
+    assert cache.get_exact("reset my password", 5, 128) is None
+    assert cache.get_semantic(unit(1, 0, 0), 5, 128) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_entries=2, ttl=60, similarity_threshold=0.95)
+    cache.put("first", 5, 128, unit(1, 0, 0), response("1"))
+    cache.put("second", 5, 128, unit(0, 1, 0), response("2"))
+    cache.get_exact("first", 5, 128)
+    cache.put("third", 5, 128, unit(0, 0, 1), response("3"))
+
+    assert cache.get_exact("second", 5, 128) is None
+    assert cache.get_exact("first", 5, 128) is not None
+    # The evicted entry is gone from the semantic level too
+    assert cache.get_semantic(unit(0, 1, 0), 5, 128) is None
+    assert cache.get_semantic(unit(0, 0, 1), 5, 128).response == "3"
+
+
+def test_new_fingerprint_clears_entries(clock):
+    cache = ResponseCache(max_entries=4, ttl=60, similarity_threshold=0.95)
+    cache.validate("v1")
+    cache.put("reset my password", 5, 128, unit(1, 0, 0), response("a"))
+
+    cache.validate("v1")
+    assert cache.get_exact("reset my password", 5, 128) is not None
+    cache.validate("v2")
+    assert cache.get_exact("reset my password", 5, 128) is None
+    assert cache.get_semantic(unit(1, 0, 0), 5, 128) is None
+
+
+def test_embedding_cache_lru_and_persistence(tmp_path):
+    path = tmp_path / "embeddings.sqlite"
+    cache = EmbeddingCache(max_entries=1, path=str(path))
+    cache.put_many(["a", "b"], np.eye(2, dtype="float32"))
+
+    # "a" was evicted from memory but is read back from the file
+    assert len(cache._entries) == 1
+    found = cache.get_many(["a", "b", "c"])
+    np.testing.assert_array_equal(found[0], [1, 0])
+    np.testing.assert_array_equal(found[1], [0, 1])
+    assert found[2] is None
+    cache.close()
+
+    reopened = EmbeddingCache(max_entries=4, path=str(path))
+    np.testing.assert_array_equal(reopened.get_many(["b"])[0], [0, 1])
+    reopened.close()
@@ -0,0 +1,86 @@
+from typing import Any, Dict
+
+from app.services.context import MIN_PASSAGE_TOKENS, PASSAGE_SEPARATOR, ContextBuilder
+from benchmarks.stubs import WordTokenizer
+
+
+def hit(name: str, words: int, score: float) -> Dict[str, Any]:
+    """A search hit whose context text is words + 2 tokens long."""
+    answer = " ".join(f"{name}{i}" for i in range(words))
+    return {"subject": name, "answer": answer, "score": score}
+
+
+def make(**kwargs) -> ContextBuilder:
+    tokenizer = WordTokenizer()
+    options = dict(max_tokens=100, mmr_lambda=1.0, min_score=0.0, cache_size=16)
+    options.update(kwargs)
+    return ContextBuilder(lambda: tokenizer, **options)
+
+
+def tokens(context: str) -> int:
+    return len(context.split())
+
+
+def test_passages_fill_budget_in_relevance_order():
+    builder = make(max_tokens=30)
+    context = builder.build([hit("b", 8, 0.5), hit("a", 8, 0.9), hit("c", 8, 0.7)])
+
+    passages = context.split(PASSAGE_SEPARATOR)
+    assert [passage.split()[0] for passage in passages] == ["a", "c", "b"]
+    assert tokens(context) == 30
+
+
+def test_long_passage_is_passed_over_for_shorter_hits():
+    builder = make(max_tokens=40)
+    context = builder.build([hit("a", 8, 0.9), hit("long", 60, 0.8), hit("c", 8, 0.7)])
+
+    passages = context.split(PASSAGE_SEPARATOR)
+    assert [passage.split()[0] for passage in passages] == ["a", "c"]
+    assert tokens(context) == 20
+
+
+def test_leftover_budget_takes_start_of_skipped_passage():
+    budget = 20 + MIN_PASSAGE_TOKENS
+    builder = make(max_tokens=budget)
+    context = builder.build([hit("a", 8, 0.9), hit("long", 60, 0.8), hit("c", 8, 0.7)])
+
+    passages = context.split(PASSAGE_SEPARATOR)
+    # The cut passage keeps the position it ranked at
+    assert [passage.split()[0] for passage in passages] == ["a", "long", "c"]
+    assert passages[1].endswith("...")
+    assert tokens(context) == budget
+
+
+def test_single_passage_over_budget_is_cut():
+    builder = make(max_tokens=10)
+    context = builder.build([hit("long", 60, 0.9)])
+
+    assert tokens(context) == 10
+    assert context.endswith("...")
+
+
+def test_duplicates_and_low_scores_are_dropped():
+    builder = make(min_score=0.3)
+    context = builder.build([hit("a", 4, 0.9), hit("a", 4, 0.8), hit("b", 4, 0.1)])
+
+    assert context == ContextBuilder.passage_text(hit("a", 4, 0.9))
+
+
+def test_mmr_demotes_near_duplicates():
+    first = hit("a", 10, 0.9)
+    near_duplicate = dict(first, answer=first["answer"] + " extra", score=0.85)
+    distinct = hit("b", 10, 0.6)
+
+    builder = make(mmr_lambda=0.5)
+    passages = builder.build([first, near_duplicate, distinct]).split(PASSAGE_SEPARATOR)
+    assert passages[1].split()[0] == "b"
+
+
+def test_token_ids_are_cached_by_text():
+    builder = make()
+    results = [hit("a", 4, 0.9), hit("b", 4, 0.8)]
+    builder.build(results)
+    builder.build(results)
+
+    assert builder.stats()["misses"] == 2
+    assert builder.stats()["hits"] == 2
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.executor import InferenceExecutor, QueueFullError
+
+
+@pytest.fixture
+def executor():
+    executor = InferenceExecutor(cpu_workers=2, llm_concurrency=1, queue_size=1, retry_after=7)
+    yield executor
+    executor.shutdown()
+
+
+def test_admit_rejects_beyond_capacity(executor):
+    async def scenario():
+        async with executor.admit():
+            async with executor.admit():
+                assert executor.pending == 2
+                with pytest.raises(QueueFullError) as error:
+                    async with executor.admit():
+                        pass
+                assert error.value.retry_after == 7
+        # Slots are released on exit, also after a rejection
+        assert executor.pending == 0
+        async with executor.admit():
+            assert executor.pending == 1
+
+    asyncio.run(scenario())
+
+
+def test_admit_releases_slot_on_error(executor):
+    async def scenario():
+        with pytest.raises(ValueError):
+            async with executor.admit():
+                raise ValueError("generation failed")
+        assert executor.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_run_llm_is_bounded_by_concurrency(executor):
+    release = threading.Event()
+    running = []
+
+    def generate(name):
+        running.append(name)
+        release.wait(5)
+        return name
+
+    async def scenario():
+        first = asyncio.ensure_future(executor.run_llm(generate, "a"))
+        second = asyncio.ensure_future(executor.run_llm(generate, "b"))
+        await asyncio.sleep(0.1)
+        # One slot: the second call waits for the first
+        assert running == ["a"]
+        assert executor.in_flight == 1
+        release.set()
+        assert await asyncio.gather(first, second) == ["a", "b"]
+        assert executor.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_run_cpu_runs_off_the_event_loop(executor):
+    async def scenario():
+        loop_thread = threading.get_ident()
+        thread = await executor.run_cpu(threading.get_ident)
+        assert thread != loop_thread
+
+    asyncio.run(scenario())
+
+
+def test_stream_llm_forwards_items_and_errors(executor):
+    def tokens():
+        yield "a"
+        yield "b"
+        raise RuntimeError("decode failed")
+
+    async def scenario():
+        received = []
+        with pytest.raises(RuntimeError, match="decode failed"):
+            async for item in executor.stream_llm(tokens):
+                received.append(item)
+        assert received == ["a", "b"]
+        assert executor.in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,120 @@
+import json
+from typing import List
+
+import faiss
+import numpy as np
+import pytest
+
+from app.services.faiss_db import FAISSDatabase
+from benchmarks.stubs import synthetic_corpus
+from tests.conftest import artifact_paths
+
+CORPUS = list(synthetic_corpus(60, seed=3))
+
+
+@pytest.fixture
+def embedded(embeddings, monkeypatch) -> List[str]:
+    """Texts the builder embeds, in order."""
+    texts = []
+    encode = embeddings._encode
+
+    def record(batch, normalize, batch_size):
+        texts.extend(batch)
+        return encode(batch, normalize, batch_size)
+    monkeypatch.setattr(embeddings, "_encode", record)
+    return texts
+
+
+def manifest_ids(builder) -> List[str]:
+    with open(builder.manifest_path, encoding="utf-8") as f:
+        return [doc_id for doc_id, _ in json.load(f)["documents"]]
+
+
+def test_incremental_build_embeds_only_new_and_changed(tmp_path, make_builder, write_corpus, embedded):
+    builder = make_builder(tmp_path / "kb")
+    builder.build(str(write_corpus(CORPUS)), index_type="Flat")
+    assert len(embedded) == len(CORPUS)
+    first_vectors = np.load(builder.vectors_path)
+    embedded.clear()
+
+    changed = dict(CORPUS[5], answer="Reboot the docking station.")
+    retagged = dict(CORPUS[6], category="hardware")
+    new = {"id": "NEW-1", "subject": "Beamer flackert", "answer": "HDMI-Kabel tauschen."}
+    config = builder.build(
+        str(write_corpus([changed, retagged, new], "update.jsonl")), incremental=True
+    )
+
+    # The new and the changed ticket are embedded, the rest is reused
+    assert embedded == [builder.document_text(changed), builder.document_text(new)]
+    assert config["total_documents"] == len(CORPUS) + 1
+    assert manifest_ids(builder) == [record["id"] for record in CORPUS] + ["NEW-1"]
+
+    vectors = np.load(builder.vectors_path)
+    np.testing.assert_array_equal(vectors[:5], first_vectors[:5])
+    assert not np.array_equal(vectors[5], first_vectors[5])
+
+    database = FAISSDatabase(**artifact_paths(tmp_path / "kb"))
+    assert database.get_hit(5)["answer"] == "Reboot the docking station."
+    assert database.get_hit(6)["category"] == "hardware"
+    assert database.get_hit(len(CORPUS))["id"] == "NEW-1"
+
+
+def test_unchanged_corpus_embeds_nothing(tmp_path, make_builder, write_corpus, embedded):
+    builder = make_builder(tmp_path / "kb")
+    corpus = write_corpus(CORPUS)
+    first = builder.build(str(corpus), index_type="Flat")
+    embedded.clear()
+
+    second = builder.build(str(corpus), incremental=True)
+    assert embedded == []
+    assert second["content_hash"] == first["content_hash"]
+
+
+def test_prune_missing_removes_deleted_documents(tmp_path, make_builder, write_corpus, embedded):
+    builder = make_builder(tmp_path / "kb")
+    builder.build(str(write_corpus(CORPUS)), index_type="Flat")
+    embedded.clear()
+
+    remaining = CORPUS[:10] + CORPUS[20:]
+    kept = builder.build(str(write_corpus(CORPUS[:10], "partial.jsonl")), incremental=True)
+    assert kept["total_documents"] == len(CORPUS)
+
+    config = builder.build(
+        str(write_corpus(remaining, "full.jsonl")), incremental=True, prune_missing=True
+    )
+    assert embedded == []
+    assert config["total_documents"] == len(remaining)
+    assert manifest_ids(builder) == [record["id"] for record in remaining]
+    assert len(np.load(builder.vectors_path)) == len(remaining)
+
+    database = FAISSDatabase(**artifact_paths(tmp_path / "kb"))
+    assert database.get_hit(10)["id"] == CORPUS[20]["id"]
+
+
+def centroids(builder) -> np.ndarray:
+    index = faiss.read_index(str(builder.index_path))
+    quantizer = faiss.downcast_index(faiss.extract_index_ivf(index).quantizer)
+    return quantizer.reconstruct_n(0, quantizer.ntotal).copy()
+
+
+def test_incremental_build_keeps_trained_index(tmp_path, make_builder, write_corpus):
+    corpus = list(synthetic_corpus(400, seed=4))
+    builder = make_builder(tmp_path / "kb")
+    builder.build(str(write_corpus(corpus)), index_type="IVF", nlist=4)
+    trained = centroids(builder)
+
+    update = [{"id": "NEW-1", "subject": "VPN timeout", "answer": "Update the client."}]
+    config = builder.build(str(write_corpus(update, "update.jsonl")), incremental=True)
+    assert config["index_type"] == "IVF"
+    assert config["nlist"] == 4
+    np.testing.assert_array_equal(centroids(builder), trained)
+
+    # Explicit parameters that differ from the stored index retrain it
+    config = builder.build(str(write_corpus(update, "update.jsonl")), incremental=True, nlist=8)
+    assert config["nlist"] == 8
+
+
+def test_incremental_build_needs_previous_build(tmp_path, make_builder, write_corpus):
+    builder = make_builder(tmp_path / "kb")
+    with pytest.raises(FileNotFoundError, match="run a full build first"):
+        builder.build(str(write_corpus(CORPUS)), incremental=True)
@@ -0,0 +1,78 @@
+import asyncio
+import socket
+import struct
+
+import numpy as np
+import pytest
+
+from app.services import ipc
+from app.services.ipc import (
+    Frame, RemoteInferenceError, array_to_body, body_to_array, encode_frame,
+    raise_for_error, read_frame, read_frame_async
+)
+
+
+def test_frame_round_trip_over_socket():
+    frame = Frame(ipc.GENERATE, 42, {"prompt": "Passwort zurücksetzen", "max_tokens": 64}, b"\x00\x01")
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(encode_frame(frame) + encode_frame(Frame(ipc.STATUS, 43, {})))
+        assert read_frame(right) == frame
+        assert read_frame(right) == Frame(ipc.STATUS, 43, {})
+
+
+def test_frame_round_trip_over_stream():
+    frames = [Frame(ipc.CHUNK, 7, {"text": "- step"}), Frame(ipc.END, 7, {"stop_reason": "eos"})]
+
+    async def scenario():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"".join(encode_frame(frame) for frame in frames))
+        reader.feed_eof()
+        assert [await read_frame_async(reader) for _ in frames] == frames
+        with pytest.raises(asyncio.IncompleteReadError):
+            await read_frame_async(reader)
+
+    asyncio.run(scenario())
+
+
+def test_header_layout():
+    data = encode_frame(Frame(ipc.EMBED, 1, {}, b"abcd"))
+    assert struct.unpack("!BIII", data[:13]) == (ipc.EMBED, 1, 2, 4)
+    assert data[13:] == b"{}abcd"
+
+
+def test_oversized_frame_is_rejected(monkeypatch):
+    monkeypatch.setattr(ipc, "MAX_FRAME_SIZE", 8)
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(encode_frame(Frame(ipc.EMBED, 1, {"texts": ["too long"]})))
+        with pytest.raises(ValueError, match="Frame too large"):
+            read_frame(right)
+
+
+def test_closed_connection_raises():
+    left, right = socket.socketpair()
+    with right:
+        left.sendall(encode_frame(Frame(ipc.RESULT, 1, {}))[:5])
+        left.close()
+        with pytest.raises(ConnectionError):
+            read_frame(right)
+
+
+def test_array_body_round_trip():
+    array = np.arange(12, dtype="float64").reshape(3, 4) / 7
+    decoded = body_to_array(array_to_body(array), [3, 4])
+    assert decoded.dtype == np.float32
+    assert decoded.flags.writeable
+    np.testing.assert_array_equal(decoded, array.astype("float32"))
+
+
+def test_error_frames_raise():
+    with pytest.raises(ValueError, match="empty text"):
+        raise_for_error(Frame(ipc.ERROR, 1, {"type": "ValueError", "error": "empty text"}))
+    with pytest.raises(RemoteInferenceError, match="out of memory"):
+        raise_for_error(Frame(ipc.ERROR, 1, {"type": "RuntimeError", "error": "out of memory"}))
+    with pytest.raises(RemoteInferenceError, match="Unexpected frame type"):
+        raise_for_error(Frame(ipc.CHUNK, 1, {}), expected=ipc.RESULT)
+    frame = Frame(ipc.RESULT, 1, {"text": "ok"})
+    assert raise_for_error(frame, expected=ipc.RESULT) is frame
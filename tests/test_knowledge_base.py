@@ -0,0 +1,136 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from app.services.knowledge_base import (
+    KnowledgeBase, list_versions, prune_versions, publish_version, read_pointer,
+    staging_directory, write_pointer
+)
+from benchmarks.stubs import synthetic_corpus
+
+
+@pytest.fixture
+def publish(tmp_path, make_builder, write_corpus):
+    """Build a version of num_docs synthetic tickets under root and activate it."""
+    root = tmp_path / "kb"
+
+    def publish_docs(num_docs: int, seed: int = 0) -> str:
+        staging = staging_directory(root)
+        corpus = write_corpus(synthetic_corpus(num_docs, seed), name=f"corpus-{seed}.jsonl")
+        make_builder(staging).build(str(corpus), index_type="Flat")
+        return publish_version(root, staging)
+
+    publish_docs.root = root
+    return publish_docs
+
+
+def test_lease_keeps_old_version_open_until_released(publish, embeddings):
+    v1 = publish(50, seed=0)
+    kb = KnowledgeBase(str(publish.root))
+    kb.database.load()
+    query = embeddings.encode_query("VPN cannot connect")
+
+    with kb.acquire() as old:
+        v2 = publish(80, seed=1)
+        status = kb.reload()
+        assert status["version"] == v2
+        assert status["retiring"] == [{"version": v1, "in_flight": 1}]
+        # Still searchable inside the lease
+        _, indices = old.search(query, k=1)
+        assert indices[0] >= 0
+        assert old.is_loaded()
+
+    assert not old.is_loaded()
+    assert kb.status()["retiring"] == []
+    assert kb.database.index.ntotal == 80
+
+
+def test_reload_selects_version(publish):
+    v1 = publish(50, seed=0)
+    v2 = publish(60, seed=1)
+    kb = KnowledgeBase(str(publish.root))
+    kb.database.load()
+    assert kb.status()["version"] == v2
+
+    assert kb.reload(v1)["version"] == v1
+    assert read_pointer(publish.root) == v1
+
+
+def test_failed_reload_keeps_pointer_and_served_version(publish):
+    v1 = publish(50, seed=0)
+    (publish.root / "broken").mkdir()
+    kb = KnowledgeBase(str(publish.root))
+    kb.database.load()
+
+    with pytest.raises(FileNotFoundError):
+        kb.reload("broken")
+
+    assert read_pointer(publish.root) == v1
+    status = kb.status()
+    assert status["version"] == v1
+    assert status["last_error"]
+    # Nothing changed on disk, so the watcher has nothing to retry
+    assert kb._target()[2] == v1
+
+
+def test_reload_refuses_other_embedding_model(publish, settings, monkeypatch):
+    v1 = publish(50, seed=0)
+    v2 = publish(60, seed=1)
+    write_pointer(publish.root, v1)
+    kb = KnowledgeBase(str(publish.root))
+    kb.database.load()
+
+    monkeypatch.setattr(settings, "embedding_model", "another-model")
+    with pytest.raises(ValueError):
+        kb.reload(v2)
+    assert read_pointer(publish.root) == v1
+
+
+def test_reload_rejects_names_outside_root(publish):
+    publish(50)
+    kb = KnowledgeBase(str(publish.root))
+    with pytest.raises(ValueError):
+        kb.reload("../elsewhere")
+
+
+def test_swap_closes_unleased_version(publish):
+    publish(50)
+    kb = KnowledgeBase(str(publish.root))
+    old = kb.database
+    old.load()
+    replacement = KnowledgeBase(str(publish.root)).database
+
+    kb.swap(replacement, name="manual")
+    assert kb.database is replacement
+    assert not old.is_loaded()
+
+
+def test_prune_keeps_current_and_protected_versions(publish):
+    versions = [publish(20 + i, seed=i) for i in range(4)]
+    previous, current = versions[-2], versions[-1]
+    assert read_pointer(publish.root) == current
+
+    removed = prune_versions(publish.root, keep=1, protect=[previous])
+    assert sorted(removed) == sorted(versions[:2])
+    assert sorted(list_versions(publish.root)) == sorted([previous, current])
+
+
+def test_prune_skips_recent_versions(publish):
+    versions = [publish(20 + i, seed=i) for i in range(3)]
+    assert prune_versions(publish.root, keep=1, min_age=3600) == []
+    assert sorted(list_versions(publish.root)) == sorted(versions)
+
+
+def test_search_after_version_directory_is_deleted(publish, embeddings):
+    v1 = publish(50)
+    kb = KnowledgeBase(str(publish.root))
+    kb.database.load()
+    shutil.rmtree(publish.root / v1)
+
+    scores, indices = kb.database.search(
+        embeddings.encode_query("printer is not working"), k=3, oversample=2
+    )
+    assert (indices >= 0).all()
+    assert np.all(np.diff(scores) <= 0)
+    assert kb.database.get_row(int(indices[0]))["id"].startswith("SYN-")
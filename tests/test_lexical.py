@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from app.services.lexical import BM25Index, load_or_build, reciprocal_rank_fusion
+
+DOCUMENTS = [
+    "password reset for the vpn account",
+    "printer offline in building two",
+    "vpn client crashes on start, reinstall the vpn client",
+    "reset the printer queue",
+]
+
+
+def test_search_ranks_by_bm25():
+    index = BM25Index.build(DOCUMENTS)
+
+    scores, doc_ids = index.search("vpn", k=10)
+    # Higher term frequency wins, documents without the term are not returned
+    assert doc_ids.tolist() == [2, 0]
+    assert scores[0] > scores[1] > 0
+
+    scores, doc_ids = index.search("reset printer", k=10)
+    assert doc_ids[0] == 3
+    assert set(doc_ids.tolist()) == {0, 1, 3}
+
+
+def test_weights_match_bm25_formula():
+    k1, b = 1.2, 0.75
+    index = BM25Index.build(DOCUMENTS, k1=k1, b=b)
+    lengths = [len(doc.replace(",", "").split()) for doc in DOCUMENTS]
+    avg_length = sum(lengths) / len(lengths)
+
+    # "offline" occurs once, in document 1
+    idf = np.log(1.0 + (4 - 1 + 0.5) / (1 + 0.5))
+    expected = idf * (k1 + 1.0) / (1.0 + k1 * (1.0 - b + b * lengths[1] / avg_length))
+    scores, doc_ids = index.search("offline")
+    assert doc_ids.tolist() == [1]
+    assert scores[0] == pytest.approx(expected, rel=1e-5)
+
+
+def test_search_top_k_and_unknown_terms():
+    index = BM25Index.build(DOCUMENTS)
+
+    scores, doc_ids = index.search("reset printer vpn", k=2)
+    assert len(doc_ids) == 2
+    assert list(scores) == sorted(scores, reverse=True)
+
+    scores, doc_ids = index.search("zebra")
+    assert len(scores) == len(doc_ids) == 0
+
+
+def test_save_and_load(tmp_path):
+    index = BM25Index.build(DOCUMENTS, source="v1")
+    index.save(tmp_path / "bm25.npz")
+
+    loaded = BM25Index.load(tmp_path / "bm25.npz")
+    assert loaded.source == "v1"
+    assert loaded.num_docs == len(DOCUMENTS)
+    for query in ("vpn", "reset printer", "building"):
+        np.testing.assert_array_equal(loaded.search(query)[1], index.search(query)[1])
+
+
+def test_load_or_build_rebuilds_stale_index(tmp_path):
+    path = tmp_path / "bm25.npz"
+    metadata = [{"subject": doc, "answer": ""} for doc in DOCUMENTS]
+    load_or_build(path, metadata, source="v1")
+
+    assert load_or_build(path, metadata, source="v1").source == "v1"
+    rebuilt = load_or_build(path, metadata[:2], source="v2")
+    assert rebuilt.source == "v2"
+    assert BM25Index.load(path).num_docs == 2
+
+
+def test_reciprocal_rank_fusion_ordering():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == [1, 3, 2, 4]
+    scores = dict(fused)
+    assert scores[1] == pytest.approx(1 / 61 + 1 / 62)
+    assert scores[4] == pytest.approx(1 / 63)
+
+
+def test_reciprocal_rank_fusion_prefers_agreement():
+    # A document ranked second by both lists beats one ranked first by only one
+    fused = reciprocal_rank_fusion([[7, 5], [8, 5]], k=1)
+    assert fused[0][0] == 5
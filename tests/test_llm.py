@@ -0,0 +1,41 @@
+import copy
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from app.services.llm import QUANTIZED_WEIGHTS, LLMService  # noqa: E402
+
+
+@pytest.fixture
+def tiny_model(monkeypatch):
+    """A randomly initialized one-layer Llama in place of the hub model."""
+    config = transformers.LlamaConfig(
+        vocab_size=64, hidden_size=32, intermediate_size=64,
+        num_hidden_layers=1, num_attention_heads=4, num_key_value_heads=4
+    )
+    torch.manual_seed(0)
+    model = transformers.LlamaForCausalLM(config)
+    monkeypatch.setattr(
+        transformers.AutoModelForCausalLM, "from_pretrained",
+        lambda *args, **kwargs: copy.deepcopy(model)
+    )
+    return model
+
+
+def test_int8_cache_loads_weights_only(tmp_path, settings, tiny_model, monkeypatch):
+    monkeypatch.setattr(settings, "llm_quantized_cache_dir", str(tmp_path))
+    llm = LLMService(backend="int8", speculative_mode="off")
+
+    quantized = llm._load_int8_model()
+    cache_dir = llm.quantized_cache_path
+    assert (cache_dir / QUANTIZED_WEIGHTS).exists()
+    # A plain state dict, readable without unpickling modules
+    torch.load(cache_dir / QUANTIZED_WEIGHTS, weights_only=True)
+
+    loaded = llm._load_int8_model()
+    input_ids = torch.tensor([[1, 5, 9, 13]])
+    with torch.inference_mode():
+        torch.testing.assert_close(loaded(input_ids).logits, quantized(input_ids).logits)
+    assert isinstance(loaded.model.layers[0].mlp.down_proj, torch.ao.nn.quantized.dynamic.Linear)
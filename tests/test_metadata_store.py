@@ -0,0 +1,90 @@
+import pickle
+
+import pytest
+
+from app.services.faiss_db import FAISSDatabase
+from app.services.metadata_store import (
+    MetadataStore, convert_pickle, read_records, write_metadata_store
+)
+from tests.conftest import artifact_paths
+
+RECORDS = [
+    {"id": "T-1", "subject": "VPN cannot connect", "answer": "Restart the client.",
+     "tags": ["vpn", "network"], "priority": 2},
+    {"id": "T-2", "subject": "Drucker offline", "answer": "Kabel prüfen 🖨️"},
+    {"id": "T-3", "subject": "", "answer": "Empty subject", "priority": None},
+]
+
+
+def test_round_trip_keeps_values_and_missing_fields(tmp_path):
+    store = MetadataStore.open(write_metadata_store(RECORDS, tmp_path / "meta.store"))
+    try:
+        assert len(store) == 3
+        assert read_records(store) == RECORDS
+        assert store[0]["tags"] == ["vpn", "network"]
+        assert store[0]["priority"] == 2
+        assert "tags" not in store[1]
+        assert store[1].get("priority") is None
+        assert store[-1]["answer"] == "Empty subject"
+        with pytest.raises(KeyError):
+            store[1]["tags"]
+        with pytest.raises(IndexError):
+            store[3]
+    finally:
+        store.close()
+
+
+def test_rows_decode_only_accessed_fields(tmp_path, monkeypatch):
+    store = MetadataStore.open(write_metadata_store(RECORDS, tmp_path / "meta.store"))
+    decoded = []
+    read_value = store.read_value
+    monkeypatch.setattr(
+        store, "read_value",
+        lambda row, column: decoded.append(store.column_names[column]) or read_value(row, column)
+    )
+
+    assert store[0]["answer"] == "Restart the client."
+    assert decoded == ["answer"]
+    store.close()
+
+
+def test_rewrite_replaces_store(tmp_path):
+    path = tmp_path / "meta.store"
+    write_metadata_store(RECORDS, path)
+    write_metadata_store(RECORDS[:1], path)
+
+    store = MetadataStore.open(path)
+    assert read_records(store) == RECORDS[:1]
+    store.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["meta.store"]
+
+
+def test_convert_pickle(tmp_path):
+    pickle_path = tmp_path / "metadata.pkl"
+    with open(pickle_path, "wb") as f:
+        pickle.dump(RECORDS, f)
+
+    store_path = convert_pickle(pickle_path)
+    assert store_path == tmp_path / "metadata.store"
+    store = MetadataStore.open(store_path)
+    assert read_records(store) == RECORDS
+    store.close()
+
+
+@pytest.fixture
+def database(tmp_path, make_builder, write_corpus):
+    corpus = write_corpus(RECORDS)
+    make_builder(tmp_path / "kb").build(str(corpus), index_type="Flat")
+
+    def open_database() -> FAISSDatabase:
+        return FAISSDatabase(**artifact_paths(tmp_path / "kb"))
+    return open_database
+
+
+def test_hits_return_all_fields_by_default(database):
+    assert database().get_hit(0) == RECORDS[0]
+
+
+def test_hits_limited_to_result_fields(database, settings, monkeypatch):
+    monkeypatch.setattr(settings, "search_result_fields", "id, answer,missing")
+    assert database().get_hit(0) == {"id": "T-1", "answer": "Restart the client."}
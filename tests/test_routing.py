@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.services.routing import MIN_CANDIDATES, DirectAnswerRouter, answer_key, score_margin
+
+ROWS = [
+    {"id": "T-1", "answer": "Restart the VPN client."},
+    {"id": "T-2", "answer": "restart the  vpn client."},
+    {"id": "T-3", "answer": "Reinstall the printer driver."},
+    {"id": "T-4", "answer": ""},
+]
+
+
+def route(router: DirectAnswerRouter, scores, indices):
+    return router.route(np.asarray(scores), np.asarray(indices), ROWS.__getitem__)
+
+
+@pytest.fixture
+def router() -> DirectAnswerRouter:
+    return DirectAnswerRouter(enabled=True, min_score=0.8, min_margin=0.1, max_bullets=5)
+
+
+def test_margin_skips_hits_with_the_same_answer():
+    assert answer_key(ROWS[0]["answer"]) == answer_key(ROWS[1]["answer"])
+
+    top, margin = score_margin([(0.9, ROWS[0]["answer"]), (0.88, ROWS[1]["answer"]),
+                                (0.7, ROWS[2]["answer"])])
+    assert top == 0.9
+    assert margin == pytest.approx(0.2)
+    assert score_margin([(0.9, "a"), (0.5, "A")]) == (0.9, math.inf)
+
+
+def test_routes_only_above_both_thresholds(router):
+    assert route(router, [0.85, 0.7], [0, 2])["id"] == "T-1"
+    # Score at the threshold is enough, just below is not
+    assert route(router, [0.8, 0.7], [0, 2]) is not None
+    assert route(router, [0.79, 0.5], [0, 2]) is None
+    # A close runner-up with another answer blocks the fast path
+    assert route(router, [0.9, 0.85], [0, 2]) is None
+    # A close runner-up with the same answer does not
+    hit = route(router, [0.9, 0.89, 0.5], [0, 1, 2])
+    assert hit["margin"] == pytest.approx(0.4)
+
+
+def test_skips_padding_and_empty_answers(router):
+    assert route(router, [0.95, -1.0], [0, -1])["margin"] == math.inf
+    assert route(router, [0.95, 0.5], [3, 0]) is None
+    assert route(router, [-1.0], [-1]) is None
+
+
+def test_disabled_router_never_routes():
+    router = DirectAnswerRouter(enabled=False, min_score=0.0, min_margin=0.0)
+    assert route(router, [0.99, 0.1], [0, 2]) is None
+    assert router.candidate_count(1) == 1
+    # Evaluation still works, for calibration logs
+    assert router.evaluate(np.asarray([0.99]), np.asarray([0]), ROWS.__getitem__)["id"] == "T-1"
+
+
+def test_candidate_count_leaves_room_for_a_runner_up(router):
+    assert router.candidate_count(1) == MIN_CANDIDATES
+    assert router.candidate_count(MIN_CANDIDATES + 3) == MIN_CANDIDATES + 3
+
+
+def test_response_is_stored_answer_as_bullets(router):
+    hit = {"answer": "Open settings. Restart the client."}
+    assert router.respond(hit) == "- Open settings.\n- Restart the client."
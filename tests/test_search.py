@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from app.services.faiss_db import FAISSDatabase
+from benchmarks.stubs import synthetic_corpus
+from tests.conftest import artifact_paths
+
+
+@pytest.fixture
+def build(tmp_path, make_builder, write_corpus, embeddings):
+    corpus = write_corpus(synthetic_corpus(400, seed=5))
+
+    def build(index_type: str, **kwargs) -> FAISSDatabase:
+        directory = tmp_path / index_type
+        make_builder(directory).build(str(corpus), index_type=index_type, **kwargs)
+        return FAISSDatabase(**artifact_paths(directory))
+    return build
+
+
+@pytest.fixture
+def queries(embeddings) -> np.ndarray:
+    texts = ["VPN cannot connect", "Drucker funktioniert nicht", "Outlook is very slow"]
+    return embeddings.encode(texts, use_cache=False)
+
+
+def exact_scores(database: FAISSDatabase, queries: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    vectors = np.load(database.vectors_path)
+    return np.einsum("qd,qcd->qc", queries, vectors[indices])
+
+
+def test_rerank_returns_exact_scores_in_order(build, queries):
+    database = build("SQ8")
+    scores, indices = database.search_batch(queries, k=5, oversample=4, min_score=-1.0)
+
+    np.testing.assert_allclose(scores, exact_scores(database, queries, indices), rtol=1e-5)
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+def test_rerank_is_skipped_without_vectors_on_compressed_index(build, queries, monkeypatch):
+    database = build("SQ8")
+    approximate = database.search_batch(queries, k=5, oversample=1, min_score=-1.0)
+    database.vectors_path.unlink()
+
+    database = FAISSDatabase(**artifact_paths(database.vectors_path.parent))
+    assert database.is_compressed
+    monkeypatch.setattr(database, "_candidate_vectors", lambda ids: pytest.fail("re-ranked"))
+    scores, indices = database.search_batch(queries, k=5, oversample=4, min_score=-1.0)
+    np.testing.assert_array_equal(scores, approximate[0])
+    np.testing.assert_array_equal(indices, approximate[1])
+
+
+def test_uncompressed_index_reranks_from_reconstructed_vectors(build, queries):
+    database = build("IVF", nlist=4)
+    expected = database.search_batch(queries, k=5, oversample=4, nprobe=4, min_score=-1.0)
+    vectors = np.load(database.vectors_path)
+    database.vectors_path.unlink()
+
+    database = FAISSDatabase(**artifact_paths(database.vectors_path.parent))
+    assert not database.is_compressed
+    scores, indices = database.search_batch(queries, k=5, oversample=4, nprobe=4, min_score=-1.0)
+    np.testing.assert_array_equal(indices, expected[1])
+    np.testing.assert_allclose(
+        scores, np.einsum("qd,qcd->qc", queries, vectors[indices]), rtol=1e-5
+    )
+
+
+def test_min_score_masks_hits(build, queries):
+    database = build("Flat")
+    scores, indices = database.search_batch(queries, k=5, min_score=2.0)
+    assert (indices == -1).all()
+    assert np.isneginf(scores).all()
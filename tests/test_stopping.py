@@ -0,0 +1,80 @@
+from typing import List
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from app.services.llm import StopReason  # noqa: E402
+from app.services.stopping import EarlyStoppingCriteria  # noqa: E402
+
+PROMPT = [90, 91, 92]
+EOS = 0
+PIECES = ["<eos>", "\n", "- step", " one", " two", "Sure", "."]
+
+
+class PieceTokenizer:
+    """Decodes token ids by concatenating fixed text pieces."""
+
+    def decode(self, token_ids: List[int], skip_special_tokens: bool = False) -> str:
+        return "".join(PIECES[token_id] for token_id in token_ids if token_id != EOS)
+
+
+def run(criteria: EarlyStoppingCriteria, rows: List[List[int]], pad: int = EOS) -> List[bool]:
+    """Feed the generated rows one decode step at a time, as generate() does."""
+    steps = max(len(row) for row in rows)
+    done = None
+    for step in range(1, steps + 1):
+        generated = [row[:step] + [pad] * (step - len(row[:step])) for row in rows]
+        input_ids = torch.tensor([PROMPT + row for row in generated])
+        done = criteria(input_ids, None).tolist()
+        if all(done):
+            break
+    return done
+
+
+def make(max_new_tokens: List[int], **kwargs) -> EarlyStoppingCriteria:
+    options = dict(eos_token_id=EOS, max_bullets=2, ngram_size=0)
+    options.update(kwargs)
+    return EarlyStoppingCriteria(PieceTokenizer(), len(PROMPT), max_new_tokens, **options)
+
+
+def test_rows_stop_for_their_own_reasons():
+    criteria = make([4, 20, 20])
+    done = run(criteria, [
+        [5, 6, 5, 6, 5, 6],           # runs into its token limit
+        [5, 6, EOS],                  # ends with EOS
+        [2, 3, 1, 2, 4, 1, 5, 6],     # completes two bullets
+    ])
+
+    assert done == [True, True, True]
+    assert criteria.finish() == [
+        (StopReason.MAX_TOKENS, 4),
+        (StopReason.EOS, 2),
+        (StopReason.BULLETS, 6),
+    ]
+
+
+def test_unfinished_bullet_does_not_stop():
+    criteria = make([20])
+    done = run(criteria, [[2, 3, 1, 2, 4]])
+
+    assert done == [False]
+    assert criteria.finish() == [(StopReason.CANCELLED, 5)]
+
+
+def test_stopped_row_ignores_later_tokens():
+    criteria = make([20, 20])
+    run(criteria, [[5, EOS, 5, 5], [5, 6, 5, 6, EOS]], pad=5)
+
+    reasons = criteria.finish()
+    assert reasons[0] == (StopReason.EOS, 1)
+    assert criteria.tokens[0] == [5]
+
+
+def test_repetition_is_cut_after_first_occurrence():
+    criteria = make([40], ngram_size=2, max_ngram_repeats=3, max_bullets=0)
+    run(criteria, [[5, 3, 4, 3, 4, 3, 4, 3, 4]])
+
+    # "one two" appears a third time at position 5, keep up to its first end
+    assert criteria.finish() == [(StopReason.REPETITION, 3)]
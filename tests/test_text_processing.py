@@ -0,0 +1,47 @@
+from typing import Iterable
+
+from app.utils.text_processing import (
+    StreamingTextCleaner, clean_generated_text, truncate_after_bullets
+)
+
+RESPONSE = "- Restart the client\n- Check the network\n- Call the helpdesk\nThanks!"
+
+
+def stream(chunks: Iterable[str], max_bullets: int = 0) -> str:
+    cleaner = StreamingTextCleaner(max_bullets=max_bullets)
+    text = "".join(cleaner.feed(chunk) for chunk in chunks)
+    return text + cleaner.flush()
+
+
+def chunked(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_truncate_after_bullets():
+    assert truncate_after_bullets(RESPONSE, 2) == "- Restart the client\n- Check the network"
+    assert truncate_after_bullets("- Restart the client\n- Check", 2) is None
+    assert truncate_after_bullets(RESPONSE, 4) is None
+
+
+def test_stream_matches_whole_text_cleanup():
+    text = "  <|assistant|>- Restart the client\n- Check the network</s>  "
+    for size in (1, 3, 7, len(text)):
+        assert stream(chunked(text, size)) == clean_generated_text(text)
+
+
+def test_stream_stops_after_max_bullets():
+    expected = clean_generated_text(truncate_after_bullets(RESPONSE, 2))
+    for size in (1, 4, 9, len(RESPONSE)):
+        assert stream(chunked(RESPONSE, size), max_bullets=2) == expected
+
+
+def test_stream_without_enough_bullets_is_complete():
+    assert stream(chunked(RESPONSE, 5), max_bullets=5) == clean_generated_text(RESPONSE)
+
+
+def test_finished_cleaner_drops_later_chunks():
+    cleaner = StreamingTextCleaner(max_bullets=1)
+    assert cleaner.feed("- Restart the client\n- Ch") == "- Restart the client"
+    assert cleaner.finished
+    assert cleaner.feed("eck the network\n") == ""
+    assert cleaner.flush() == ""